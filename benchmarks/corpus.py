@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import random
+
+WORDS = (
+    "python release asyncio feed proxy parser typing performance lxml "
+    "новини світ україна economy science culture sport weather"
+).split()
+
+
+def _sentence(rnd: random.Random, words: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _html_description(rnd: random.Random) -> str:
+    paragraphs = "".join(
+        f"<p>{_sentence(rnd, 30)} <a href='https://example.com/{rnd.randint(1, 999)}'>"
+        f"{_sentence(rnd, 3)}</a> &amp; <b>{_sentence(rnd, 2)}</b></p>"
+        for _ in range(rnd.randint(1, 4))
+    )
+    return f"<![CDATA[{paragraphs}]]>"
+
+
+def make_rss(entries: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)  # noqa: S311
+    items = "".join(
+        f"""
+    <item>
+      <title>{_sentence(rnd, 8)}</title>
+      <link>https://example.com/posts/{i}</link>
+      <guid isPermaLink="true">https://example.com/posts/{i}</guid>
+      <comments>https://example.com/posts/{i}#comments</comments>
+      <pubDate>Mon, 06 Sep 2021 16:45:00 +0000</pubDate>
+      <dc:creator>Author {rnd.randint(1, 20)}</dc:creator>
+      <category>{rnd.choice(WORDS)}</category>
+      <category>{rnd.choice(WORDS)}</category>
+      <description>{_html_description(rnd)}</description>
+    </item>"""
+        for i in range(entries)
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">
+  <channel>
+    <title>Synthetic feed</title>
+    <link>https://example.com</link>
+    <description>Synthetic feed for benchmarks</description>{items}
+  </channel>
+</rss>
+"""
+
+
+def make_atom(entries: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)  # noqa: S311
+    items = "".join(
+        f"""
+  <entry>
+    <title>{_sentence(rnd, 8)}</title>
+    <id>tag:example.com,2021:post-{i}</id>
+    <link rel="alternate" href="https://example.com/posts/{i}"/>
+    <updated>2021-09-06T16:45:00Z</updated>
+    <author><name>Author {rnd.randint(1, 20)}</name></author>
+    <category term="{rnd.choice(WORDS)}"/>
+    <summary type="html">{_sentence(rnd, 40)} &lt;b&gt;bold&lt;/b&gt;</summary>
+  </entry>"""
+        for i in range(entries)
+    )
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Synthetic feed</title>
+  <id>tag:example.com,2021:feed</id>
+  <updated>2021-09-06T16:45:00Z</updated>{items}
+</feed>
+"""
+
+
+def make_fotocasa_page(estates: int, padding_kb: int = 1000, seed: int = 0) -> str:
+    rnd = random.Random(seed)  # noqa: S311
+    real_estates = [
+        {
+            "id": 180000000 + i,
+            "buildingType": rnd.choice(["Flat", "House", "Penthouse"]),
+            "location": f"{_sentence(rnd, 2)}, Málaga Capital",
+            "price": f"{rnd.randint(600, 3000)} €/mes",
+            "detail": {"es-ES": f"/es/alquiler/vivienda/malaga-capital/{i}/d"},
+            "features": [
+                {"key": "rooms", "value": rnd.randint(1, 5)},
+                {"key": "bathrooms", "value": rnd.randint(1, 3)},
+                {"key": "surface", "value": rnd.randint(30, 200)},
+                {"key": "elevator", "value": rnd.random() > 0.5},
+            ],
+            "description": _sentence(rnd, 120),
+            "multimedia": [
+                {"type": "image", "src": f"https://static.fotocasa.es/{i}/{j}.jpg"}
+                for j in range(20)
+            ],
+        }
+        for i in range(estates)
+    ]
+    props = {
+        "initialSearch": {"result": {"realEstates": real_estates}},
+        "seo": {"text": _sentence(rnd, padding_kb * 1024 // 8)},
+    }
+    literal = json.dumps(json.dumps(props))
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<style>{'.c{color:red}' * 2000}</style>"
+        f"<script>window.__INITIAL_PROPS__ = JSON.parse({literal});</script>"
+        "</head><body><div id='app'></div></body></html>"
+    )
+
+
+def make_idealista_page(articles: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)  # noqa: S311
+    items = "".join(
+        f"""
+    <article class="item extended-item item-multimedia-container" data-id="{i}">
+      <picture class="item-multimedia">{"<img src='x.jpg'>" * 10}</picture>
+      <div class="item-info-container">
+        <a href="/inmueble/{100000 + i}/" role="heading" class="item-link">
+          {_sentence(rnd, 6)}
+        </a>
+        <div class="price-row">
+          <span class="item-price h2-simulated">{rnd.randint(600, 3000)}
+            <span class="txt">€/mes</span></span>
+        </div>
+        <div class="item-detail-char">
+          <span class="item-detail">{rnd.randint(1, 5)} hab.</span>
+          <span class="item-detail">{rnd.randint(30, 200)} m²</span>
+          <span class="item-detail">Planta {rnd.randint(1, 9)}ª exterior</span>
+        </div>
+        <div class="item-description"><p>{_sentence(rnd, 60)}</p></div>
+      </div>
+    </article>"""
+        for i in range(articles)
+    )
+    navigation = "".join(
+        f"<li><a href='/zona/{i}'>{_sentence(rnd, 2)}</a></li>" for i in range(500)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><title>Pisos</title><script>{"var a = 1;" * 5000}</script></head>
+<body>
+  <nav><ul>{navigation}</ul></nav>
+  <main class="items-container">{items}</main>
+</body>
+</html>
+"""
+
+
+def make_reddit_listing(children: int, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)  # noqa: S311
+    listing = {
+        "kind": "Listing",
+        "data": {
+            "after": "t3_last",
+            "children": [
+                {
+                    "kind": "t3",
+                    "data": {
+                        "id": f"id{i}",
+                        "title": _sentence(rnd, 10),
+                        "url": f"https://example.com/{i}",
+                        "permalink": f"/r/python/comments/id{i}/post/",
+                        "score": rnd.randint(0, 5000),
+                        "selftext": _sentence(rnd, 300),
+                        "selftext_html": f"<p>{_sentence(rnd, 300)}</p>",
+                        "preview": {
+                            "images": [
+                                {"source": {"url": f"https://i.redd.it/{i}/{j}.jpg"}}
+                                for j in range(10)
+                            ]
+                        },
+                        "all_awardings": [{"name": "award"}] * 10,
+                    },
+                }
+                for i in range(children)
+            ],
+        },
+    }
+    return json.dumps(listing).encode()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import json
+import re
+import timeit
+from functools import partial
+from typing import Any
+
+from benchmarks.corpus import make_fotocasa_page
+from feed_proxy.handlers.parsers.fotocasa import _parse_fotocasa
+
+
+def legacy_extract_real_estates(html: str) -> list[dict[str, Any]]:
+    # Extraction used before the dedicated extractor, kept as the baseline
+    match = re.search(
+        r'window\.__INITIAL_PROPS__\s*=\s*JSON\.parse\("(.+?)"\)', html, re.DOTALL
+    )
+    assert match
+    data = json.loads(match.group(1).encode().decode("unicode_escape"))
+    return data["initialSearch"]["result"]["realEstates"]
+
+
+def main() -> None:
+    for estates in (30, 100):
+        html = make_fotocasa_page(estates)
+        assert len(_parse_fotocasa(html)) == estates
+        number = 20
+        legacy_time = timeit.timeit(
+            partial(legacy_extract_real_estates, html), number=number
+        )
+        current_time = timeit.timeit(partial(_parse_fotocasa, html), number=number)
+        print(
+            f"{estates} estates, {len(html) // 1024} KiB page"
+            f"  legacy {legacy_time / number * 1000:8.2f} ms"
+            f"  current {current_time / number * 1000:8.2f} ms"
+            f"  x{legacy_time / current_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
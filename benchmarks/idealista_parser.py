@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import timeit
+from functools import partial
+
+from bs4 import BeautifulSoup
+
+from benchmarks.corpus import make_idealista_page
+from feed_proxy.handlers.parsers.idealista import (
+    BASE_URL,
+    IdealistaItem,
+    _extract_post_id_from_url,
+    _make_post_id,
+    _parse_idealista,
+)
+
+
+def legacy_parse_idealista(html: str) -> list[IdealistaItem]:
+    # BeautifulSoup based parser used before, kept as the baseline
+    items = []
+    soup = BeautifulSoup(html, "lxml")
+    for article in soup.select("article.item"):
+        link_el = article.select_one("a.item-link")
+        if not link_el:
+            continue
+        href = str(link_el.get("href", ""))
+        url = href if href.startswith("http") else f"{BASE_URL}{href}"
+        price_el = article.select_one(".item-price")
+        money = price_el.get_text(strip=True) if price_el else ""
+        details = [
+            text
+            for detail_el in article.select(".item-detail")
+            if (text := detail_el.get_text(strip=True))
+        ]
+        items.append(
+            IdealistaItem(
+                post_id=_make_post_id(_extract_post_id_from_url(url), money),
+                title=link_el.get_text(strip=True),
+                url=url,
+                money=money,
+                details=details,
+                source_tags=[],
+            )
+        )
+    return items
+
+
+def main() -> None:
+    for articles in (30, 100):
+        html = make_idealista_page(articles)
+        assert _parse_idealista(html) == legacy_parse_idealista(html)
+        number = 10
+        legacy_time = timeit.timeit(
+            partial(legacy_parse_idealista, html), number=number
+        )
+        current_time = timeit.timeit(partial(_parse_idealista, html), number=number)
+        print(
+            f"{articles} articles, {len(html) // 1024} KiB page"
+            f"  bs4 {legacy_time / number * 1000:8.2f} ms"
+            f"  lxml {current_time / number * 1000:8.2f} ms"
+            f"  x{legacy_time / current_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
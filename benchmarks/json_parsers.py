@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+import timeit
+from functools import partial
+
+from benchmarks.corpus import make_reddit_listing
+from feed_proxy.handlers.parsers.reddit_json import RedditListing
+from feed_proxy.utils import fast_json
+from feed_proxy.utils.fast_json import available_backends
+
+
+def stdlib_decode(data: bytes) -> list[str]:
+    # Decoding used before fast_json, kept as the baseline
+    raw = json.loads(data.decode())
+    return [child["data"]["id"] for child in raw["data"]["children"]]
+
+
+def typed_decode(data: bytes) -> list[str]:
+    listing: RedditListing = fast_json.loads_as(data, RedditListing)
+    return [child.data.id for child in listing.data.children]
+
+
+def main() -> None:
+    data = make_reddit_listing(100)
+    number = 50
+    baseline = timeit.timeit(partial(stdlib_decode, data), number=number)
+    print(f"reddit listing, {len(data) // 1024} KiB")
+    print(f"  {'stdlib json, str':<22}{baseline / number * 1000:8.2f} ms")
+
+    has_msgspec = fast_json.HAS_MSGSPEC
+    decoders = [
+        (f"{backend} + dataclasses", backend, False) for backend in available_backends()
+    ]
+    if has_msgspec:
+        decoders.append(("msgspec typed", fast_json.BACKEND, True))
+    for name, backend, use_msgspec in decoders:
+        fast_json.BACKEND = backend
+        fast_json.HAS_MSGSPEC = use_msgspec
+        assert typed_decode(data) == stdlib_decode(data)
+        elapsed = timeit.timeit(partial(typed_decode, data), number=number)
+        print(
+            f"  {name:<22}{elapsed / number * 1000:8.2f} ms  x{baseline / elapsed:.1f}"
+        )
+    fast_json.HAS_MSGSPEC = has_msgspec
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import timeit
+from functools import partial
+
+from benchmarks.corpus import make_atom, make_rss
+from feed_proxy.handlers.parsers.rss import _handler, _parse_with_feedparser
+
+CORPUS = {
+    "rss, 20 entries": make_rss(20),
+    "rss, 500 entries": make_rss(500),
+    "atom, 20 entries": make_atom(20),
+    "atom, 500 entries": make_atom(500),
+}
+
+
+def main() -> None:
+    for name, text in CORPUS.items():
+        assert _handler(text) == _parse_with_feedparser(text), name
+        number = max(1, 2000 // text.count("<title>"))
+        feedparser_time = timeit.timeit(
+            partial(_parse_with_feedparser, text), number=number
+        )
+        lxml_time = timeit.timeit(partial(_handler, text), number=number)
+        print(
+            f"{name:<20} feedparser {feedparser_time / number * 1000:8.2f} ms"
+            f"  lxml {lxml_time / number * 1000:8.2f} ms"
+            f"  x{feedparser_time / lxml_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,33 +11,50 @@ from picodi import Provide, inject
 from picodi.helpers import lifespan
 
 from feed_proxy.configuration import read_configuration_from_folder
-from feed_proxy.deps import get_metrics, get_outbox_queue, get_post_storage
+from feed_proxy.deps import (
+    get_fetch_single_flight,
+    get_metrics,
+    get_outbox_queue,
+    get_parse_cache,
+    get_unit_of_work_manager,
+)
 from feed_proxy.logic import (
-    fetch_text,
+    dropped_post_ids,
+    fetch_and_parse_pages,
+    fetch_body,
+    is_paged,
     parse_message_batches_from_posts,
-    parse_posts,
+    parse_source_posts,
     send_messages,
+    split_posts_by_streams,
 )
 from feed_proxy.observability import Metrics, setup_logging_instruments
-from feed_proxy.storage import OutboxItem, PostStorage
+from feed_proxy.storage import OutboxItem
+from feed_proxy.unit_of_work import UnitOfWorkManager
 
 if TYPE_CHECKING:
     from feed_proxy.entities import Message, Post, Source, Stream
     from feed_proxy.messages_outbox import MessagesOutbox
+    from feed_proxy.parse_cache import ParseCache
+    from feed_proxy.utils.http import FetchedBody
+    from feed_proxy.utils.single_flight import SingleFlight
 
 
 logger = logging.getLogger(__name__)
 
 
 class TextUnit(NamedTuple):
-    text: str
+    body: FetchedBody | None
     source: Source
+    # Posts of paged sources are parsed page by page in the fetch stage
+    posts: list[Post] | None = None
 
 
 class PostsUnit(NamedTuple):
     posts: list[Post]
     source: Source
     stream: Stream
+    dropped_ids: list[str]
 
 
 class MessageUnit(NamedTuple):
@@ -56,8 +73,12 @@ MessagesQueue: TypeAlias = asyncio.Queue[MessageUnit]
 async def worker(
     sources: list[Source],
     metrics: Metrics = Provide(get_metrics),
-    post_storage: PostStorage = Provide(get_post_storage),
+    unit_of_work: UnitOfWorkManager = Provide(get_unit_of_work_manager),
     outbox_queue: MessagesOutbox = Provide(get_outbox_queue),
+    parse_cache: ParseCache | None = Provide(get_parse_cache),
+    single_flight: SingleFlight[tuple[str, str, str], FetchedBody | None] = Provide(
+        get_fetch_single_flight
+    ),
 ) -> None:
     streams = [
         (source.id, stream.receiver_type)
@@ -71,13 +92,23 @@ async def worker(
     text_queue: TextQueue = asyncio.Queue()
     post_queue: PostsQueue = asyncio.Queue()
 
-    await asyncio.gather(
-        _enqueue_sources(source_queue, sources),
-        *[_fetch_sources(i, source_queue, text_queue, metrics) for i in range(1, 10)],
-        _parse_posts_from_text(text_queue, post_queue, metrics),
-        _prepare_messages(post_queue, outbox_queue, post_storage, metrics),
-        _send_messages(outbox_queue, metrics),
-    )
+    try:
+        await asyncio.gather(
+            _enqueue_sources(source_queue, sources),
+            *[
+                _fetch_sources(
+                    i, source_queue, text_queue, unit_of_work, single_flight, metrics
+                )
+                for i in range(1, 10)
+            ],
+            _parse_posts_from_text(
+                text_queue, post_queue, unit_of_work, parse_cache, metrics
+            ),
+            _prepare_messages(post_queue, unit_of_work, metrics),
+            _send_messages(outbox_queue, metrics),
+        )
+    finally:
+        await unit_of_work.flush()
 
 
 async def _enqueue_sources(source_queue: SourceQueue, sources: list[Source]) -> None:
@@ -89,67 +120,97 @@ async def _enqueue_sources(source_queue: SourceQueue, sources: list[Source]) ->
 
 
 async def _fetch_sources(
-    job_id: int, source_queue: SourceQueue, text_queue: TextQueue, metrics: Metrics
+    job_id: int,
+    source_queue: SourceQueue,
+    text_queue: TextQueue,
+    unit_of_work: UnitOfWorkManager,
+    single_flight: SingleFlight[tuple[str, str, str], FetchedBody | None],
+    metrics: Metrics,
 ) -> None:
     while source := await source_queue.get():
         logger.info("Worker %s processing %s (fetch_text)", job_id, source.id)
-        text = await fetch_text(source)
-        if not text:
+        if is_paged(source):
+            posts = await fetch_and_parse_pages(source, post_storage=unit_of_work)
+            text_unit = None if posts is None else TextUnit(None, source, posts)
+        else:
+            body = await fetch_body(source, single_flight=single_flight)
+            text_unit = TextUnit(body, source) if body and body.content else None
+        if text_unit is None:
             logger.warning("Can't fetch text for %s", source.id)
             metrics.increment_sources_fetched(source.id, "failed")
             continue
 
         metrics.increment_sources_fetched(source.id, "ok")
 
-        await text_queue.put(TextUnit(text=text, source=source))
+        await text_queue.put(text_unit)
         source_queue.task_done()
 
 
 async def _parse_posts_from_text(
-    text_queue: TextQueue, post_queue: PostsQueue, metrics: Metrics
+    text_queue: TextQueue,
+    post_queue: PostsQueue,
+    unit_of_work: UnitOfWorkManager,
+    parse_cache: ParseCache | None,
+    metrics: Metrics,
 ) -> None:
     while text_unit := await text_queue.get():
         logger.info("Processing text for %s (parse_posts)", text_unit.source.id)
-        parsed_posts = await parse_posts(text_unit.source, text_unit.text)
+        if text_unit.body is None:
+            assert text_unit.posts is not None
+            posts = text_unit.posts
+        else:
+            posts = await parse_source_posts(
+                text_unit.source,
+                text_unit.body,
+                post_storage=unit_of_work,
+                parse_cache=parse_cache,
+            )
+        parsed_posts = await split_posts_by_streams(text_unit.source, posts)
 
         if parsed_posts:
             metrics.increment_posts_parsed(text_unit.source.id)
 
-        for stream, posts in parsed_posts:
+        for stream, stream_posts in parsed_posts:
             await post_queue.put(
-                PostsUnit(posts=posts, source=text_unit.source, stream=stream)
+                PostsUnit(
+                    posts=stream_posts,
+                    source=text_unit.source,
+                    stream=stream,
+                    dropped_ids=dropped_post_ids(posts, stream_posts),
+                )
             )
         text_queue.task_done()
 
 
 async def _prepare_messages(
     post_queue: PostsQueue,
-    outbox_queue: MessagesOutbox,
-    post_storage: PostStorage,
+    unit_of_work: UnitOfWorkManager,
     metrics: Metrics,
 ) -> None:
     while posts_unit := await post_queue.get():
-        message_batches = await parse_message_batches_from_posts(
-            posts_unit.posts,
-            posts_unit.source,
-            posts_unit.stream,
-            post_storage=post_storage,
-        )
+        async with unit_of_work.begin() as uow:
+            message_batches = await parse_message_batches_from_posts(
+                posts_unit.posts,
+                posts_unit.source,
+                posts_unit.stream,
+                post_storage=uow,
+                dropped_ids=posts_unit.dropped_ids,
+            )
+
+            for batch in message_batches:
+                await uow.put(
+                    OutboxItem(
+                        id=uuid.uuid4().hex,
+                        messages=batch,
+                        source_id=posts_unit.source.id,
+                        stream=posts_unit.stream,
+                    )
+                )
 
         for batch in message_batches:
             metrics.increment_messages_prepared(
                 posts_unit.source.id, posts_unit.stream.receiver_type, len(batch)
             )
-
-        for batch in message_batches:
-            await outbox_queue.put(
-                OutboxItem(
-                    id=uuid.uuid4().hex,
-                    messages=batch,
-                    source_id=posts_unit.source.id,
-                    stream=posts_unit.stream,
-                )
-            )
         post_queue.task_done()
 
 
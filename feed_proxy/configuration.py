@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 from collections.abc import Callable
 from dataclasses import dataclass
 from enum import Enum
@@ -11,9 +10,11 @@ from typing import TYPE_CHECKING, Any, Literal
 from dacite import Config, exceptions, from_dict
 from picodi import Provide, inject, registry
 
-from feed_proxy.deps import get_app_settings, get_yaml_loader
+from feed_proxy.deps import get_app_settings, get_streams_by_key, get_yaml_loader
 from feed_proxy.entities import Source
 from feed_proxy.handlers import HandlerType, InitHandlersError, init_registered_handlers
+from feed_proxy.storage import definition_stream_id, index_streams, receiver_stream_id
+from feed_proxy.utils import fast_json
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -32,6 +33,8 @@ def read_configuration_from_folder(
     try:
         conf = load_configuration(configurations)
         registry.override(get_app_settings, lambda: conf.app_settings)
+        streams_by_key = index_streams(conf.sources)
+        registry.override(get_streams_by_key, lambda: streams_by_key)
         return conf
     except (LoadConfigurationError, InitHandlersError) as e:
         print(e)
@@ -53,7 +56,7 @@ def read_configuration_files(
     configurations: dict[str, dict] = {}
     for file in chain(path.glob("*.yaml"), path.glob("*.yml")):
         conf_parts = yaml_loader(file.read_text()) or {}
-        configurations |= json.loads(json.dumps(conf_parts))
+        configurations |= fast_json.loads(fast_json.dumps(conf_parts))
     return configurations
 
 
@@ -72,6 +75,13 @@ class AppSettings:
     post_storage: Literal["memory", "sqlite"] = "memory"
     outbox_storage: Literal["memory", "sqlite"] = "memory"
     sqlite_db: str | None = None
+    group_commit_ms: int = 0
+    fetch_coalesce_sec: float = 60.0
+    parse_cache_size: int = 128
+    parse_cache_persist: bool = False
+    llm_cache_size: int = 1024
+    llm_cache_ttl_sec: float = 7 * 24 * 60 * 60
+    llm_cache_persist: bool | None = None
     metrics_client: Literal["null", "prometheus"] = "null"
     metrics_file: str = "metrics.prom"
 
@@ -144,4 +154,36 @@ def _parse_sources(config: dict) -> list[Source]:
             sources.append(from_dict(Source, source))
         except exceptions.DaciteError as e:
             raise LoadConfigurationError(f"Source {source_id}: {e}") from None
+        if not 0 <= sources[-1].dedup_similarity <= 1:
+            raise LoadConfigurationError(
+                f"Source {source_id}: dedup_similarity should be from 0 to 1"
+            )
+        _assign_stream_ids(sources[-1])
     return sources
+
+
+def _assign_stream_ids(source: Source) -> None:
+    # Outbox rows reference streams by id, streams without an explicit one
+    # are identified by their receiver. Streams that share a receiver are
+    # told apart by their whole definition, the first one keeps the receiver
+    # id, so adding a stream doesn't orphan pending rows of the existing one.
+    seen: dict[str, int] = {}
+    for i, stream in enumerate(source.streams):
+        if stream.id is None:
+            continue
+        if stream.id in seen:
+            raise LoadConfigurationError(
+                f"Source {source.id}: streams {seen[stream.id]} and {i} have "
+                f"the same id {stream.id!r}"
+            )
+        seen[stream.id] = i
+    for i, stream in enumerate(source.streams):
+        if stream.id is not None:
+            continue
+        candidates = (
+            receiver_stream_id(stream),
+            definition_stream_id(stream),
+            f"{definition_stream_id(stream)}:{i}",
+        )
+        stream.id = next(item for item in candidates if item not in seen)
+        seen[stream.id] = i
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 import sqlite3
-from collections.abc import Callable, Generator
+from collections.abc import Callable, Generator, Mapping
 from functools import partial
 from typing import TYPE_CHECKING, Any
 
@@ -10,26 +10,44 @@ import yaml
 from picodi import Provide, SingletonScope, dependency, inject
 from picodi.helpers import enter
 
+from feed_proxy.llm_cache import LlmCache
 from feed_proxy.messages_outbox import MessagesOutbox
 from feed_proxy.observability import Metrics, NullMetrics, PrometheusMetrics
+from feed_proxy.parse_cache import ParseCache
 from feed_proxy.storage import (
+    FetchCursorStorage,
+    MemoryFetchCursorStorage,
     MemoryMessagesOutboxStorage,
     MemoryPostStorage,
     MessagesOutboxStorage,
     PostStorage,
+    SqliteFetchCursorStorage,
+    SqliteLlmCacheStorage,
     SqliteMessagesOutboxStorage,
+    SqliteParseCacheStorage,
     SqlitePostStorage,
+    SqliteUnitOfWorkWriter,
+    StorageUnitOfWorkWriter,
+    UnitOfWorkWriter,
     create_sqlite_conn,
 )
+from feed_proxy.unit_of_work import UnitOfWorkManager
+from feed_proxy.utils.single_flight import SingleFlight
 
 if TYPE_CHECKING:
     from feed_proxy.configuration import AppSettings
+    from feed_proxy.entities import Stream
+    from feed_proxy.utils.http import FetchedBody
 
 
 def get_app_settings() -> AppSettings:
     raise NotImplementedError("get_app_settings need to be overridden")
 
 
+def get_streams_by_key() -> Mapping[str, Stream]:
+    raise NotImplementedError("get_streams_by_key need to be overridden")
+
+
 def _yaml_string_constructor(self: Any, node: Any) -> Any:
     value = self.construct_yaml_str(node)
     if value.startswith("ENV:"):
@@ -72,6 +90,7 @@ def get_sqlite_post_storage(
     return SqlitePostStorage(conn)
 
 
+@dependency(scope_class=SingletonScope)
 @inject
 def get_post_storage(settings: AppSettings = Provide(get_app_settings)) -> PostStorage:
     if settings.post_storage == "sqlite":
@@ -92,10 +111,12 @@ def get_memory_outbox_storage() -> MemoryMessagesOutboxStorage:
 @inject
 def get_sqlite_outbox_storage(
     conn: sqlite3.Connection = Provide(get_sqlite_conn),
+    streams: Mapping[str, Stream] = Provide(get_streams_by_key),
 ) -> SqliteMessagesOutboxStorage:
-    return SqliteMessagesOutboxStorage(conn)
+    return SqliteMessagesOutboxStorage(conn, streams)
 
 
+@dependency(scope_class=SingletonScope)
 @inject
 def get_outbox_storage(
     settings: AppSettings = Provide(get_app_settings),
@@ -118,6 +139,30 @@ def get_outbox_queue(
     return MessagesOutbox(storage)
 
 
+@inject
+def get_unit_of_work_writer(
+    post_storage: PostStorage = Provide(get_post_storage),
+    outbox_storage: MessagesOutboxStorage = Provide(get_outbox_storage),
+) -> UnitOfWorkWriter:
+    if isinstance(post_storage, SqlitePostStorage) and isinstance(
+        outbox_storage, SqliteMessagesOutboxStorage
+    ):
+        with enter(get_sqlite_conn) as conn:
+            return SqliteUnitOfWorkWriter(conn, post_storage, outbox_storage)
+    return StorageUnitOfWorkWriter(post_storage, outbox_storage)
+
+
+@inject
+def get_unit_of_work_manager(
+    writer: UnitOfWorkWriter = Provide(get_unit_of_work_writer),
+    post_storage: PostStorage = Provide(get_post_storage),
+    settings: AppSettings = Provide(get_app_settings),
+) -> UnitOfWorkManager:
+    return UnitOfWorkManager(
+        writer, post_storage, group_commit_sec=settings.group_commit_ms / 1000
+    )
+
+
 @dependency(scope_class=SingletonScope)
 @inject
 def get_metrics(
@@ -134,3 +179,62 @@ def get_metrics(
         yield metrics
     finally:
         metrics.stop_daemon()
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_fetch_single_flight(
+    settings: AppSettings = Provide(get_app_settings),
+) -> SingleFlight[tuple[str, str, str], FetchedBody | None]:
+    return SingleFlight(ttl_sec=settings.fetch_coalesce_sec)
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_fetch_cursor_storage(
+    settings: AppSettings = Provide(get_app_settings),
+) -> FetchCursorStorage:
+    # Cursors are kept next to dedup marks, so they survive restarts together
+    if settings.post_storage == "sqlite":
+        with enter(get_sqlite_conn) as conn:
+            return SqliteFetchCursorStorage(conn)
+    return MemoryFetchCursorStorage()
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_parse_cache(
+    settings: AppSettings = Provide(get_app_settings),
+    metrics: Metrics = Provide(get_metrics),
+) -> ParseCache | None:
+    if settings.parse_cache_size <= 0:
+        return None
+    storage = None
+    if settings.parse_cache_persist:
+        with enter(get_sqlite_conn) as conn:
+            storage = SqliteParseCacheStorage(conn, settings.parse_cache_size)
+    return ParseCache(settings.parse_cache_size, storage=storage, metrics=metrics)
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_llm_cache(
+    settings: AppSettings = Provide(get_app_settings),
+    metrics: Metrics = Provide(get_metrics),
+) -> LlmCache | None:
+    if settings.llm_cache_size <= 0:
+        return None
+    persist = settings.llm_cache_persist
+    if persist is None:
+        # LLM calls are paid for, so results outlive restarts whenever there is a db
+        persist = settings.sqlite_db is not None
+    storage = None
+    if persist:
+        with enter(get_sqlite_conn) as conn:
+            storage = SqliteLlmCacheStorage(conn, settings.llm_cache_size)
+    return LlmCache(
+        settings.llm_cache_size,
+        ttl_sec=settings.llm_cache_ttl_sec,
+        storage=storage,
+        metrics=metrics,
+    )
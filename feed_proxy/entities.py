@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import copy
 from dataclasses import dataclass, field
-from typing import Any, Protocol
+from typing import Any, Protocol, TypeVar
 
 from dacite import from_dict
 
+from feed_proxy.utils.url import DEFAULT_TRACKING_PARAMS
+
 
 @dataclass
 class Post(Protocol):
@@ -22,6 +25,20 @@ class Post(Protocol):
         return from_dict(cls, data=data)
 
 
+PostT = TypeVar("PostT", bound=Post)
+
+
+def copy_post(post: PostT) -> PostT:
+    # Modifiers replace field values instead of changing them in place,
+    # so copies can share strings with the original. Only containers are
+    # copied, because processors update them in place (e.g. extras).
+    clone = copy.copy(post)
+    for name, value in list(vars(clone).items()):
+        if isinstance(value, (list, dict, set)):
+            setattr(clone, name, value.copy())
+    return clone
+
+
 @dataclass(kw_only=True)
 class Message:
     post_id: str
@@ -50,6 +67,17 @@ class Stream:
     message_template: str
     modifiers: list[Modifier] = field(default_factory=list)
     pre_send_processors: list[PreSendProcessor] = field(default_factory=list)
+    # Identifies the stream in outbox rows, see storage.stream_key
+    id: str | None = None
+
+
+@dataclass
+class DedupUrlOptions:
+    strip_params: list[str] = field(
+        default_factory=lambda: list(DEFAULT_TRACKING_PARAMS)
+    )
+    sort_query: bool = True
+    strip_www: bool = True
 
 
 @dataclass(kw_only=True)
@@ -63,3 +91,5 @@ class Source:
     streams: list[Stream]
     dedup_group: str | None = None
     dedup_key: str = "post_id"
+    dedup_similarity: float = 0.0
+    dedup_url: DedupUrlOptions = field(default_factory=DedupUrlOptions)
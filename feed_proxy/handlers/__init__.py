@@ -5,28 +5,37 @@ import importlib
 import os
 import pkgutil
 from collections import defaultdict
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
 from enum import Enum
-from functools import partial
+from functools import cached_property, partial
 from inspect import isclass
 from typing import TYPE_CHECKING, Any, NamedTuple
 
 from dacite import Config, DaciteError, from_dict
 
 from feed_proxy.entities import Post
+from feed_proxy.utils import fast_json
 
 if TYPE_CHECKING:
     from types import ModuleType
 
     from feed_proxy.configuration import Configuration
+    from feed_proxy.entities import Source, Stream
+    from feed_proxy.utils.http import FetchedBody
 
 __all__ = [
     "HandlerOptions",
     "HandlerType",
     "InitHandlersError",
+    "IsKnown",
+    "ModifierNode",
+    "SourcePlan",
+    "StreamPlan",
     "get_handler_by_name",
     "get_handler_return_model_by_name",
     "get_registered_handlers",
+    "get_source_plan",
+    "get_stream_plan",
     "register_handler",
 ]
 
@@ -41,10 +50,20 @@ class HandlerType(Enum):
 
 @dataclasses.dataclass
 class HandlerOptions:
-    pass
+    @property
+    def per_source(self) -> bool:
+        # Fetchers with such options keep state per source, they get
+        # source_id and their calls are not shared between sources
+        return False
+
+    def check_post_model(self, model: ReturnModel) -> None:  # noqa: U100
+        # Modifiers that name post fields check them at configuration load
+        pass
 
 
 ReturnModel = type[Post]
+# Tells incremental parsers whether post with given id is already processed
+IsKnown = Callable[[str], Awaitable[bool]]
 
 
 class Handler(NamedTuple):
@@ -52,6 +71,10 @@ class Handler(NamedTuple):
     obj: Callable
     options_class: type[HandlerOptions] | None
     return_model: ReturnModel | None
+    incremental: bool = False
+    paged: bool = False
+    wants_bytes: bool = False
+    pure_filter: bool = False
 
 
 class RawHandler(NamedTuple):
@@ -60,10 +83,159 @@ class RawHandler(NamedTuple):
     init_options_class: type[HandlerOptions] | None
     options_class: type[HandlerOptions] | None
     return_model: ReturnModel | None
+    incremental: bool = False
+    paged: bool = False
+    wants_bytes: bool = False
+    pure_filter: bool = False
+
+
+class ModifierNode:
+    def __init__(
+        self, modifier: Callable | None = None, pure_filter: bool = False
+    ) -> None:
+        self.modifier = modifier
+        # Pure filters only drop posts, so they can take posts shared
+        # with other branches without copying them
+        self.pure_filter = pure_filter
+        self.children: dict[tuple[str, str], ModifierNode] = {}
+        # Streams whose modifier chain ends at this node
+        self.streams: list[Stream] = []
+
+
+class SourcePlan:
+    def __init__(self, source: Source) -> None:
+        self.source = source
+
+    @cached_property
+    def fetcher(self) -> partial[Any]:
+        fetcher: partial[Any] = get_handler_by_name(
+            type=HandlerType.fetchers,
+            name=self.source.fetcher_type,
+            options=self.source.fetcher_options,
+        )
+        options = fetcher.keywords["options"]
+        if isinstance(options, HandlerOptions) and options.per_source:
+            return partial(fetcher, source_id=self.source.id)
+        return fetcher
+
+    @cached_property
+    def paged(self) -> bool:
+        # Paged fetchers return async iterator of pages instead of text
+        return get_registered_handlers()[HandlerType.fetchers][
+            self.source.fetcher_type
+        ].paged
+
+    @cached_property
+    def fetch_key(self) -> tuple[str, str, str]:
+        # Sources with the same fetcher and options fetch the same thing
+        return (
+            self.source.fetcher_type,
+            fast_json.dumps(self.source.fetcher_options, sort_keys=True),
+            self.fetcher.keywords.get("source_id", ""),
+        )
+
+    @cached_property
+    def parser(self) -> Callable:
+        return get_handler_by_name(
+            type=HandlerType.parsers,
+            name=self.source.parser_type,
+            options=self.source.parser_options,
+        )
+
+    @cached_property
+    def incremental(self) -> bool:
+        # Incremental parsers switch the mode on with the `incremental` option
+        handler = get_registered_handlers()[HandlerType.parsers][
+            self.source.parser_type
+        ]
+        return handler.incremental and bool(
+            self.source.parser_options.get("incremental")
+        )
+
+    @cached_property
+    def wants_bytes(self) -> bool:
+        return get_registered_handlers()[HandlerType.parsers][
+            self.source.parser_type
+        ].wants_bytes
+
+    def parser_input(self, body: str | FetchedBody) -> str | bytes:
+        if isinstance(body, str):
+            return body
+        # Forced encoding and charset from the headers take precedence over
+        # the one declared in the body, so such bodies are decoded here
+        if self.wants_bytes and not body.encoding and body.is_utf8:
+            return body.content
+        return body.decode()
+
+    @cached_property
+    def modifier_tree(self) -> ModifierNode:
+        # Streams with the same leading modifiers share tree nodes,
+        # so a common prefix of their chains is applied only once
+        root = ModifierNode()
+        modifier_handlers = get_registered_handlers().get(HandlerType.modifiers, {})
+        for stream in self.source.streams:
+            node = root
+            bound_modifiers = get_stream_plan(stream).modifiers
+            for modifier, bound in zip(stream.modifiers, bound_modifiers):
+                key = (modifier.type, fast_json.dumps(modifier.options, sort_keys=True))
+                if key not in node.children:
+                    node.children[key] = ModifierNode(
+                        bound, modifier_handlers[modifier.type].pure_filter
+                    )
+                node = node.children[key]
+            node.streams.append(stream)
+        return root
+
+    def compile(self) -> SourcePlan:
+        _ = self.fetcher, self.paged, self.fetch_key, self.parser
+        _ = self.incremental, self.wants_bytes, self.modifier_tree
+        return self
+
+
+class StreamPlan:
+    def __init__(self, stream: Stream) -> None:
+        self.stream = stream
+
+    @cached_property
+    def receiver(self) -> Callable:
+        return get_handler_by_name(
+            type=HandlerType.receivers,
+            name=self.stream.receiver_type,
+            options=self.stream.receiver_options,
+        )
+
+    @cached_property
+    def modifiers(self) -> list[partial[Any]]:
+        return [
+            get_handler_by_name(
+                type=HandlerType.modifiers,
+                name=modifier.type,
+                options=modifier.options,
+            )
+            for modifier in self.stream.modifiers
+        ]
+
+    @cached_property
+    def pre_send_processors(self) -> list[Callable]:
+        return [
+            get_handler_by_name(
+                type=HandlerType.pre_send_processors,
+                name=processor.type,
+                options=processor.options,
+            )
+            for processor in self.stream.pre_send_processors
+        ]
+
+    def compile(self) -> StreamPlan:
+        _ = self.receiver, self.modifiers, self.pre_send_processors
+        return self
 
 
 HANDLERS: dict[HandlerType, dict[str, RawHandler]] = defaultdict(dict)
 REGISTERED_HANDLERS: dict[HandlerType, dict[str, Handler]] = {}
+# Handlers bound to their options are kept on the Source/Stream itself,
+# so they go away with the objects when the configuration is reloaded
+PLAN_ATTR = "_handlers_plan"
 
 
 def register_handler(
@@ -73,11 +245,27 @@ def register_handler(
     init_options: type[HandlerOptions] | None = None,
     options: type[HandlerOptions] | None = None,
     return_model: ReturnModel | None = None,
+    incremental: bool = False,
+    paged: bool = False,
+    wants_bytes: bool = False,
+    pure_filter: bool = False,
 ) -> Callable:
     def wrapper(func_or_class: Callable) -> Any:
         if type == HandlerType.parsers and not return_model:
             raise ValueError("Parsers must be registered with return_model")
 
+        if type != HandlerType.parsers and incremental:
+            raise ValueError("Only parsers can be incremental")
+
+        if type != HandlerType.fetchers and paged:
+            raise ValueError("Only fetchers can be paged")
+
+        if type != HandlerType.parsers and wants_bytes:
+            raise ValueError("Only parsers can take bytes")
+
+        if type != HandlerType.modifiers and pure_filter:
+            raise ValueError("Only modifiers can be pure filters")
+
         if not isclass(func_or_class) and init_options is not None:
             raise ValueError("init_options is not allowed for functions")
 
@@ -88,6 +276,10 @@ def register_handler(
             init_options_class=init_options,
             options_class=options,
             return_model=return_model,
+            incremental=incremental,
+            paged=paged,
+            wants_bytes=wants_bytes,
+            pure_filter=pure_filter,
         )
 
         return func_or_class
@@ -128,7 +320,7 @@ def init_registered_handlers(configuration: Configuration) -> None:  # noqa: C90
             return
         try:
             from_dict(options_class, options, config=Config(cast=[Enum]))
-        except DaciteError as e:
+        except (DaciteError, ValueError) as e:
             raise InitHandlersError(f"{error_msg}: {e}") from None
 
     used_handlers = set()
@@ -221,6 +413,10 @@ def init_registered_handlers(configuration: Configuration) -> None:  # noqa: C90
                 handler.obj(options=init_options),
                 handler.options_class,
                 handler.return_model,
+                handler.incremental,
+                handler.paged,
+                handler.wants_bytes,
+                handler.pure_filter,
             )
             handler_key = (handler_type, subhandler.name)
             options_class_by_key[handler_key] = handler.options_class
@@ -245,6 +441,10 @@ def init_registered_handlers(configuration: Configuration) -> None:  # noqa: C90
                 func_or_class,
                 handler.options_class,
                 handler.return_model,
+                handler.incremental,
+                handler.paged,
+                handler.wants_bytes,
+                handler.pure_filter,
             )
             handler_key = (handler_type, handler_id)
             options_class_by_key[handler_key] = handler.options_class
@@ -255,11 +455,42 @@ def init_registered_handlers(configuration: Configuration) -> None:  # noqa: C90
 
     REGISTERED_HANDLERS.update(result)
 
+    try:
+        for source in configuration.sources:
+            post_model = result[HandlerType.parsers][source.parser_type].return_model
+            for stream in source.streams:
+                stream_plan = StreamPlan(stream).compile()
+                for bound in stream_plan.modifiers:
+                    options = bound.keywords["options"]
+                    if post_model is not None and isinstance(options, HandlerOptions):
+                        options.check_post_model(post_model)
+                vars(stream)[PLAN_ATTR] = stream_plan
+            vars(source)[PLAN_ATTR] = SourcePlan(source).compile()
+    except (TypeError, ValueError) as e:
+        raise InitHandlersError(f"Error while binding handler options: {e}") from None
+
 
 def get_registered_handlers() -> dict[HandlerType, dict[str, Handler]]:
     return REGISTERED_HANDLERS
 
 
+def get_source_plan(source: Source) -> SourcePlan:
+    plan = vars(source).get(PLAN_ATTR)
+    # Copies of a source carry the plan of the original
+    if plan is None or plan.source is not source:
+        # Not from the loaded configuration (e.g. built by hand),
+        # handlers are bound on first use
+        plan = vars(source)[PLAN_ATTR] = SourcePlan(source)
+    return plan
+
+
+def get_stream_plan(stream: Stream) -> StreamPlan:
+    plan = vars(stream).get(PLAN_ATTR)
+    if plan is None or plan.stream is not stream:
+        plan = vars(stream)[PLAN_ATTR] = StreamPlan(stream)
+    return plan
+
+
 def _load_modules(package: ModuleType) -> None:
     for module_name in _parse_modules(package):
         importlib.import_module(f".{module_name}", package=package.__name__)
@@ -275,7 +506,7 @@ def get_handler_by_name(
     type: HandlerType, name: str, options: dict | None = None
 ) -> Any:
     registered_handlers = get_registered_handlers()
-    handler = dict(registered_handlers[type])[name]
+    handler = registered_handlers[type][name]
     options_ = None
     if options and handler.options_class:
         options_ = handler.options_class(**options)
@@ -284,7 +515,7 @@ def get_handler_by_name(
 
 def get_handler_return_model_by_name(type: HandlerType, name: str) -> ReturnModel:
     registered_handlers = get_registered_handlers()
-    handler = dict(registered_handlers[type])[name]
+    handler = registered_handlers[type][name]
     if handler.return_model is None:
         raise ValueError(f"Handler {name} does not have return model")
     return handler.return_model
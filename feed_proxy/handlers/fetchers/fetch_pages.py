@@ -0,0 +1,84 @@
+import asyncio
+import dataclasses
+import logging
+from collections.abc import AsyncGenerator
+
+from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+from feed_proxy.handlers.fetchers.fetch_text import (
+    RequestsLimiter,
+    TextFetcherInitOptions,
+)
+from feed_proxy.logic import fetch_body_from_url
+from feed_proxy.utils.http import DEFAULT_MAX_BYTES, FetchedBody
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class FetchPagesOptions(HandlerOptions):
+    DESCRIPTIONS = {
+        "url": ("URL with {page} placeholder for page number", ""),
+        "max_pages": ("How many pages to fetch at most", ""),
+        "first_page": ("Number of the first page", ""),
+        "concurrent": ("Request all pages at once instead of one by one", ""),
+        "encoding": ("Page encoding", ""),
+        "impersonate": ("Browser to impersonate (e.g. firefox, chrome)", ""),
+        "max_bytes": ("Skip responses larger than this many bytes, 0 - no limit", ""),
+    }
+
+    url: str
+    max_pages: int = 3
+    first_page: int = 1
+    concurrent: bool = False
+    encoding: str = ""
+    impersonate: str = ""
+    max_bytes: int = DEFAULT_MAX_BYTES
+
+
+@register_handler(
+    type=HandlerType.fetchers,
+    name="fetch_pages",
+    init_options=TextFetcherInitOptions,
+    options=FetchPagesOptions,
+    paged=True,
+)
+class PagesFetcher:
+    def __init__(self, *, options: TextFetcherInitOptions) -> None:
+        self._requests_limiter = RequestsLimiter()
+        self._pause_between_domain_calls_sec = options.pause_between_domain_calls_sec
+
+    async def __call__(
+        self, *, options: FetchPagesOptions
+    ) -> AsyncGenerator[FetchedBody | None, None]:
+        # Pages are yielded in order, consumer stops when it has enough of them
+        urls = [
+            options.url.replace("{page}", str(page))
+            for page in range(
+                options.first_page, options.first_page + options.max_pages
+            )
+        ]
+        if not options.concurrent:
+            for url in urls:
+                async with self._requests_limiter(
+                    url, self._pause_between_domain_calls_sec
+                ):
+                    body = await self._fetch(url, options)
+                yield body
+            return
+
+        # Pages are requested at once, as one call to the domain
+        async with self._requests_limiter(
+            options.url, self._pause_between_domain_calls_sec
+        ):
+            bodies = await asyncio.gather(*(self._fetch(url, options) for url in urls))
+        for body in bodies:
+            yield body
+
+    async def _fetch(self, url: str, options: FetchPagesOptions) -> FetchedBody | None:
+        return await fetch_body_from_url(
+            url,
+            encoding=options.encoding,
+            retry=2,
+            impersonate=options.impersonate,
+            max_bytes=options.max_bytes,
+        )
@@ -2,12 +2,19 @@ import asyncio
 import dataclasses
 import logging
 import time
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Callable
 from contextlib import asynccontextmanager
+from typing import Literal
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
+from picodi import Provide, inject
+
+from feed_proxy.deps import get_fetch_cursor_storage
 from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
-from feed_proxy.logic import fetch_text_from_url
-from feed_proxy.utils.http import domain_from_url
+from feed_proxy.logic import fetch_body_from_url
+from feed_proxy.storage import FetchCursor, FetchCursorStorage
+from feed_proxy.utils import fast_json
+from feed_proxy.utils.http import DEFAULT_MAX_BYTES, FetchedBody, domain_from_url
 
 logger = logging.getLogger(__name__)
 
@@ -23,11 +30,21 @@ class FetchTextOptions(HandlerOptions):
         "url": ("URL", ""),
         "encoding": ("Page encoding", ""),
         "impersonate": ("Browser to impersonate (e.g. firefox, chrome)", ""),
+        "max_bytes": ("Skip responses larger than this many bytes, 0 - no limit", ""),
+        "cursor": ("API to request only new items from (reddit, wordpress)", ""),
+        "full_fetch_every": ("Make a full request after this many cursor ones", ""),
     }
 
     url: str
     encoding: str = ""
     impersonate: str = ""
+    max_bytes: int = DEFAULT_MAX_BYTES
+    cursor: Literal["", "reddit", "wordpress"] = ""
+    full_fetch_every: int = 6
+
+    @property
+    def per_source(self) -> bool:
+        return bool(self.cursor)
 
 
 @register_handler(
@@ -38,22 +55,121 @@ class FetchTextOptions(HandlerOptions):
 )
 class TextFetcher:
     def __init__(self, *, options: TextFetcherInitOptions) -> None:
-        self._requests_limiter = _RequestsLimiter()
+        self._requests_limiter = RequestsLimiter()
         self._pause_between_domain_calls_sec = options.pause_between_domain_calls_sec
 
-    async def __call__(self, *, options: FetchTextOptions) -> str | None:
-        async with self._requests_limiter(
-            options.url, self._pause_between_domain_calls_sec
-        ):
-            return await fetch_text_from_url(
-                options.url,
+    async def __call__(
+        self, *, options: FetchTextOptions, source_id: str = ""
+    ) -> FetchedBody | None:
+        if not options.cursor:
+            return await self._fetch(options.url, options)
+
+        api = CURSOR_APIS[options.cursor]
+        cursors = _get_cursor_storage()
+        state = await cursors.get(source_id, options.url) or FetchCursor()
+        # Cursor requests miss items if the newest one is deleted or many were
+        # published at once, so the whole listing is requested from time to time
+        if state.cursor is None or state.fetches_since_full >= options.full_fetch_every:
+            url = options.url
+            state.fetches_since_full = 0
+        else:
+            url = _with_query_params(options.url, {api.param: state.cursor})
+            state.fetches_since_full += 1
+
+        body = await self._fetch(url, options)
+        if body and body.content:
+            try:
+                newest = api.read_newest(body.content)
+            except ValueError:
+                logger.warning("Can't read cursor from %s response", options.url)
+                newest = None
+            if newest is not None:
+                state.cursor = newest
+        await cursors.put(source_id, options.url, state)
+        return body
+
+    async def _fetch(self, url: str, options: FetchTextOptions) -> FetchedBody | None:
+        async with self._requests_limiter(url, self._pause_between_domain_calls_sec):
+            return await fetch_body_from_url(
+                url,
                 encoding=options.encoding,
                 retry=2,
                 impersonate=options.impersonate,
+                max_bytes=options.max_bytes,
             )
 
 
-class _RequestsLimiter:
+@inject
+def _get_cursor_storage(
+    storage: FetchCursorStorage = Provide(get_fetch_cursor_storage),
+) -> FetchCursorStorage:
+    return storage
+
+
+@dataclasses.dataclass(frozen=True)
+class CursorApi:
+    # Query parameter that limits response to items newer than the cursor
+    param: str
+    # Returns cursor of the newest item of response, None if it's empty
+    read_newest: Callable[[bytes], str | None]
+
+
+@dataclasses.dataclass()
+class _RedditChildData:
+    name: str
+
+
+@dataclasses.dataclass()
+class _RedditChild:
+    data: _RedditChildData
+
+
+@dataclasses.dataclass()
+class _RedditListingData:
+    children: list[_RedditChild]
+
+
+@dataclasses.dataclass()
+class _RedditListing:
+    data: _RedditListingData
+
+
+def _read_newest_reddit(content: bytes) -> str | None:
+    # Listings are ordered from newest to oldest, `before` takes fullname
+    listing: _RedditListing = fast_json.loads_as(content, _RedditListing)
+    if not listing.data.children:
+        return None
+    return listing.data.children[0].data.name
+
+
+@dataclasses.dataclass()
+class _WordpressEntry:
+    date: str
+
+
+def _read_newest_wordpress(content: bytes) -> str | None:
+    # `after` is compared with publish dates in the site timezone,
+    # the same as `date` field
+    entries: list[_WordpressEntry] = fast_json.loads_as(content, list[_WordpressEntry])
+    if not entries:
+        return None
+    return max(entry.date for entry in entries)
+
+
+CURSOR_APIS = {
+    "reddit": CursorApi(param="before", read_newest=_read_newest_reddit),
+    "wordpress": CursorApi(param="after", read_newest=_read_newest_wordpress),
+}
+
+
+def _with_query_params(url: str, params: dict[str, str]) -> str:
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key not in params]
+    query.extend(params.items())
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class RequestsLimiter:
     def __init__(self) -> None:
         self.domains: dict[str, float] = {}
         self.locks: dict[str, asyncio.Lock] = {}
@@ -45,6 +45,7 @@ class ComparisonOptions(HandlerOptions):
 @register_handler(
     type=HandlerType.modifiers,
     options=ComparisonOptions,
+    pure_filter=True,
 )
 async def compare_and_filter(
     posts: list[Post], *, options: ComparisonOptions
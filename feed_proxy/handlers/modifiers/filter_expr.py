@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import ast
+import dataclasses
+import logging
+import operator
+import re
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+
+if TYPE_CHECKING:
+    from feed_proxy.entities import Post
+
+logger = logging.getLogger(__name__)
+
+Getter = Callable[["Post"], Any]
+
+_MISSING = object()
+# Digits with thousands and decimal separators: "1.200", "1 200,50", "1'200"
+NUMBER_RE = re.compile(r"-?\d(?:[\d.,']|\s(?=\d))*")
+
+COMPARISON_OPERATORS: dict[type[ast.cmpop], Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+class FilterExpressionError(ValueError):
+    pass
+
+
+@dataclasses.dataclass
+class FilterExprOptions(HandlerOptions):
+    DESCRIPTIONS = {
+        "expression": (
+            "Expression",
+            "Posts for which expression is true are kept, e.g."
+            " `score > 100 and not matches(title, '(?i)sponsored')`",
+        ),
+    }
+
+    expression: str
+    # Annotation is resolved by dacite at config load, where Post isn't imported
+    predicate: Callable[..., bool] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        # Compiled once, when options are bound at configuration load
+        self.predicate = compile_expression(self.expression)
+
+    def check_post_model(self, model: type[Post]) -> None:
+        fields = {field.name for field in dataclasses.fields(model)}
+        if unknown := sorted(expression_names(self.expression) - fields):
+            raise FilterExpressionError(
+                f"Unknown names {', '.join(unknown)} in filter expression"
+                f" {self.expression!r}, use extras.<name> for extras"
+            )
+
+
+@register_handler(
+    type=HandlerType.modifiers,
+    options=FilterExprOptions,
+    pure_filter=True,
+)
+async def filter_expr(posts: list[Post], *, options: FilterExprOptions) -> list[Post]:
+    predicate = options.predicate
+    return [post for post in posts if predicate(post)]
+
+
+def compile_expression(expression: str) -> Callable[[Post], bool]:
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise FilterExpressionError(
+            f"Invalid filter expression {expression!r}: {e.msg}"
+        ) from None
+    getter = _compile(tree.body)
+    return lambda post: bool(getter(post))
+
+
+def expression_names(expression: str) -> set[str]:
+    # Names of post fields used in the expression, without functions and extras
+    tree = ast.parse(expression.strip(), mode="eval")
+    not_fields = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            not_fields.add(id(node.func))
+        elif isinstance(node, (ast.Attribute, ast.Subscript)) and _is_extras_access(
+            node
+        ):
+            not_fields.add(id(node.value))
+    return {
+        node.id
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and id(node) not in not_fields
+    }
+
+
+def _compile(node: ast.expr) -> Getter:  # noqa: C901
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda post: all(operand(post) for operand in operands)
+        return lambda post: any(operand(post) for operand in operands)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile(node.operand)
+        return lambda post: not operand(post)
+    if isinstance(node, ast.Compare):
+        return _compile_compare(node)
+    if isinstance(node, ast.Call):
+        return _compile_call(node)
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda post: _get_field(post, name)
+    if _is_extras_access(node):
+        key = _extras_key(node)
+        return lambda post: (getattr(post, "extras", None) or {}).get(key)
+    value = _constant(node)
+    return lambda post: value  # noqa: U100
+
+
+def _compile_compare(node: ast.Compare) -> Getter:
+    operands = [node.left, *node.comparators]
+    pairs = []
+    for left, op, right in zip(operands, node.ops, operands[1:]):
+        left_getter, right_getter = _compile(left), _compile(right)
+        # Fields are strings in many feeds, they are compared with numbers
+        # as numbers
+        if _is_number(right) and not _is_number(left):
+            left_getter = _as_number(left_getter)
+        elif _is_number(left) and not _is_number(right):
+            right_getter = _as_number(right_getter)
+        pairs.append((left_getter, COMPARISON_OPERATORS[type(op)], right_getter))
+
+    def compare(post: Post) -> bool:
+        for left_getter, op, right_getter in pairs:
+            try:
+                if not op(left_getter(post), right_getter(post)):
+                    return False
+            except TypeError:
+                # E.g. missing field compared with a number
+                return False
+        return True
+
+    return compare
+
+
+def _compile_call(node: ast.Call) -> Getter:
+    func = node.func.id if isinstance(node.func, ast.Name) else ""
+    if node.keywords:
+        raise FilterExpressionError(f"Unsupported call: {ast.unparse(node)}")
+    if func == "matches" and len(node.args) == 2:
+        value_getter = _compile(node.args[0])
+        pattern_value = _constant(node.args[1])
+        if not isinstance(pattern_value, str):
+            raise FilterExpressionError("matches() pattern must be a string")
+        try:
+            pattern = re.compile(pattern_value)
+        except re.error as e:
+            raise FilterExpressionError(
+                f"Invalid pattern {pattern_value!r}: {e}"
+            ) from None
+
+        def matches(post: Post) -> bool:
+            value = value_getter(post)
+            return value is not None and pattern.search(str(value)) is not None
+
+        return matches
+    if func == "lower" and len(node.args) == 1:
+        value_getter = _compile(node.args[0])
+        return lambda post: (
+            None if (v := value_getter(post)) is None else str(v).lower()
+        )
+    if func == "number" and len(node.args) == 1:
+        return _as_number(_compile(node.args[0]))
+    raise FilterExpressionError(f"Unsupported call: {ast.unparse(node)}")
+
+
+def _constant(node: ast.expr) -> Any:
+    if isinstance(node, ast.Constant) and (
+        node.value is None or isinstance(node.value, (str, int, float))
+    ):
+        return node.value
+    if (
+        isinstance(node, ast.UnaryOp)
+        and isinstance(node.op, ast.USub)
+        and _is_number(node.operand)
+    ):
+        return -node.operand.value  # type: ignore[attr-defined]
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return frozenset(_constant(element) for element in node.elts)
+    raise FilterExpressionError(f"Unsupported expression: {ast.unparse(node)}")
+
+
+def _is_number(node: ast.expr) -> bool:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        node = node.operand
+    return (
+        isinstance(node, ast.Constant)
+        and isinstance(node.value, (int, float))
+        and not isinstance(node.value, bool)
+    )
+
+
+def _as_number(getter: Getter) -> Getter:
+    return lambda post: parse_number(getter(post))
+
+
+def parse_number(value: Any) -> float | None:
+    # Prices and counters come formatted, e.g. "1.200€", "$1,200.50", "1 200 zł"
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    match = NUMBER_RE.search(str(value))
+    if match is None:
+        return None
+    number = re.sub(r"[\s']", "", match.group()).rstrip(".,")
+    if "," in number and "." in number:
+        # The last separator is the decimal one
+        thousands = "," if number.rfind(",") < number.rfind(".") else "."
+        number = number.replace(thousands, "").replace(",", ".")
+    elif separator := next((sep for sep in ",." if sep in number), None):
+        integer, *groups = number.split(separator)
+        # A single separator before exactly three digits groups thousands,
+        # unless the integer part is 0, e.g. "1,200" but "0,250" and "1,5"
+        if len(groups) > 1 or (
+            len(groups[0]) == 3 and integer.lstrip("-") not in ("", "0")
+        ):
+            number = number.replace(separator, "")
+        else:
+            number = number.replace(separator, ".")
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def _is_extras_access(node: ast.expr) -> bool:
+    if isinstance(node, ast.Attribute):
+        return isinstance(node.value, ast.Name) and node.value.id == "extras"
+    if isinstance(node, ast.Subscript):
+        return (
+            isinstance(node.value, ast.Name)
+            and node.value.id == "extras"
+            and isinstance(node.slice, ast.Constant)
+            and isinstance(node.slice.value, str)
+        )
+    return False
+
+
+def _extras_key(node: ast.expr) -> str:
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    assert isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant)
+    return str(node.slice.value)
+
+
+def _get_field(post: Post, name: str) -> Any:
+    value = getattr(post, name, _MISSING)
+    if value is not _MISSING:
+        return value
+    # Unknown names are looked up in extras, so `price` works as `extras.price`
+    return (getattr(post, "extras", None) or {}).get(name)
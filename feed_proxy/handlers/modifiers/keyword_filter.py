@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+from typing import TYPE_CHECKING, Any, Literal
+
+from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+from feed_proxy.utils.keywords import KeywordMatcher, get_keyword_matcher
+
+if TYPE_CHECKING:
+    from feed_proxy.entities import Post
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class KeywordFilterOptions(HandlerOptions):
+    DESCRIPTIONS = {
+        "keywords": ("Keywords", "List of keywords to look for"),
+        "mode": (
+            "Mode",
+            "exclude - drop posts with any of keywords,"
+            " include - keep only posts with any of keywords",
+        ),
+        "fields": ("Fields", "Post fields or extras to look in"),
+        "ignore_case": ("Ignore case", ""),
+        "whole_words": ("Whole words", "Match keywords only as whole words"),
+    }
+
+    keywords: list[str]
+    mode: Literal["exclude", "include"] = "exclude"
+    fields: list[str] = dataclasses.field(
+        default_factory=lambda: ["title", "description"]
+    )
+    ignore_case: bool = True
+    whole_words: bool = False
+    matcher: KeywordMatcher = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.matcher = get_keyword_matcher(
+            tuple(self.keywords),
+            ignore_case=self.ignore_case,
+            whole_words=self.whole_words,
+        )
+
+
+@register_handler(
+    type=HandlerType.modifiers,
+    options=KeywordFilterOptions,
+    pure_filter=True,
+)
+async def keyword_filter(
+    posts: list[Post], *, options: KeywordFilterOptions
+) -> list[Post]:
+    keep_matched = options.mode == "include"
+    return [
+        post
+        for post in posts
+        if _has_keyword(post, options.fields, options.matcher) is keep_matched
+    ]
+
+
+def _has_keyword(post: Post, fields: list[str], matcher: KeywordMatcher) -> bool:
+    for field in fields:
+        value = _get_field(post, field)
+        if value and matcher.matches(str(value)):
+            return True
+    return False
+
+
+def _get_field(post: Post, name: str) -> Any:
+    if hasattr(post, name):
+        return getattr(post, name)
+    return (getattr(post, "extras", None) or {}).get(name)
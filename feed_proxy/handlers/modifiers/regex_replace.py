@@ -23,6 +23,14 @@ class RegexReplaceOptions(HandlerOptions):
     pattern: str
     replacement: str = ""
     dotall: bool = False
+    compiled: re.Pattern[str] = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Compiled once, when options are bound at configuration load
+        try:
+            self.compiled = re.compile(self.pattern, re.DOTALL if self.dotall else 0)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern {self.pattern!r}: {e}") from None
 
 
 @register_handler(
@@ -32,7 +40,7 @@ class RegexReplaceOptions(HandlerOptions):
 async def regex_replace(
     posts: list[Post], *, options: RegexReplaceOptions
 ) -> list[Post]:
-    compiled = re.compile(options.pattern, re.DOTALL if options.dotall else 0)
+    compiled = options.compiled
 
     def replace_in_post(post: Post) -> Post:
         value = getattr(post, options.field) or ""
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import dataclasses
+import re
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+
+if TYPE_CHECKING:
+    from feed_proxy.entities import Post
+
+Step = Callable[[str], str]
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplaceRule:
+    old: str = ""
+    pattern: str = ""
+    new: str = ""
+    dotall: bool = False
+
+    def __post_init__(self) -> None:
+        if bool(self.old) == bool(self.pattern):
+            raise ValueError("Replace rule needs either old or pattern")
+
+
+@dataclasses.dataclass
+class ReplaceManyOptions(HandlerOptions):
+    DESCRIPTIONS = {
+        "fields": ("Fields", "Field names"),
+        "rules": (
+            "Rules",
+            "List of {old, new} (text) or {pattern, new, dotall} (regex) rules,"
+            " applied in order",
+        ),
+    }
+
+    fields: list[str]
+    rules: list[dict[str, Any]]
+    steps: list[Step] = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        try:
+            rules = [ReplaceRule(**rule) for rule in self.rules]
+        except TypeError as e:
+            raise ValueError(f"Invalid replace rule: {e}") from None
+        self.steps = compile_rules(rules)
+
+
+@register_handler(
+    type=HandlerType.modifiers,
+    options=ReplaceManyOptions,
+)
+async def replace_many(posts: list[Post], *, options: ReplaceManyOptions) -> list[Post]:
+    steps = options.steps
+    for post in posts:
+        for field in options.fields:
+            value = getattr(post, field)
+            if not value:
+                continue
+            for step in steps:
+                value = step(value)
+            setattr(post, field, value)
+    return posts
+
+
+def compile_rules(rules: list[ReplaceRule]) -> list[Step]:
+    steps: list[Step] = []
+    group: list[ReplaceRule] = []
+    for rule in rules:
+        if rule.old and all(_can_fuse(earlier, rule) for earlier in group):
+            group.append(rule)
+            continue
+        if group:
+            steps.append(_compile_literals(group))
+            group = []
+        if rule.old:
+            group.append(rule)
+        else:
+            steps.append(_compile_pattern(rule))
+    if group:
+        steps.append(_compile_literals(group))
+    return steps
+
+
+def _can_fuse(earlier: ReplaceRule, later: ReplaceRule) -> bool:
+    # Text rules are applied together, in one pass, only if it gives
+    # the same result as applying them one by one: their matches can't
+    # overlap and the later rule can't match text changed by the earlier one
+    if _can_overlap(earlier.old, later.old):
+        return False
+    if set(earlier.new) & set(later.old):
+        return False
+    # Removed text joins its neighbours, which can make a new match
+    return bool(earlier.new) or len(later.old) == 1
+
+
+def _can_overlap(a: str, b: str) -> bool:
+    if a in b or b in a:
+        return True
+    return any(a.endswith(b[:size]) for size in range(1, len(b))) or any(
+        b.endswith(a[:size]) for size in range(1, len(a))
+    )
+
+
+def _compile_literals(rules: list[ReplaceRule]) -> Step:
+    replacements = {rule.old: rule.new for rule in rules}
+    if all(len(old) == 1 for old in replacements):
+        table = str.maketrans(replacements)
+        return lambda value: value.translate(table)
+    compiled = re.compile("|".join(map(re.escape, replacements)))
+    return lambda value: compiled.sub(lambda m: replacements[m.group()], value)
+
+
+def _compile_pattern(rule: ReplaceRule) -> Step:
+    try:
+        compiled = re.compile(rule.pattern, re.DOTALL if rule.dotall else 0)
+    except re.error as e:
+        raise ValueError(f"Invalid pattern {rule.pattern!r}: {e}") from None
+    return lambda value: compiled.sub(rule.new, value)
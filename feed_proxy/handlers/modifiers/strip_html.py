@@ -1,25 +1,40 @@
 from __future__ import annotations
 
 import dataclasses
-from typing import TYPE_CHECKING
+import re
+from typing import TYPE_CHECKING, Literal
 
 from bs4 import BeautifulSoup
+from lxml import etree
 
 from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
 
 if TYPE_CHECKING:
     from feed_proxy.entities import Post
 
+# Text without these is returned by the parser as is
+_NEEDS_PARSING = re.compile("[<&\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+# What BeautifulSoup does with strings, see `_TextCollector`
+_ASCII_SPACES = " \n\t\x0c\r"
+_NOT_TEXT_TAGS = frozenset(("rp", "rt", "script", "style", "template"))
+_PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "textarea"))
+
 
 @dataclasses.dataclass
 class StripHtmlOptions(HandlerOptions):
     DESCRIPTIONS = {
         "field": ("Field", "Field name"),
         "separator": ("Separator", "String inserted between text from adjacent tags"),
+        "engine": (
+            "Engine",
+            "lxml (faster) or bs4, both produce the same text",
+        ),
     }
 
     field: str
     separator: str = " "
+    engine: Literal["lxml", "bs4"] = "lxml"
 
 
 @register_handler(
@@ -27,10 +42,83 @@ class StripHtmlOptions(HandlerOptions):
     options=StripHtmlOptions,
 )
 async def strip_html(posts: list[Post], *, options: StripHtmlOptions) -> list[Post]:
+    get_text = _get_text_lxml if options.engine == "lxml" else _get_text_bs4
+
     def strip_in_post(post: Post) -> Post:
         value = getattr(post, options.field) or ""
-        text = BeautifulSoup(value, "lxml").get_text(separator=options.separator)
-        setattr(post, options.field, text.strip())
+        if _NEEDS_PARSING.search(value):
+            value = get_text(value, options.separator)
+        setattr(post, options.field, value.strip())
         return post
 
     return [strip_in_post(post) for post in posts]
+
+
+def _get_text_bs4(value: str, separator: str) -> str:
+    return BeautifulSoup(value, "lxml").get_text(separator=separator)
+
+
+def _get_text_lxml(value: str, separator: str) -> str:
+    # Same parser and events as BeautifulSoup(value, "lxml") uses,
+    # but without building the tree
+    if value.startswith("\N{BYTE ORDER MARK}"):
+        value = value[1:]
+    parser = etree.HTMLParser(target=_TextCollector(), recover=True)
+    parser.feed(value)
+    return separator.join(parser.close())
+
+
+class _TextCollector:
+    # Follows BeautifulSoup.endData and Tag.get_text: whitespace-only strings
+    # are collapsed outside of <pre>/<textarea>, text of script-like tags,
+    # comments, doctypes and processing instructions is skipped
+    def __init__(self) -> None:
+        self._strings: list[str] = []
+        self._data: list[str] = []
+        self._tags: list[str] = []
+        self._not_text_depth = 0
+        self._preserve_whitespace_depth = 0
+
+    def start(
+        self, tag: str, attrib: object, nsmap: object = None  # noqa: U100
+    ) -> None:
+        self._end_data()
+        self._tags.append(tag)
+        self._count_tag(tag, 1)
+
+    def end(self, tag: str) -> None:  # noqa: U100
+        self._end_data()
+        self._count_tag(self._tags.pop(), -1)
+
+    def data(self, data: str) -> None:
+        self._data.append(data)
+
+    def comment(self, text: str) -> None:  # noqa: U100
+        self._end_data()
+
+    def pi(self, target: str, data: str) -> None:  # noqa: U100
+        self._end_data()
+
+    def doctype(self, name: str, pubid: str, system: str) -> None:  # noqa: U100
+        self._end_data()
+
+    def close(self) -> list[str]:
+        self._end_data()
+        return self._strings
+
+    def _count_tag(self, tag: str, delta: int) -> None:
+        if tag in _NOT_TEXT_TAGS:
+            self._not_text_depth += delta
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self._preserve_whitespace_depth += delta
+
+    def _end_data(self) -> None:
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        if self._not_text_depth:
+            return
+        if not self._preserve_whitespace_depth and not text.strip(_ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        self._strings.append(text)
@@ -7,12 +7,21 @@ from typing import Any
 
 from feed_proxy.entities import Post
 from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+from feed_proxy.utils import fast_json
 from feed_proxy.utils.text import make_hash_tags
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://www.fotocasa.es"
 
+JSON_DECODER = json.JSONDecoder(strict=False)
+INITIAL_PROPS_MARKER = "window.__INITIAL_PROPS__"
+INITIAL_PROPS_RE = re.compile(r"window\.__INITIAL_PROPS__\s*=\s*JSON\.parse\(")
+JS_STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+JS_ESCAPE_RE = re.compile(r"\\(?:([\\\"/bfnrtu])|x([0-9a-fA-F]{2})|(.))", re.DOTALL)
+# Escapes that are valid in JS string literals but not in JSON
+JS_ONLY_ESCAPES = {"v": "\\u000b", "0": "\\u0000", "'": "'", "\n": "", "\r": ""}
+
 BUILDING_TYPES = {
     "Flat": "Piso",
     "House": "Casa",
@@ -67,25 +76,14 @@ def _parse_fotocasa(html: str) -> list[FotocasaItem]:
     if not html:
         return items
 
-    # Try to parse JSON from __INITIAL_PROPS__
-    match = re.search(
-        r'window\.__INITIAL_PROPS__\s*=\s*JSON\.parse\("(.+?)"\)', html, re.DOTALL
-    )
-    if not match:
-        logger.warning("Could not find __INITIAL_PROPS__ in Fotocasa HTML")
-        return items
-
     try:
-        json_str = match.group(1)
-        json_str = json_str.encode().decode("unicode_escape")
-        data = json.loads(json_str)
-    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        real_estates = _extract_real_estates(html)
+    except ValueError as e:
         logger.exception("Failed to parse Fotocasa JSON: %s", e)
         return items
-
-    real_estates = (
-        data.get("initialSearch", {}).get("result", {}).get("realEstates", [])
-    )
+    if real_estates is None:
+        logger.warning("Could not find __INITIAL_PROPS__ in Fotocasa HTML")
+        return items
 
     for estate in real_estates:
         try:
@@ -120,6 +118,51 @@ def _parse_fotocasa(html: str) -> list[FotocasaItem]:
     return items
 
 
+def _extract_real_estates(html: str) -> list[dict] | None:
+    marker = html.find(INITIAL_PROPS_MARKER)
+    match = INITIAL_PROPS_RE.match(html, marker) if marker != -1 else None
+    if not match:
+        return None
+    # Only the JS literal needs the lenient stdlib decoder, the JSON in it
+    # goes through the fast one
+    props = fast_json.loads(_decode_js_string(html, match.end()))
+    if not isinstance(props, dict):
+        raise ValueError("__INITIAL_PROPS__ is not an object")
+
+    value: Any = props
+    for key in ("initialSearch", "result", "realEstates"):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value if isinstance(value, list) else []
+
+
+def _decode_js_string(text: str, pos: int) -> str:
+    try:
+        # Most of the time the JS literal is a valid JSON string,
+        # decode it in place without copying
+        value, _ = JSON_DECODER.raw_decode(text, pos)
+    except json.JSONDecodeError:
+        match = JS_STRING_RE.match(text, pos)
+        if not match:
+            raise ValueError("JSON.parse argument is not a string literal") from None
+        literal = JS_ESCAPE_RE.sub(_js_escape_to_json, match.group())
+        value = json.loads(literal, strict=False)
+    if not isinstance(value, str):
+        raise ValueError("JSON.parse argument is not a string literal")
+    return value
+
+
+def _js_escape_to_json(match: re.Match) -> str:
+    json_escape, hex_code, js_escape = match.groups()
+    if json_escape:
+        return match.group()
+    if hex_code:
+        return f"\\u00{hex_code}"
+    if js_escape in JS_ONLY_ESCAPES:
+        return JS_ONLY_ESCAPES[js_escape]
+    # Any other escaped character stands for itself in JS
+    return json.dumps(js_escape)[1:-1]
+
+
 def _build_title(estate: dict) -> str:
     building_type = estate.get("buildingType", "")
     building_type_es = BUILDING_TYPES.get(building_type, building_type)
@@ -3,7 +3,8 @@ import dataclasses
 import logging
 from typing import Any
 
-from bs4 import BeautifulSoup, Tag
+import lxml.html
+from lxml import etree
 
 from feed_proxy.entities import Post
 from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
@@ -14,6 +15,21 @@ logger = logging.getLogger(__name__)
 BASE_URL = "https://www.idealista.com"
 
 
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+ARTICLES_XPATH = etree.XPath(f"//article[{_has_class('item')}]")
+LINK_XPATH = etree.XPath(f"descendant::a[{_has_class('item-link')}][1]")
+PRICE_XPATH = etree.XPath(f"descendant::*[{_has_class('item-price')}][1]")
+DETAILS_XPATH = etree.XPath(f"descendant::*[{_has_class('item-detail')}]")
+# Text as BeautifulSoup sees it: comments and contents of scripts are skipped
+TEXT_XPATH = etree.XPath(
+    "descendant::text()[not(parent::script or parent::style or parent::template)]",
+    smart_strings=False,
+)
+
+
 @dataclasses.dataclass()
 class IdealistaItem(Post):
     post_id: str
@@ -57,21 +73,25 @@ def _parse_idealista(html: str) -> list[IdealistaItem]:
     if not html:
         return items
 
-    soup = BeautifulSoup(html, "lxml")
+    try:
+        document = lxml.html.document_fromstring(html)
+    except etree.ParserError:
+        logger.warning("Idealista page is empty")
+        return items
 
-    for article in soup.select("article.item"):
+    for article in ARTICLES_XPATH(document):
         try:
-            link_el = article.select_one("a.item-link")
-            if not link_el:
+            link_el = next(iter(LINK_XPATH(article)), None)
+            if link_el is None:
                 continue
 
-            href = str(link_el.get("href", ""))
+            href = link_el.get("href", "")
             url = href if href.startswith("http") else f"{BASE_URL}{href}"
 
-            title = link_el.get_text(strip=True)
+            title = _get_text(link_el)
 
-            price_el = article.select_one(".item-price")
-            money = price_el.get_text(strip=True) if price_el else ""
+            price_el = next(iter(PRICE_XPATH(article)), None)
+            money = _get_text(price_el) if price_el is not None else ""
 
             details = _extract_details(article)
             post_id = _make_post_id(_extract_post_id_from_url(url), money)
@@ -87,7 +107,10 @@ def _parse_idealista(html: str) -> list[IdealistaItem]:
                 )
             )
         except Exception:  # noqa: PIE786
-            logger.exception("Failed to parse Idealista item: %s", article)
+            logger.exception(
+                "Failed to parse Idealista item: %s",
+                etree.tostring(article, encoding="unicode"),
+            )
 
     return items
 
@@ -103,12 +126,17 @@ def _make_post_id(id_from_url: str, money: str) -> str:
     return f"{id_from_url}_{money}"
 
 
-def _extract_details(article: Tag) -> list[str]:
+def _extract_details(article: etree._Element) -> list[str]:
     details = []
 
-    for detail_el in article.select(".item-detail"):
-        text = detail_el.get_text(strip=True)
+    for detail_el in DETAILS_XPATH(article):
+        text = _get_text(detail_el)
         if text:
             details.append(text)
 
     return details
+
+
+def _get_text(element: etree._Element) -> str:
+    # Same as BeautifulSoup's get_text(strip=True)
+    return "".join(text.strip() for text in TEXT_XPATH(element))
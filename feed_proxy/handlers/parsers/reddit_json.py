@@ -1,10 +1,10 @@
 import dataclasses
-import json
 import logging
 from typing import Any
 
 from feed_proxy.entities import Post
 from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+from feed_proxy.utils import fast_json
 from feed_proxy.utils.text import make_hash_tags
 
 logger = logging.getLogger(__name__)
@@ -36,22 +36,48 @@ class RedditPost(Post):
         return {**base, **self.extras}
 
 
+# Only the fields used by RedditPost are decoded from the listing
+@dataclasses.dataclass()
+class RedditPostData:
+    id: str
+    title: str
+    url: str
+    permalink: str
+    score: int
+
+
+@dataclasses.dataclass()
+class RedditChild:
+    data: RedditPostData
+
+
+@dataclasses.dataclass()
+class RedditListingData:
+    children: list[RedditChild]
+
+
+@dataclasses.dataclass()
+class RedditListing:
+    data: RedditListingData
+
+
 @register_handler(
     type=HandlerType.parsers,
     return_model=RedditPost,
+    wants_bytes=True,
 )
 async def reddit_json(
-    text: str, *, options: HandlerOptions | None = None  # noqa: U100
+    text: str | bytes, *, options: HandlerOptions | None = None  # noqa: U100
 ) -> list[RedditPost]:
-    raw_post = json.loads(text)
+    listing: RedditListing = fast_json.loads_as(text, RedditListing)
     return [
         RedditPost(
-            post_id=entry["data"]["id"],
-            title=entry["data"]["title"],
-            url=entry["data"]["url"],
-            comments_url=f"https://reddit.com{entry['data']['permalink']}",
-            score=entry["data"]["score"],
+            post_id=child.data.id,
+            title=child.data.title,
+            url=child.data.url,
+            comments_url=f"https://reddit.com{child.data.permalink}",
+            score=child.data.score,
             source_tags=[],
         )
-        for entry in raw_post["data"]["children"]
+        for child in listing.data.children
     ]
@@ -2,16 +2,99 @@ import asyncio
 import dataclasses
 import json
 import logging
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
 from typing import Any
 
 import feedparser
+from feedparser.mixin import _FeedParserMixin
+from feedparser.sanitizer import _sanitize_html
+from lxml import etree
 
 from feed_proxy.entities import Post
-from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+from feed_proxy.handlers import HandlerOptions, HandlerType, IsKnown, register_handler
 from feed_proxy.utils.text import make_hash_tags
 
 logger = logging.getLogger(__name__)
 
+ATOM_NS = "http://www.w3.org/2005/Atom"
+CONTENT_NS = "http://purl.org/rss/1.0/modules/content/"
+DC_NS = "http://purl.org/dc/elements/1.1/"
+ITUNES_NS = "http://www.itunes.com/dtds/podcast-1.0.dtd"
+MEDIA_NS = "http://search.yahoo.com/mrss/"
+XML_BASE = "{http://www.w3.org/XML/1998/namespace}base"
+CHUNK_SIZE = 64 * 1024
+# Entry elements from other namespaces that feedparser doesn't map to post
+# fields either. Entries with anything else are parsed with feedparser.
+IGNORED_NAMESPACES = frozenset(
+    {
+        "http://wellformedweb.org/CommentAPI/",
+        "http://purl.org/rss/1.0/modules/slash/",
+        "http://rssnamespace.org/feedburner/ext/1.0",
+        "http://www.youtube.com/xml/schemas/2015",
+        "http://www.georss.org/georss",
+        "http://purl.org/rss/1.0/modules/syndication/",
+    }
+)
+IGNORED_ELEMENTS = frozenset(
+    {
+        *(
+            f"{{{DC_NS}}}{name}"
+            for name in (
+                "contributor",
+                "coverage",
+                "creator",
+                "date",
+                "format",
+                "identifier",
+                "language",
+                "publisher",
+                "relation",
+                "rights",
+                "source",
+                "type",
+            )
+        ),
+        *(
+            f"{{{ITUNES_NS}}}{name}"
+            for name in (
+                "author",
+                "block",
+                "duration",
+                "episode",
+                "episodeType",
+                "explicit",
+                "image",
+                "isClosedCaptioned",
+                "order",
+                "season",
+            )
+        ),
+        *(
+            f"{{{MEDIA_NS}}}{name}"
+            for name in (
+                "community",
+                "copyright",
+                "credit",
+                "hash",
+                "license",
+                "player",
+                "price",
+                "rating",
+                "restriction",
+                "status",
+                "text",
+                "thumbnail",
+            )
+        ),
+    }
+)
+# Their children are checked too, e.g. media:description in YouTube media:group
+MEDIA_CONTAINERS = frozenset({f"{{{MEDIA_NS}}}group", f"{{{MEDIA_NS}}}content"})
+FAST_PATH_ELEMENTS = frozenset(
+    {f"{{{CONTENT_NS}}}encoded", f"{{{DC_NS}}}title", f"{{{DC_NS}}}subject"}
+)
+
 
 @dataclasses.dataclass()
 class FeedPost(Post):
@@ -42,29 +125,269 @@ class FeedPost(Post):
         return {**base, **self.extras}
 
 
+@dataclasses.dataclass()
+class RSSOptions(HandlerOptions):
+    # Stop parsing after this many already processed entries in a row
+    incremental: bool = False
+    stop_after_known: int = 1
+
+
 @register_handler(
     type=HandlerType.parsers,
+    options=RSSOptions,
     return_model=FeedPost,
+    incremental=True,
+    wants_bytes=True,
 )
 async def rss(
-    text: str, *, options: HandlerOptions | None = None  # noqa: U100
+    text: str | bytes,
+    *,
+    options: RSSOptions | None = None,
+    is_known: IsKnown | None = None,
 ) -> list[FeedPost]:
+    if options and options.incremental and is_known is not None:
+        return await _parse_incremental(text, is_known, options.stop_after_known)
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, _handler, text)
 
 
-def _handler(text: str) -> list[FeedPost]:
+async def _parse_incremental(
+    text: str | bytes, is_known: IsKnown, stop_after_known: int
+) -> list[FeedPost]:
     posts: list[FeedPost] = []
+    known_in_row = 0
+    try:
+        async with aclosing(iter_feed_posts(text)) as feed_posts:
+            async for post in feed_posts:
+                posts.append(post)
+                if not await is_known(post.post_id):
+                    known_in_row = 0
+                    continue
+                known_in_row += 1
+                if known_in_row >= stop_after_known:
+                    logger.debug("Stopped parsing at known post %s", post.post_id)
+                    break
+    except (etree.XMLSyntaxError, UnsupportedFeedError) as e:
+        logger.info("Can't parse feed incrementally (%s), parsing it fully", e)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _parse_with_feedparser, text)
+    return posts
 
-    if not text:
+
+async def iter_feed_posts(text: str | bytes) -> AsyncGenerator[FeedPost, None]:
+    loop = asyncio.get_running_loop()
+    reader = StreamingFeedReader()
+    for start in range(0, len(text), CHUNK_SIZE):
+        chunk = text[start : start + CHUNK_SIZE]
+        for post in await loop.run_in_executor(None, reader.feed, chunk):
+            yield post
+    for post in await loop.run_in_executor(None, reader.close):
+        yield post
+
+
+class UnsupportedFeedError(ValueError):
+    pass
+
+
+class StreamingFeedReader:
+    def __init__(self) -> None:
+        self._parser = etree.XMLPullParser(
+            events=("end",),
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            remove_pis=True,
+        )
+        self._root_checked = False
+
+    def feed(self, chunk: str | bytes) -> list[FeedPost]:
+        self._parser.feed(chunk)
+        return self._read_posts()
+
+    def close(self) -> list[FeedPost]:
+        self._parser.close()
+        return self._read_posts()
+
+    def _read_posts(self) -> list[FeedPost]:
+        posts: list[FeedPost] = []
+        for _, element in self._parser.read_events():
+            if not self._root_checked:
+                root = element.getroottree().getroot()
+                if etree.QName(root).localname not in ("rss", "feed"):
+                    raise UnsupportedFeedError(f"Unsupported root element {root.tag}")
+                self._root_checked = True
+
+            parent = element.getparent()
+            if (
+                parent is None
+                or etree.QName(element).localname not in ("item", "entry")
+                or etree.QName(parent).localname not in ("channel", "feed")
+            ):
+                continue
+            if _uses_xml_base(element):
+                # feedparser resolves relative links against xml:base
+                raise UnsupportedFeedError("Entries with xml:base are not supported")
+            if (tag := _unsupported_element(element)) is not None:
+                raise UnsupportedFeedError(f"Entry element {tag} is not supported")
+
+            try:
+                posts.append(_element_to_post(element))
+            except Exception:  # noqa: PIE786
+                entry = etree.tostring(element, encoding="unicode")
+                logger.exception("Failed to parse entry: %s", entry)
+            # Entries are not needed after parsing, don't keep them in memory
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
         return posts
 
+
+def _uses_xml_base(element: etree._Element) -> bool:
+    return any(
+        item.get(XML_BASE) is not None
+        for item in (*element.iterancestors(), *element.iter())
+    )
+
+
+def _unsupported_element(element: etree._Element) -> str | None:
+    for child in element:
+        namespace = etree.QName(child).namespace
+        if (
+            namespace in (None, ATOM_NS)
+            or namespace in IGNORED_NAMESPACES
+            or child.tag in FAST_PATH_ELEMENTS
+            or child.tag in IGNORED_ELEMENTS
+        ):
+            continue
+        if child.tag not in MEDIA_CONTAINERS:
+            return child.tag
+        if (tag := _unsupported_element(child)) is not None:
+            return tag
+    return None
+
+
+def _element_to_post(element: etree._Element) -> FeedPost:
+    is_atom = etree.QName(element).namespace == ATOM_NS
+    fields, tags, link = _read_entry_children(element)
+    id_element = fields.get("guid", fields.get("id"))
+    post_id = "" if id_element is None else (id_element.text or "").strip()
+    # Same as feedparser: permalink guid is used when the entry has no link
+    if (
+        not link
+        and id_element is not None
+        and post_id
+        and id_element.get("isPermaLink") != "false"
+    ):
+        link = post_id
+    if not post_id:
+        if not link:
+            raise ValueError("Entry has neither id nor link")
+        post_id = _clean_post_id(link)
+    description = fields.get("description", fields.get("summary"))
+    if description is None or not _element_text(description):
+        description = fields.get("content")
+
+    comments = fields.get("comments")
+    comments_url = None if comments is None else _element_text(comments)
+    # url and comments_url are None when missing, same as in feedparser path
+    return FeedPost(
+        post_id=post_id,
+        title=_content(fields["title"], is_atom, html=False),
+        url=link,  # type: ignore[arg-type]
+        comments_url=comments_url,  # type: ignore[arg-type]
+        post_tags=tuple(tags),
+        source_tags=[],
+        description=(
+            _content(description, is_atom, html=True) if description is not None else ""
+        ),
+    )
+
+
+def _read_entry_children(
+    element: etree._Element,
+) -> tuple[dict[str, etree._Element], list[str], str | None]:
+    fields: dict[str, etree._Element] = {}
+    tags: list[str] = []
+    seen_tags = set()
+    link = None
+    for child in element:
+        qname = etree.QName(child)
+        name = qname.localname
+        if qname.namespace == CONTENT_NS and name == "encoded":
+            name = "content"
+        elif qname.namespace == DC_NS and name in ("title", "subject"):
+            name = "title" if name == "title" else "category"
+        elif qname.namespace not in (None, ATOM_NS):
+            continue
+
+        if name == "category":
+            term = child.get("term") or (child.text or "").strip()
+            # Repeated categories are collapsed, as in feedparser
+            tag = (term, child.get("scheme") or child.get("domain"), child.get("label"))
+            if tag not in seen_tags:
+                seen_tags.add(tag)
+                tags.append(term)
+        elif name == "link" and child.get("href") is not None:
+            # The last alternate link wins, as in feedparser
+            if child.get("rel", "alternate") == "alternate":
+                link = child.get("href", "").strip()
+        elif name == "link":
+            link = link or (child.text or "").strip()
+        else:
+            fields.setdefault(name, child)
+    return fields, tags, link
+
+
+def _content(element: etree._Element, is_atom: bool, *, html: bool) -> str:
+    # Mirrors feedparser: markup is sanitized only in html content. Atom
+    # declares content type explicitly, RSS titles are html only if they
+    # look like it and RSS descriptions are always html.
+    text = _element_text(element)
+    if is_atom:
+        content_type = element.get("type", "text")
+        is_html = content_type in ("html", "xhtml", "text/html")
+    else:
+        is_html = html or _FeedParserMixin.looks_like_html(text)
+    if not is_html or "<" not in text:
+        return text
+    return _sanitize_html(text, "utf-8", "text/html")
+
+
+def _element_text(element: etree._Element) -> str:
+    if len(element) == 1 and etree.QName(element[0]).localname == "div":
+        if not (element.text or "").strip() and not (element[0].tail or "").strip():
+            # Atom xhtml content is wrapped into div
+            element = element[0]
+    if not len(element):
+        return (element.text or "").strip()
+    children = "".join(etree.tostring(child, encoding="unicode") for child in element)
+    return f"{element.text or ''}{children}".strip()
+
+
+def _handler(text: str | bytes) -> list[FeedPost]:
+    if not text:
+        return []
+
+    try:
+        reader = StreamingFeedReader()
+        return reader.feed(text) + reader.close()
+    except (etree.XMLSyntaxError, UnsupportedFeedError) as e:
+        logger.debug("Can't parse feed with lxml (%s), using feedparser", e)
+        return _parse_with_feedparser(text)
+
+
+def _parse_with_feedparser(text: str | bytes) -> list[FeedPost]:
+    posts: list[FeedPost] = []
+
     def get_tags(entry: dict) -> tuple[str, ...]:
         return tuple(tag.term for tag in entry.get("tags", []))
 
-    feed = feedparser.parse(
-        text, response_headers={"content-type": "text/html; charset=utf-8"}
-    )
+    # Bytes are decoded by feedparser with charset from XML declaration,
+    # str is passed encoded to utf-8
+    response_headers = {}
+    if isinstance(text, str):
+        response_headers["content-type"] = "text/html; charset=utf-8"
+    feed = feedparser.parse(text, response_headers=response_headers)
     for entry in feed["entries"]:
         try:
             id_field = entry.keymap["guid"]
@@ -1,11 +1,11 @@
 import dataclasses
 import html
-import json
 import logging
 from typing import Any
 
 from feed_proxy.entities import Post
 from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+from feed_proxy.utils import fast_json
 from feed_proxy.utils.text import make_hash_tags
 
 logger = logging.getLogger(__name__)
@@ -37,14 +37,32 @@ class WordpressPost(Post):
         return {**base, **self.extras}
 
 
+# Only the fields used by WordpressPost are decoded from the response
+@dataclasses.dataclass()
+class Rendered:
+    rendered: str
+
+
+@dataclasses.dataclass()
+class WordpressEntry:
+    id: int
+    title: Rendered
+    link: str
+    excerpt: Rendered
+    content: Rendered
+
+
 @register_handler(
     type=HandlerType.parsers,
     return_model=WordpressPost,
+    wants_bytes=True,
 )
 async def wordpress(
-    text: str, *, options: HandlerOptions | None = None  # noqa: U100
+    text: str | bytes, *, options: HandlerOptions | None = None  # noqa: U100
 ) -> list[WordpressPost]:
-    raw = json.loads(text)
+    raw: list[WordpressEntry] | dict[str, Any] = fast_json.loads_as(
+        text, list[WordpressEntry] | dict[str, Any]
+    )
 
     if not isinstance(raw, list):
         logger.warning("Unexpected WordPress API response, expected a list: %s", raw)
@@ -52,12 +70,12 @@ async def wordpress(
 
     return [
         WordpressPost(
-            post_id=str(entry["id"]),
-            title=html.unescape(entry["title"]["rendered"]),
-            url=entry["link"],
+            post_id=str(entry.id),
+            title=html.unescape(entry.title.rendered),
+            url=entry.link,
             source_tags=[],
-            description=entry["excerpt"]["rendered"],
-            content=entry["content"]["rendered"],
+            description=entry.excerpt.rendered,
+            content=entry.content.rendered,
         )
         for entry in raw
     ]
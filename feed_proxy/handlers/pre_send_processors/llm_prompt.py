@@ -7,11 +7,15 @@ import os
 from typing import TYPE_CHECKING
 
 from google import genai
+from picodi import Provide, inject
 
+from feed_proxy.deps import get_llm_cache
 from feed_proxy.handlers import HandlerOptions, HandlerType, register_handler
+from feed_proxy.llm_cache import make_key
 
 if TYPE_CHECKING:
     from feed_proxy.entities import Post
+    from feed_proxy.llm_cache import LlmCache
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +59,11 @@ def _get_client() -> genai.Client:
     return _client
 
 
+@inject
+def _get_cache(cache: LlmCache | None = Provide(get_llm_cache)) -> LlmCache | None:
+    return cache
+
+
 def _read_field(post: Post, name: str) -> str:
     extras = getattr(post, "extras", {})
     if name in extras:
@@ -73,8 +82,19 @@ async def _run_prompt(prompt: str, source: str) -> str:
     return response.text
 
 
+async def _run_cached_prompt(cache: LlmCache | None, prompt: str, source: str) -> str:
+    if cache is None:
+        return await _run_prompt(prompt, source)
+    return await cache.get_or_run(
+        make_key(_MODEL, prompt, source), lambda: _run_prompt(prompt, source)
+    )
+
+
 async def _process_post(
-    post: Post, options: LlmPromptOptions, semaphore: asyncio.Semaphore
+    post: Post,
+    options: LlmPromptOptions,
+    semaphore: asyncio.Semaphore,
+    cache: LlmCache | None,
 ) -> None:
     source = _read_field(post, options.source_field)
     extras: dict[str, str] = getattr(post, "extras", {})
@@ -83,7 +103,7 @@ async def _process_post(
         return
     async with semaphore:
         try:
-            result = await _run_prompt(options.prompt, source)
+            result = await _run_cached_prompt(cache, options.prompt, source)
         except Exception:  # noqa: PIE786
             logger.exception(
                 "Failed to run llm_prompt for field %s of post %s",
@@ -107,5 +127,8 @@ async def _process_post(
 )
 async def llm_prompt(posts: list[Post], *, options: LlmPromptOptions) -> list[Post]:
     semaphore = asyncio.Semaphore(_MAX_CONCURRENCY)
-    await asyncio.gather(*(_process_post(post, options, semaphore) for post in posts))
+    cache = _get_cache()
+    await asyncio.gather(
+        *(_process_post(post, options, semaphore, cache) for post in posts)
+    )
     return posts
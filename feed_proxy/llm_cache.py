@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine
+from typing import TYPE_CHECKING, Any
+
+from feed_proxy.utils import fast_json
+from feed_proxy.utils.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from feed_proxy.observability import Metrics
+    from feed_proxy.storage import SqliteLlmCacheStorage
+
+
+class LlmCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_sec: float = 7 * 24 * 60 * 60,
+        storage: SqliteLlmCacheStorage | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        assert max_entries > 0, "max_entries should be positive"
+        self._max_entries = max_entries
+        self._ttl_sec = ttl_sec
+        self._storage = storage
+        self._metrics = metrics
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        # Streams that get the same post at the same time share one call,
+        # finished calls are dropped right away, their results are in _entries
+        self._single_flight: SingleFlight[str, str] = SingleFlight(ttl_sec=0)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def get_or_run(
+        self, key: str, run: Callable[[], Coroutine[Any, Any, str]]
+    ) -> str:
+        cached = self._get(key)
+        if cached is None and self._storage is not None:
+            row = await self._storage.get(key, self._ttl_sec)
+            if row is not None:
+                cached, created_at = row
+                self._remember(key, cached, created_at)
+        if cached is not None:
+            self._count("hit")
+            return cached
+
+        self._count("miss")
+        return await self._single_flight.do(key, lambda: self._run(key, run))
+
+    async def _run(self, key: str, run: Callable[[], Coroutine[Any, Any, str]]) -> str:
+        # Failures are not cached, the post is processed again next time
+        result = await run()
+        self._remember(key, result)
+        if self._storage is not None:
+            await self._storage.put(key, result)
+        return result
+
+    def _get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, created_at = entry
+        if time.time() - created_at >= self._ttl_sec:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _remember(self, key: str, result: str, created_at: float | None = None) -> None:
+        if created_at is None:
+            created_at = time.time()
+        self._entries[key] = (result, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _count(self, result: str) -> None:
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self._metrics is not None:
+            self._metrics.increment_llm_cache(result)
+
+
+def make_key(model: str, prompt: str, source: str) -> str:
+    data = fast_json.dumps([model, prompt, source]).encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import asyncio
-import copy
 import logging
+from collections.abc import AsyncIterator, Callable, Mapping, Sequence
+from contextlib import aclosing
 from typing import TYPE_CHECKING
 
 import httpx
@@ -10,110 +11,279 @@ from curl_cffi import CurlError
 from curl_cffi.requests import AsyncSession
 
 from feed_proxy.entities import (
+    DedupUrlOptions,
     Message,
-    Modifier,
     Post,
-    PreSendProcessor,
     Source,
     Stream,
+    copy_post,
+)
+from feed_proxy.handlers import ModifierNode, get_source_plan, get_stream_plan
+from feed_proxy.storage import MemoryPostStorage, stream_key
+from feed_proxy.utils import minhash
+from feed_proxy.utils.http import (
+    ACCEPT_HEADER,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_UA,
+    ERROR_PREVIEW_BYTES,
+    FetchedBody,
 )
-from feed_proxy.handlers import HandlerType, get_handler_by_name
-from feed_proxy.utils.http import ACCEPT_HEADER, DEFAULT_UA
 from feed_proxy.utils.text import normalize_dedup_value
+from feed_proxy.utils.url import canonicalize_url
 
 if TYPE_CHECKING:
-    from feed_proxy.storage import PostStorage
+    from feed_proxy.handlers import IsKnown
+    from feed_proxy.parse_cache import ParseCache
+    from feed_proxy.storage import PostStorage, PostStorageReader
+    from feed_proxy.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
-async def fetch_text(source: Source) -> str:
-    fetcher = get_handler_by_name(
-        type=HandlerType.fetchers,
-        name=source.fetcher_type,
-        options=source.fetcher_options,
-    )
-    return await fetcher()
+async def fetch_body(
+    source: Source,
+    single_flight: SingleFlight[tuple[str, str, str], FetchedBody | None] | None = None,
+) -> FetchedBody | None:
+    plan = get_source_plan(source)
+    if single_flight is None:
+        return await plan.fetcher()
+    return await single_flight.do(plan.fetch_key, plan.fetcher)
 
 
-async def parse_posts(source: Source, text: str) -> list[tuple[Stream, list[Post]]]:
-    parser = get_handler_by_name(
-        name=source.parser_type,
-        type=HandlerType.parsers,
-        options=source.parser_options,
-    )
-    posts = await parser(text)
-    result = []
-    for stream in source.streams:
-        stream_posts = copy.deepcopy(posts)
-        for post in stream_posts:
-            post.source_tags = source.tags
-        stream_posts = await apply_modifiers_to_posts(stream.modifiers, stream_posts)
-        result.append((stream, stream_posts))
-    return result
-
-
-async def apply_modifiers_to_posts(
-    modifiers: list[Modifier], posts: list[Post]
+async def parse_posts(
+    source: Source,
+    body: str | FetchedBody,
+    post_storage: PostStorageReader | None = None,
+    parse_cache: ParseCache | None = None,
+) -> list[tuple[Stream, list[Post]]]:
+    posts = await parse_source_posts(source, body, post_storage, parse_cache)
+    return await split_posts_by_streams(source, posts)
+
+
+async def parse_source_posts(
+    source: Source,
+    body: str | FetchedBody,
+    post_storage: PostStorageReader | None = None,
+    parse_cache: ParseCache | None = None,
 ) -> list[Post]:
-    for modifier in modifiers:
-        modifier_func = get_handler_by_name(
-            name=modifier.type,
-            type=HandlerType.modifiers,
-            options=modifier.options,
-        )
-        posts = await modifier_func(posts)
-    return posts
+    plan = get_source_plan(source)
+    text = plan.parser_input(body)
+    if post_storage is not None and plan.incremental:
+        # Result depends on what is already processed, so it's never cached
+        return await plan.parser(text, is_known=make_is_known(source, post_storage))
+    if parse_cache is not None:
+        return await parse_cache.get_or_parse(source, text, plan.parser)
+    return await plan.parser(text)
+
+
+async def split_posts_by_streams(
+    source: Source, posts: list[Post]
+) -> list[tuple[Stream, list[Post]]]:
+    plan = get_source_plan(source)
+    for post in posts:
+        post.source_tags = source.tags
+    posts_by_stream: dict[int, list[Post]] = {}
+    await _apply_modifier_tree(plan.modifier_tree, posts, posts_by_stream)
+    return [(stream, posts_by_stream[id(stream)]) for stream in source.streams]
+
+
+def dropped_post_ids(posts: list[Post], stream_posts: list[Post]) -> list[str]:
+    kept = {post.post_id for post in stream_posts}
+    return [post.post_id for post in posts if post.post_id not in kept]
+
+
+def is_paged(source: Source) -> bool:
+    return get_source_plan(source).paged
+
+
+async def fetch_and_parse_pages(
+    source: Source, post_storage: PostStorageReader
+) -> list[Post] | None:
+    plan = get_source_plan(source)
+    is_known = make_is_known(source, post_storage)
+    posts: list[Post] = []
+    seen_ids: set[str] = set()
+    pages_count = 0
+    async with aclosing(plan.fetcher()) as pages:
+        async for page in pages:
+            if page is None or not page.content:
+                logger.warning("Can't fetch page %s of %s", pages_count + 1, source.id)
+                break
+            pages_count += 1
+            page_posts = await plan.parser(plan.parser_input(page))
+            # Posts move to next pages while they are fetched
+            new_posts = [post for post in page_posts if post.post_id not in seen_ids]
+            seen_ids.update(post.post_id for post in new_posts)
+            posts.extend(new_posts)
+            # Next pages have only older posts, they are processed already
+            if not page_posts or await _all_known(page_posts, is_known):
+                break
+    logger.info("Fetched %s pages of %s", pages_count, source.id)
+    return posts if pages_count else None
+
+
+async def _all_known(posts: list[Post], is_known: IsKnown) -> bool:
+    for post in posts:
+        if not await is_known(post.post_id):
+            return False
+    return True
+
+
+def _dropped_scope(source: Source, stream: Stream) -> tuple[str, str]:
+    # Posts dropped by stream filters are marked apart from the dedup marks,
+    # so they never hide a post from other streams or sources
+    return f"{source.id}:dropped", stream_key(source.id, stream)
+
+
+def make_is_known(source: Source, post_storage: PostStorageReader) -> IsKnown:
+    group = source.dedup_group or source.id
+
+    async def is_known(post_id: str) -> bool:
+        # Known means there is nothing left to do with the post for any stream
+        if not source.streams:
+            return False
+        for stream in source.streams:
+            if await post_storage.any_processed(group, stream.receiver_type, [post_id]):
+                continue
+            if not await post_storage.any_processed(
+                *_dropped_scope(source, stream), [post_id]
+            ):
+                return False
+        return True
+
+    return is_known
+
+
+async def _apply_modifier_tree(
+    node: ModifierNode,
+    posts: list[Post],
+    posts_by_stream: dict[int, list[Post]],
+    shared: bool = False,
+) -> None:
+    # Shared posts are referenced by other branches too. They are copied
+    # only before something can change them, so posts dropped by pure
+    # filters are never copied
+    if node.modifier is not None:
+        if shared and not node.pure_filter:
+            posts = [copy_post(post) for post in posts]
+            shared = False
+        posts = await node.modifier(posts)
+    branches: list[Stream | ModifierNode] = [*node.streams, *node.children.values()]
+    for i, branch in enumerate(branches):
+        # The last branch takes the posts as is, others share them
+        branch_shared = shared or i < len(branches) - 1
+        if isinstance(branch, ModifierNode):
+            await _apply_modifier_tree(branch, posts, posts_by_stream, branch_shared)
+        elif branch_shared:
+            posts_by_stream[id(branch)] = [copy_post(post) for post in posts]
+        else:
+            posts_by_stream[id(branch)] = posts
 
 
 async def apply_pre_send_processors(
-    processors: list[PreSendProcessor], posts: list[Post]
+    processors: Sequence[Callable], posts: list[Post]
 ) -> list[Post]:
-    for processor in processors:
-        processor_func = get_handler_by_name(
-            name=processor.type,
-            type=HandlerType.pre_send_processors,
-            options=processor.options,
-        )
+    for processor_func in processors:
         posts = await processor_func(posts)
     return posts
 
 
-def post_identities(post: Post, dedup_key: str) -> list[str]:
+def post_identities(
+    post: Post, dedup_key: str, url_options: DedupUrlOptions | None = None
+) -> list[str]:
     ids = [post.post_id]
     if dedup_key != "post_id":
         raw = getattr(post, dedup_key, "") or ""
-        norm = normalize_dedup_value(raw)
+        if dedup_key == "url":
+            url_options = url_options or DedupUrlOptions()
+            norm = canonicalize_url(
+                raw,
+                strip_params=url_options.strip_params,
+                sort_query=url_options.sort_query,
+                strip_www=url_options.strip_www,
+            )
+        else:
+            norm = normalize_dedup_value(raw)
         if norm:
             ids.append(f"{dedup_key}:{norm}")
     return ids
 
 
+def post_signature(post: Post) -> minhash.Signature | None:
+    title = getattr(post, "title", "") or ""
+    description = getattr(post, "description", "") or ""
+    return minhash.minhash(f"{title}\n{description}")
+
+
+def _identities_to_mark(
+    post: Post, source: Source
+) -> tuple[list[str], minhash.Signature | None]:
+    ids = post_identities(post, source.dedup_key, source.dedup_url)
+    signature = None
+    if source.dedup_similarity:
+        signature = post_signature(post)
+        if signature is not None:
+            ids.append(minhash.to_identity(signature))
+    return ids, signature
+
+
+async def _is_processed(
+    identities: list[str],
+    signature: minhash.Signature | None,
+    source: Source,
+    receiver_type: str,
+    post_storage: PostStorageReader,
+) -> bool:
+    group = source.dedup_group or source.id
+    if await post_storage.any_processed(group, receiver_type, identities):
+        return True
+    # Signatures are compared only for posts that are new by exact identities
+    return signature is not None and await post_storage.any_similar(
+        group, receiver_type, signature, source.dedup_similarity
+    )
+
+
 async def parse_message_batches_from_posts(
-    posts: list[Post], source: Source, stream: Stream, post_storage: PostStorage
+    posts: list[Post],
+    source: Source,
+    stream: Stream,
+    post_storage: PostStorage,
+    dropped_ids: Sequence[str] = (),
 ) -> list[list[Message]]:
     message_batches: list[list[Message]] = []
     sid = source.id
     group = source.dedup_group or source.id
     recv = stream.receiver_type
+    if dropped_ids:
+        await post_storage.mark_posts_as_processed(
+            sid, *_dropped_scope(source, stream), list(dropped_ids)
+        )
     if not await post_storage.has_posts(sid, recv):
         logger.info("First run for %s, skipping all posts", (sid, recv))
         all_identities = [
             identity
             for post in posts
-            for identity in post_identities(post, source.dedup_key)
+            for identity in _identities_to_mark(post, source)[0]
         ]
         await post_storage.mark_posts_as_processed(sid, group, recv, all_identities)
         return message_batches
 
-    new_posts = [
-        post
-        for post in reversed(posts)
-        if not await post_storage.any_processed(
-            group, recv, post_identities(post, source.dedup_key)
-        )
-    ]
-    new_posts = await apply_pre_send_processors(stream.pre_send_processors, new_posts)
+    new_posts = []
+    identities_by_post: dict[int, list[str]] = {}
+    # Posts of this batch, so duplicates inside it are skipped too
+    batch = MemoryPostStorage()
+    for post in reversed(posts):
+        identities, signature = _identities_to_mark(post, source)
+        if await _is_processed(
+            identities, signature, source, recv, post_storage
+        ) or await _is_processed(identities, signature, source, recv, batch):
+            continue
+        await batch.mark_posts_as_processed(sid, group, recv, identities)
+        new_posts.append(post)
+        identities_by_post[id(post)] = identities
+    new_posts = await apply_pre_send_processors(
+        get_stream_plan(stream).pre_send_processors, new_posts
+    )
 
     messages = []
     to_mark = []
@@ -127,7 +297,10 @@ async def parse_message_batches_from_posts(
             )
         )
         logger.info("New post %s for %s", post, (group, recv))
-        to_mark.extend(post_identities(post, source.dedup_key))
+        if id(post) in identities_by_post:
+            to_mark.extend(identities_by_post[id(post)])
+        else:
+            to_mark.extend(_identities_to_mark(post, source)[0])
     await post_storage.mark_posts_as_processed(sid, group, recv, to_mark)
 
     if not messages:
@@ -142,35 +315,64 @@ async def parse_message_batches_from_posts(
 
 
 async def send_messages(messages: list[Message], stream: Stream) -> None:
-    receiver = get_handler_by_name(
-        name=stream.receiver_type,
-        type=HandlerType.receivers,
-        options=stream.receiver_options,
-    )
-    await receiver(messages)
+    await get_stream_plan(stream).receiver(messages)
+
+
+class ResponseTooLargeError(Exception):
+    pass
 
 
 async def fetch_text_from_url(
-    url: str, *, encoding: str = "", retry: int = 0, impersonate: str = ""
+    url: str,
+    *,
+    encoding: str = "",
+    retry: int = 0,
+    impersonate: str = "",
+    max_bytes: int = DEFAULT_MAX_BYTES,
 ) -> str | None:
+    body = await fetch_body_from_url(
+        url,
+        encoding=encoding,
+        retry=retry,
+        impersonate=impersonate,
+        max_bytes=max_bytes,
+    )
+    return None if body is None else body.decode()
+
+
+async def fetch_body_from_url(
+    url: str,
+    *,
+    encoding: str = "",
+    retry: int = 0,
+    impersonate: str = "",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> FetchedBody | None:
     if impersonate:
         return await _fetch_with_curl_cffi(
-            url, encoding=encoding, retry=retry, impersonate=impersonate
+            url,
+            encoding=encoding,
+            retry=retry,
+            impersonate=impersonate,
+            max_bytes=max_bytes,
         )
-    return await _fetch_with_httpx(url, encoding=encoding, retry=retry)
+    return await _fetch_with_httpx(
+        url, encoding=encoding, retry=retry, max_bytes=max_bytes
+    )
 
 
 async def _fetch_with_httpx(
-    url: str, *, encoding: str = "", retry: int = 0
-) -> str | None:
+    url: str, *, encoding: str = "", retry: int = 0, max_bytes: int = DEFAULT_MAX_BYTES
+) -> FetchedBody | None:
     # TODO don't fetch if content is not changed
     async with httpx.AsyncClient(
         follow_redirects=True, verify=False, timeout=30  # noqa: S501
     ) as client:
         while True:
-            res_text = None
+            body = None
             try:
-                res = await client.get(
+                async with client.stream(
+                    "GET",
                     url,
                     headers={
                         "user-agent": DEFAULT_UA,
@@ -178,9 +380,17 @@ async def _fetch_with_httpx(
                         "accept-language": "uk-UA,uk;q=0.8,en-US;q=0.5,en;q=0.3",
                     },
                     timeout=30.0,
-                )
-                res_text = res.text
-                res.raise_for_status()
+                ) as res:
+                    if res.is_error:
+                        body = await _read_body(
+                            res.aiter_bytes(), ERROR_PREVIEW_BYTES, truncate=True
+                        )
+                    res.raise_for_status()
+                    _check_content_length(res.headers, max_bytes)
+                    body = await _read_body(res.aiter_bytes(), max_bytes)
+            except ResponseTooLargeError as e:
+                logger.warning("[httpx] Skipping %s: %s", url, e)
+                return None
             except httpx.HTTPError as e:
                 if retry > 0:
                     msg = (
@@ -196,30 +406,46 @@ async def _fetch_with_httpx(
                     "[httpx] Error while fetching %s: error %s\n%s",
                     url,
                     type(e).__name__,
-                    res_text,
+                    _preview(body),
                 )
                 return None
 
-            if encoding:
-                res.encoding = encoding
-
-            return res.text
+            return FetchedBody(
+                bytes(body), res.headers.get("content-type", ""), encoding
+            )
 
 
 async def _fetch_with_curl_cffi(
-    url: str, *, encoding: str = "", retry: int = 0, impersonate: str = "firefox"
-) -> str | None:
+    url: str,
+    *,
+    encoding: str = "",
+    retry: int = 0,
+    impersonate: str = "firefox",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> FetchedBody | None:
     async with AsyncSession() as session:
         while True:
-            res_text = None
+            body = None
             try:
                 res = await session.get(
                     url,
                     impersonate=impersonate,
                     timeout=30,
+                    stream=True,
                 )
-                res_text = res.text
-                res.raise_for_status()
+                try:
+                    if res.status_code >= 400:
+                        body = await _read_body(
+                            res.aiter_content(), ERROR_PREVIEW_BYTES, truncate=True
+                        )
+                    res.raise_for_status()
+                    _check_content_length(res.headers, max_bytes)
+                    body = await _read_body(res.aiter_content(), max_bytes)
+                finally:
+                    await res.aclose()
+            except ResponseTooLargeError as e:
+                logger.warning("[curl_cffi] Skipping %s: %s", url, e)
+                return None
             except CurlError as e:
                 if retry > 0:
                     msg = (
@@ -235,11 +461,40 @@ async def _fetch_with_curl_cffi(
                     "[curl_cffi] Error while fetching %s: error %s\n%s",
                     url,
                     type(e).__name__,
-                    res_text,
+                    _preview(body),
                 )
                 return None
 
-            if encoding:
-                res.encoding = encoding
+            return FetchedBody(
+                bytes(body), res.headers.get("content-type") or "", encoding
+            )
+
+
+def _check_content_length(headers: Mapping[str, str], max_bytes: int) -> None:
+    content_length = headers.get("content-length", "")
+    if max_bytes > 0 and content_length.isdigit() and int(content_length) > max_bytes:
+        raise ResponseTooLargeError(
+            f"Content-Length {content_length} is over limit of {max_bytes} bytes"
+        )
+
 
-            return res.text
+async def _read_body(
+    chunks: AsyncIterator[bytes], max_bytes: int, *, truncate: bool = False
+) -> bytearray:
+    # Body is read chunk by chunk, so a huge response is dropped
+    # as soon as it goes over the limit
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if max_bytes > 0 and len(body) > max_bytes:
+            if truncate:
+                del body[max_bytes:]
+                break
+            raise ResponseTooLargeError(f"Body is over limit of {max_bytes} bytes")
+    return body
+
+
+def _preview(body: bytearray | None) -> str:
+    if not body:
+        return ""
+    return body[:ERROR_PREVIEW_BYTES].decode("utf-8", errors="replace")
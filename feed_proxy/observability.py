@@ -46,6 +46,12 @@ class Metrics(Protocol):
     def increment_posts_parsed(self, source_id: str) -> None:
         pass
 
+    def increment_parse_cache(self, parser_type: str, result: str) -> None:
+        pass
+
+    def increment_llm_cache(self, result: str) -> None:
+        pass
+
     def increment_messages_prepared(
         self, source_id: str, receiver_id: str, messages_count: int
     ) -> None:
@@ -80,6 +86,14 @@ class NullMetrics:
     def increment_posts_parsed(self, source_id: str) -> None:  # noqa: U100
         return None
 
+    def increment_parse_cache(
+        self, parser_type: str, result: str  # noqa: U100
+    ) -> None:
+        return None
+
+    def increment_llm_cache(self, result: str) -> None:  # noqa: U100
+        return None
+
     def increment_messages_prepared(
         self, source_id: str, receiver_id: str, messages_count: int  # noqa: U100
     ) -> None:
@@ -118,6 +132,18 @@ class PrometheusMetrics:
             ["app_name", "source_id"],
             registry=self.registry,
         )
+        self._parse_cache = Counter(
+            "parse_cache_requests_total",
+            "Number of parse cache lookups",
+            ["app_name", "parser_type", "result"],
+            registry=self.registry,
+        )
+        self._llm_cache = Counter(
+            "llm_cache_requests_total",
+            "Number of LLM result cache lookups",
+            ["app_name", "result"],
+            registry=self.registry,
+        )
         self._messages_prepared = Counter(
             "messages_prepared_total",
             "Number of messages prepared",
@@ -157,6 +183,12 @@ class PrometheusMetrics:
     def increment_posts_parsed(self, source_id: str) -> None:
         self._posts_parsed.labels(self._app_name, source_id).inc()
 
+    def increment_parse_cache(self, parser_type: str, result: str) -> None:
+        self._parse_cache.labels(self._app_name, parser_type, result).inc()
+
+    def increment_llm_cache(self, result: str) -> None:
+        self._llm_cache.labels(self._app_name, result).inc()
+
     def increment_messages_prepared(
         self, source_id: str, receiver_id: str, messages_count: int
     ) -> None:
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING
+
+from dacite import Config, from_dict
+
+from feed_proxy.entities import copy_post
+from feed_proxy.handlers import HandlerType, get_handler_return_model_by_name
+from feed_proxy.utils import fast_json
+
+if TYPE_CHECKING:
+    from feed_proxy.entities import Post, Source
+    from feed_proxy.observability import Metrics
+    from feed_proxy.storage import SqliteParseCacheStorage
+
+logger = logging.getLogger(__name__)
+
+# Posts are restored from JSON, so tuples come back as lists
+# and types are not checked
+_FROM_DICT_CONFIG = Config(check_types=False)
+
+
+class ParseCache:
+    def __init__(
+        self,
+        max_entries: int = 128,
+        storage: SqliteParseCacheStorage | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        assert max_entries > 0, "max_entries should be positive"
+        self._max_entries = max_entries
+        self._storage = storage
+        self._metrics = metrics
+        self._entries: OrderedDict[str, tuple[Post, ...]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def get_or_parse(
+        self,
+        source: Source,
+        text: str | bytes,
+        parser: Callable[[str | bytes], Awaitable[list[Post]]],
+    ) -> list[Post]:
+        key = make_key(source, text)
+        cached = self._entries.get(key)
+        if cached is None and self._storage is not None:
+            cached = await self._load(source, key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self._count(source, "hit")
+            # Cached posts are never given away, callers modify their posts
+            return [copy_post(post) for post in cached]
+
+        self._count(source, "miss")
+        posts = await parser(text)
+        self._remember(key, tuple(copy_post(post) for post in posts))
+        if self._storage is not None:
+            data = fast_json.dumps([dataclasses.asdict(post) for post in posts])
+            await self._storage.put(key, data)
+        return posts
+
+    def _remember(self, key: str, posts: tuple[Post, ...]) -> None:
+        self._entries[key] = posts
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(self, source: Source, key: str) -> tuple[Post, ...] | None:
+        assert self._storage is not None
+        data = await self._storage.get(key)
+        if data is None:
+            return None
+        model = get_handler_return_model_by_name(
+            HandlerType.parsers, source.parser_type
+        )
+        try:
+            posts = tuple(
+                from_dict(model, item, config=_FROM_DICT_CONFIG)
+                for item in fast_json.loads(data)
+            )
+        except Exception:  # noqa: PIE786
+            # Stale entry written by another version of the parser model
+            logger.warning("Can't restore cached posts for %s", source.id)
+            return None
+        self._remember(key, posts)
+        return posts
+
+    def _count(self, source: Source, result: str) -> None:
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self._metrics is not None:
+            self._metrics.increment_parse_cache(source.parser_type, result)
+
+
+def make_key(source: Source, text: str | bytes) -> str:
+    options = fast_json.dumps(source.parser_options, sort_keys=True)
+    options_digest = hashlib.blake2b(options.encode(), digest_size=8).hexdigest()
+    if isinstance(text, str):
+        text = text.encode("utf-8", "surrogatepass")
+    text_digest = hashlib.blake2b(text, digest_size=16).hexdigest()
+    return f"{source.parser_type}:{options_digest}:{text_digest}"
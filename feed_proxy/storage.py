@@ -1,17 +1,22 @@
 from __future__ import annotations
 
-import json
+import dataclasses
+import hashlib
+import logging
 import sqlite3
-from collections.abc import Callable
-from dataclasses import asdict, dataclass
-from typing import Protocol
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any, NamedTuple, Protocol
 
 from dacite import from_dict
 
-from feed_proxy.entities import Message, Stream  # noqa: TC001
+from feed_proxy.entities import Message, Source, Stream  # noqa: TC001
+from feed_proxy.utils import fast_json, minhash
 
+logger = logging.getLogger(__name__)
 
-class PostStorage(Protocol):
+
+class PostStorageReader(Protocol):
     async def has_posts(self, source_id: str, receiver_type: str) -> bool:
         pass
 
@@ -20,6 +25,17 @@ class PostStorage(Protocol):
     ) -> bool:
         pass
 
+    async def any_similar(
+        self,
+        dedup_group: str,
+        receiver_type: str,
+        signature: minhash.Signature,
+        threshold: float,
+    ) -> bool:
+        pass
+
+
+class PostStorage(PostStorageReader, Protocol):
     async def mark_posts_as_processed(
         self,
         source_id: str,
@@ -34,6 +50,7 @@ class MemoryPostStorage:
     def __init__(self) -> None:
         self._owner: set[tuple[str, str]] = set()
         self._dedup: dict[tuple[str, str], set[str]] = {}
+        self._signatures: dict[tuple[str, str], dict[int, set[minhash.Signature]]] = {}
 
     async def has_posts(self, source_id: str, receiver_type: str) -> bool:
         return (source_id, receiver_type) in self._owner
@@ -47,6 +64,20 @@ class MemoryPostStorage:
             self._dedup.get((dedup_group, receiver_type), set()) & set(post_ids)
         )
 
+    async def any_similar(
+        self,
+        dedup_group: str,
+        receiver_type: str,
+        signature: minhash.Signature,
+        threshold: float,
+    ) -> bool:
+        bands = self._signatures.get((dedup_group, receiver_type), {})
+        return any(
+            minhash.similarity(signature, candidate) >= threshold
+            for key in minhash.band_keys(signature)
+            for candidate in bands.get(key, ())
+        )
+
     async def mark_posts_as_processed(
         self,
         source_id: str,
@@ -56,6 +87,10 @@ class MemoryPostStorage:
     ) -> None:
         self._owner.add((source_id, receiver_type))
         self._dedup.setdefault((dedup_group, receiver_type), set()).update(post_ids)
+        bands = self._signatures.setdefault((dedup_group, receiver_type), {})
+        for signature in _signatures(post_ids):
+            for key in minhash.band_keys(signature):
+                bands.setdefault(key, set()).add(signature)
 
 
 class SqlitePostStorage:
@@ -84,20 +119,82 @@ class SqlitePostStorage:
         cursor.execute(query, (dedup_group, receiver_type, *post_ids))
         return cursor.fetchone() is not None
 
+    async def any_similar(
+        self,
+        dedup_group: str,
+        receiver_type: str,
+        signature: minhash.Signature,
+        threshold: float,
+    ) -> bool:
+        band_keys = minhash.band_keys(signature)
+        cursor = self._conn.cursor()
+        placeholders = ", ".join("?" for _ in band_keys)
+        query = (
+            "SELECT DISTINCT posts.post_id FROM post_signatures "  # noqa: S608
+            "JOIN posts ON posts.rowid = post_signatures.post_rowid "
+            f"WHERE post_signatures.band IN ({placeholders}) "
+            "AND posts.dedup_group = ? AND posts.receiver_type = ?"
+        )
+        cursor.execute(query, (*band_keys, dedup_group, receiver_type))
+        for (identity,) in cursor:
+            candidate = minhash.from_identity(identity)
+            if candidate and minhash.similarity(signature, candidate) >= threshold:
+                return True
+        return False
+
     async def mark_posts_as_processed(
         self,
         source_id: str,
         dedup_group: str,
         receiver_type: str,
         post_ids: list[str],
+    ) -> None:
+        self.stage_posts_as_processed(source_id, dedup_group, receiver_type, post_ids)
+        self._conn.commit()
+
+    # Stage methods don't commit, so callers can group several writes
+    # into one transaction (see SqliteUnitOfWorkWriter)
+    def stage_posts_as_processed(
+        self,
+        source_id: str,
+        dedup_group: str,
+        receiver_type: str,
+        post_ids: list[str],
     ) -> None:
         cursor = self._conn.cursor()
-        cursor.executemany(
+        insert_post = (
             "INSERT INTO posts (source_id, dedup_group, receiver_type, post_id) "
-            "VALUES (?, ?, ?, ?)",
-            [(source_id, dedup_group, receiver_type, pid) for pid in post_ids],
+            "VALUES (?, ?, ?, ?)"
         )
-        self._conn.commit()
+        cursor.executemany(
+            insert_post,
+            [
+                (source_id, dedup_group, receiver_type, pid)
+                for pid in post_ids
+                if not pid.startswith(minhash.IDENTITY_PREFIX)
+            ],
+        )
+        # Signatures are also indexed by bands, for lookups of similar ones
+        for pid in post_ids:
+            signature = minhash.from_identity(pid)
+            if signature is None:
+                continue
+            cursor.execute(insert_post, (source_id, dedup_group, receiver_type, pid))
+            post_rowid = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO post_signatures (band, post_rowid) VALUES (?, ?)",
+                [(key, post_rowid) for key in minhash.band_keys(signature)],
+            )
+
+
+def _signatures(post_ids: list[str]) -> list[minhash.Signature]:
+    # Signatures are stored as identities too, and indexed by bands
+    # for lookups of similar ones
+    return [
+        signature
+        for post_id in post_ids
+        if (signature := minhash.from_identity(post_id)) is not None
+    ]
 
 
 @dataclass
@@ -161,30 +258,116 @@ class MemoryMessagesOutboxStorage:
         self._in_progress.pop(id, None)
 
 
-def outbox_item_to_sqlite_serializer(item: OutboxItem) -> tuple[str, str]:
-    return (item.id, json.dumps(asdict(item)))
+class UnknownStreamError(LookupError):
+    pass
+
+
+# Rows without a version are the legacy format: the whole OutboxItem,
+# including the embedded Stream.
+OUTBOX_FORMAT_VERSION = 2
+
+
+def stream_key(source_id: str, stream: Stream) -> str:
+    return f"{source_id}:{stream.id or receiver_stream_id(stream)}"
 
 
-def sqlite_to_outbox_item_deserializer(row: tuple[str, str]) -> OutboxItem:
-    return from_dict(OutboxItem, json.loads(row[1]))
+def receiver_stream_id(stream: Stream) -> str:
+    # Only the receiver part of a stream is needed to send messages,
+    # so editing templates or modifiers doesn't orphan in-flight rows.
+    return f"{stream.receiver_type}:{_digest(stream.receiver_options)}"
+
+
+def definition_stream_id(stream: Stream) -> str:
+    definition = dataclasses.asdict(stream)
+    definition.pop("id")
+    return f"{stream.receiver_type}:{_digest(definition)}"
+
+
+def _digest(data: Any) -> str:
+    dumped = fast_json.dumps(data, sort_keys=True)
+    return hashlib.sha256(dumped.encode()).hexdigest()[:16]
+
+
+def index_streams(sources: Iterable[Source]) -> dict[str, Stream]:
+    return {
+        stream_key(source.id, stream): stream
+        for source in sources
+        for stream in source.streams
+    }
+
+
+def outbox_item_to_sqlite_serializer(item: OutboxItem) -> tuple[str, str]:
+    template = item.messages[0].template if item.messages else ""
+    messages: list[list[Any]] = []
+    for message in item.messages:
+        entry: list[Any] = [message.post_id, message.template_kwargs]
+        if message.template != template:
+            entry.append(message.template)
+        messages.append(entry)
+    data = {
+        "v": OUTBOX_FORMAT_VERSION,
+        "id": item.id,
+        "source_id": item.source_id,
+        "stream": stream_key(item.source_id, item.stream),
+        "template": template,
+        "messages": messages,
+    }
+    return (item.id, fast_json.dumps(data))
+
+
+def sqlite_to_outbox_item_deserializer(
+    row: tuple[str, str], streams: Mapping[str, Stream]
+) -> OutboxItem:
+    data = fast_json.loads(row[1])
+    if "v" not in data:
+        return from_dict(OutboxItem, data)
+
+    if data["v"] != OUTBOX_FORMAT_VERSION:
+        raise ValueError(f"Unsupported outbox item format version: {data['v']}")
+    try:
+        stream = streams[data["stream"]]
+    except KeyError:
+        raise UnknownStreamError(
+            f"Stream {data['stream']} is not in the configuration"
+        ) from None
+
+    return OutboxItem(
+        id=data["id"],
+        messages=[
+            Message(
+                post_id=entry[0],
+                template=entry[2] if len(entry) > 2 else data["template"],
+                template_kwargs=entry[1],
+            )
+            for entry in data["messages"]
+        ],
+        source_id=data["source_id"],
+        stream=stream,
+    )
 
 
 class SqliteMessagesOutboxStorage:
     def __init__(
         self,
         conn: sqlite3.Connection,
+        streams: Mapping[str, Stream],
         serializer: Callable[
             [OutboxItem], tuple[str, str]
         ] = outbox_item_to_sqlite_serializer,
         deserializer: Callable[
-            [tuple[str, str]], OutboxItem
+            [tuple[str, str], Mapping[str, Stream]], OutboxItem
         ] = sqlite_to_outbox_item_deserializer,
     ) -> None:
         self._conn = conn
+        self._streams = streams
         self._serializer = serializer
         self._deserializer = deserializer
 
     async def put(self, item: OutboxItem) -> None:
+        self.stage_put(item)
+        self._conn.commit()
+
+    def stage_put(self, item: OutboxItem) -> None:
         cursor = self._conn.cursor()
         cursor.execute(
             "INSERT INTO outbox (id, data) VALUES (?, ?)", self._serializer(item)
@@ -192,51 +375,249 @@ class SqliteMessagesOutboxStorage:
 
     async def get(self, current_timestamp: int) -> OutboxItem | None:
         cursor = self._conn.cursor()
+        while True:
+            cursor.execute(
+                """
+                SELECT id, data FROM outbox
+                WHERE in_progress_at IS NULL
+                ORDER BY created_at
+                LIMIT 1
+                """
+            )
+            item = cursor.fetchone()
+            if not item:
+                return None
+
+            # Mark the item as in progress with the current timestamp
+            item_id = item[0]
+            cursor.execute(
+                "UPDATE outbox SET in_progress_at = ? WHERE id = ?",
+                (current_timestamp, item_id),
+            )
+            self._conn.commit()
+
+            if outbox_item := await self._load(item, current_timestamp):
+                return outbox_item
+
+    async def get_dead_letter(
+        self, current_timestamp: int, delta: int
+    ) -> OutboxItem | None:
+        cursor = self._conn.cursor()
+        while True:
+            cursor.execute(
+                """
+                SELECT id, data FROM outbox
+                WHERE in_progress_at IS NOT NULL
+                AND in_progress_at <= ?
+                ORDER BY in_progress_at
+                LIMIT 1
+                """,
+                (current_timestamp - delta,),
+            )
+            item = cursor.fetchone()
+            if not item:
+                return None
+
+            if outbox_item := await self._load(item, current_timestamp):
+                return outbox_item
+
+    async def commit(self, id: str) -> None:
+        cursor = self._conn.cursor()
+        cursor.execute("DELETE FROM outbox WHERE id = ?", (id,))
+        self._conn.commit()
+
+    async def _load(
+        self, row: tuple[str, str], current_timestamp: int
+    ) -> OutboxItem | None:
+        try:
+            return self._deserializer(row, self._streams)
+        except UnknownStreamError as e:
+            # The stream may come back with the next configuration change,
+            # so the row is kept and retried with dead letters
+            logger.warning("Skipping outbox item %s: %s", row[0], e)
+            cursor = self._conn.cursor()
+            cursor.execute(
+                "UPDATE outbox SET in_progress_at = ? WHERE id = ?",
+                (current_timestamp, row[0]),
+            )
+            self._conn.commit()
+            return None
+
+
+class ProcessedMark(NamedTuple):
+    source_id: str
+    dedup_group: str
+    receiver_type: str
+    post_ids: list[str]
+
+
+class UnitOfWorkWriter(Protocol):
+    async def write(self, marks: list[ProcessedMark], items: list[OutboxItem]) -> None:
+        pass
+
+
+class StorageUnitOfWorkWriter:
+    def __init__(
+        self, post_storage: PostStorage, outbox_storage: MessagesOutboxStorage
+    ) -> None:
+        self._post_storage = post_storage
+        self._outbox_storage = outbox_storage
+
+    async def write(self, marks: list[ProcessedMark], items: list[OutboxItem]) -> None:
+        for mark in marks:
+            await self._post_storage.mark_posts_as_processed(*mark)
+        for item in items:
+            await self._outbox_storage.put(item)
+
+
+class SqliteUnitOfWorkWriter:
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        post_storage: SqlitePostStorage,
+        outbox_storage: SqliteMessagesOutboxStorage,
+    ) -> None:
+        self._conn = conn
+        self._post_storage = post_storage
+        self._outbox_storage = outbox_storage
+
+    async def write(self, marks: list[ProcessedMark], items: list[OutboxItem]) -> None:
+        try:
+            for mark in marks:
+                self._post_storage.stage_posts_as_processed(*mark)
+            for item in items:
+                self._outbox_storage.stage_put(item)
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+
+class SqliteParseCacheStorage:
+    def __init__(self, conn: sqlite3.Connection, max_entries: int) -> None:
+        self._conn = conn
+        self._max_entries = max_entries
+
+    async def get(self, key: str) -> str | None:
+        cursor = self._conn.cursor()
+        cursor.execute("SELECT data FROM parse_cache WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
         cursor.execute(
-            """
-            SELECT id, data FROM outbox
-            WHERE in_progress_at IS NULL
-            ORDER BY created_at
-            LIMIT 1
-            """
+            "UPDATE parse_cache SET accessed_at = strftime('%s', 'now') WHERE key = ?",
+            (key,),
         )
-        item = cursor.fetchone()
-        if not item:
-            return None
+        self._conn.commit()
+        return row[0]
 
-        # Mark the item as in progress with the current timestamp
-        item_id = item[0]
+    async def put(self, key: str, data: str) -> None:
+        cursor = self._conn.cursor()
         cursor.execute(
-            "UPDATE outbox SET in_progress_at = ? WHERE id = ?",
-            (current_timestamp, item_id),
+            "INSERT OR REPLACE INTO parse_cache (key, data) VALUES (?, ?)",
+            (key, data),
+        )
+        cursor.execute(
+            """
+            DELETE FROM parse_cache WHERE key NOT IN (
+                SELECT key FROM parse_cache
+                ORDER BY accessed_at DESC, rowid DESC
+                LIMIT ?
+            )
+            """,
+            (self._max_entries,),
         )
         self._conn.commit()
 
-        return self._deserializer(item)
 
-    async def get_dead_letter(
-        self, current_timestamp: int, delta: int
-    ) -> OutboxItem | None:
+class SqliteLlmCacheStorage:
+    def __init__(self, conn: sqlite3.Connection, max_entries: int) -> None:
+        self._conn = conn
+        self._max_entries = max_entries
+
+    async def get(self, key: str, ttl_sec: float) -> tuple[str, int] | None:
         cursor = self._conn.cursor()
+        cursor.execute(
+            "SELECT result, created_at FROM llm_cache "
+            "WHERE key = ? AND created_at > strftime('%s', 'now') - ?",
+            (key, ttl_sec),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute(
+            "UPDATE llm_cache SET accessed_at = strftime('%s', 'now') WHERE key = ?",
+            (key,),
+        )
+        self._conn.commit()
+        return row[0], row[1]
+
+    async def put(self, key: str, result: str) -> None:
+        cursor = self._conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, result) VALUES (?, ?)",
+            (key, result),
+        )
+        # Expired entries are never read, so only the size is capped here
         cursor.execute(
             """
-            SELECT id, data FROM outbox
-            WHERE in_progress_at IS NOT NULL
-            AND in_progress_at <= ?
-            ORDER BY in_progress_at
-            LIMIT 1
+            DELETE FROM llm_cache WHERE key NOT IN (
+                SELECT key FROM llm_cache
+                ORDER BY accessed_at DESC, rowid DESC
+                LIMIT ?
+            )
             """,
-            (current_timestamp - delta,),
+            (self._max_entries,),
         )
-        item = cursor.fetchone()
-        if not item:
-            return None
+        self._conn.commit()
 
-        return self._deserializer(item)
 
-    async def commit(self, id: str) -> None:
+@dataclass
+class FetchCursor:
+    cursor: str | None = None
+    fetches_since_full: int = 0
+
+
+class FetchCursorStorage(Protocol):
+    async def get(self, source_id: str, url: str) -> FetchCursor | None:
+        pass
+
+    async def put(self, source_id: str, url: str, cursor: FetchCursor) -> None:
+        pass
+
+
+class MemoryFetchCursorStorage:
+    def __init__(self) -> None:
+        self._cursors: dict[tuple[str, str], FetchCursor] = {}
+
+    async def get(self, source_id: str, url: str) -> FetchCursor | None:
+        cursor = self._cursors.get((source_id, url))
+        return None if cursor is None else dataclasses.replace(cursor)
+
+    async def put(self, source_id: str, url: str, cursor: FetchCursor) -> None:
+        self._cursors[(source_id, url)] = dataclasses.replace(cursor)
+
+
+class SqliteFetchCursorStorage:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    async def get(self, source_id: str, url: str) -> FetchCursor | None:
         cursor = self._conn.cursor()
-        cursor.execute("DELETE FROM outbox WHERE id = ?", (id,))
+        cursor.execute(
+            "SELECT cursor, fetches_since_full FROM fetch_cursors "
+            "WHERE source_id = ? AND url = ?",
+            (source_id, url),
+        )
+        row = cursor.fetchone()
+        return None if row is None else FetchCursor(row[0], row[1])
+
+    async def put(self, source_id: str, url: str, cursor: FetchCursor) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO fetch_cursors "
+            "(source_id, url, cursor, fetches_since_full) VALUES (?, ?, ?, ?)",
+            (source_id, url, cursor.cursor, cursor.fetches_since_full),
+        )
         self._conn.commit()
 
 
@@ -253,6 +634,26 @@ def create_sqlite_conn(db_path: str) -> sqlite3.Connection:
         );
         """
     )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS posts_identity
+        ON posts (dedup_group, receiver_type, post_id);
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS post_signatures (
+            band       INTEGER NOT NULL,
+            post_rowid INTEGER NOT NULL
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS post_signatures_band
+        ON post_signatures (band, post_rowid);
+        """
+    )
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS outbox (
@@ -263,5 +664,35 @@ def create_sqlite_conn(db_path: str) -> sqlite3.Connection:
         );
         """
     )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS parse_cache (
+            key TEXT PRIMARY KEY,
+            data JSON NOT NULL,
+            accessed_at INTEGER DEFAULT (strftime('%s', 'now')) NOT NULL
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            created_at INTEGER DEFAULT (strftime('%s', 'now')) NOT NULL,
+            accessed_at INTEGER DEFAULT (strftime('%s', 'now')) NOT NULL
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fetch_cursors (
+            source_id          TEXT NOT NULL,
+            url                TEXT NOT NULL,
+            cursor             TEXT,
+            fetches_since_full INTEGER NOT NULL,
+            PRIMARY KEY (source_id, url)
+        );
+        """
+    )
     conn.commit()
     return conn
@@ -17,6 +17,7 @@ class ObjectMother:
         streams: Iterable[Stream] | None = None,
         dedup_group: str | None = None,
         dedup_key: str = "post_id",
+        dedup_similarity: float = 0.0,
     ) -> Source:
         if streams is None:
             streams = [self.stream()]
@@ -30,6 +31,7 @@ class ObjectMother:
             streams=list(streams),
             dedup_group=dedup_group,
             dedup_key=dedup_key,
+            dedup_similarity=dedup_similarity,
         )
 
     def stream(
@@ -41,6 +43,7 @@ class ObjectMother:
         message_template: str = "${title}\n${url}",
         modifiers: Iterable[Modifier] = (),
         pre_send_processors: Iterable[PreSendProcessor] = (),
+        id: str | None = None,
     ) -> Stream:
         return Stream(
             receiver_type=receiver_type,
@@ -50,6 +53,7 @@ class ObjectMother:
             message_template=message_template,
             modifiers=list(modifiers),
             pre_send_processors=list(pre_send_processors),
+            id=id,
         )
 
     def modifier(self, type: str, options: dict[str, Any]) -> Modifier:
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from feed_proxy.storage import MemoryPostStorage, ProcessedMark
+
+if TYPE_CHECKING:
+    from feed_proxy.storage import OutboxItem, PostStorage, UnitOfWorkWriter
+    from feed_proxy.utils.minhash import Signature
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    def __init__(self, manager: UnitOfWorkManager) -> None:
+        self._manager = manager
+        self._staged = MemoryPostStorage()
+        self.marks: list[ProcessedMark] = []
+        self.outbox_items: list[OutboxItem] = []
+
+    async def has_posts(self, source_id: str, receiver_type: str) -> bool:
+        return await self._staged.has_posts(
+            source_id, receiver_type
+        ) or await self._manager.has_posts(source_id, receiver_type)
+
+    async def any_processed(
+        self, dedup_group: str, receiver_type: str, post_ids: list[str]
+    ) -> bool:
+        return await self._staged.any_processed(
+            dedup_group, receiver_type, post_ids
+        ) or await self._manager.any_processed(dedup_group, receiver_type, post_ids)
+
+    async def any_similar(
+        self,
+        dedup_group: str,
+        receiver_type: str,
+        signature: Signature,
+        threshold: float,
+    ) -> bool:
+        return await self._staged.any_similar(
+            dedup_group, receiver_type, signature, threshold
+        ) or await self._manager.any_similar(
+            dedup_group, receiver_type, signature, threshold
+        )
+
+    async def mark_posts_as_processed(
+        self,
+        source_id: str,
+        dedup_group: str,
+        receiver_type: str,
+        post_ids: list[str],
+    ) -> None:
+        await self._staged.mark_posts_as_processed(
+            source_id, dedup_group, receiver_type, post_ids
+        )
+        self.marks.append(
+            ProcessedMark(source_id, dedup_group, receiver_type, post_ids)
+        )
+
+    async def put(self, item: OutboxItem) -> None:
+        self.outbox_items.append(item)
+
+
+class UnitOfWorkManager:
+    def __init__(
+        self,
+        writer: UnitOfWorkWriter,
+        post_storage: PostStorage,
+        group_commit_sec: float = 0.0,
+        max_group_size: int = 100,
+    ) -> None:
+        self._writer = writer
+        self._post_storage = post_storage
+        self._group_commit_sec = group_commit_sec
+        self._max_group_size = max_group_size
+        self._marks: list[ProcessedMark] = []
+        self._items: list[OutboxItem] = []
+        self._units_count = 0
+        # Marks that are committed by units but not yet written to the storage.
+        # Reads go through them, so dedup sees posts of units waiting for
+        # the group commit.
+        self._pending = MemoryPostStorage()
+        self._flushing: list[MemoryPostStorage] = []
+        self._flush_task: asyncio.Task | None = None
+
+    @asynccontextmanager
+    async def begin(self) -> AsyncIterator[UnitOfWork]:
+        unit = UnitOfWork(self)
+        yield unit
+        await self._commit(unit)
+
+    async def has_posts(self, source_id: str, receiver_type: str) -> bool:
+        for overlay in self._overlays():
+            if await overlay.has_posts(source_id, receiver_type):
+                return True
+        return await self._post_storage.has_posts(source_id, receiver_type)
+
+    async def any_processed(
+        self, dedup_group: str, receiver_type: str, post_ids: list[str]
+    ) -> bool:
+        for overlay in self._overlays():
+            if await overlay.any_processed(dedup_group, receiver_type, post_ids):
+                return True
+        return await self._post_storage.any_processed(
+            dedup_group, receiver_type, post_ids
+        )
+
+    async def any_similar(
+        self,
+        dedup_group: str,
+        receiver_type: str,
+        signature: Signature,
+        threshold: float,
+    ) -> bool:
+        for overlay in self._overlays():
+            if await overlay.any_similar(
+                dedup_group, receiver_type, signature, threshold
+            ):
+                return True
+        return await self._post_storage.any_similar(
+            dedup_group, receiver_type, signature, threshold
+        )
+
+    async def flush(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not self._units_count:
+            return
+
+        marks, items, units_count = self._marks, self._items, self._units_count
+        self._marks, self._items, self._units_count = [], [], 0
+        flushing, self._pending = self._pending, MemoryPostStorage()
+        self._flushing.append(flushing)
+        try:
+            await self._writer.write(marks, items)
+        except BaseException:
+            # Units are already committed for their callers, so nothing
+            # is dropped: they are written again with the next flush
+            for mark in marks:
+                await self._pending.mark_posts_as_processed(*mark)
+            self._marks = marks + self._marks
+            self._items = items + self._items
+            self._units_count += units_count
+            raise
+        finally:
+            self._flushing.remove(flushing)
+
+    def _overlays(self) -> list[MemoryPostStorage]:
+        return [self._pending, *self._flushing]
+
+    async def _commit(self, unit: UnitOfWork) -> None:
+        if not unit.marks and not unit.outbox_items:
+            return
+
+        for mark in unit.marks:
+            await self._pending.mark_posts_as_processed(*mark)
+        self._marks.extend(unit.marks)
+        self._items.extend(unit.outbox_items)
+        self._units_count += 1
+
+        if self._group_commit_sec <= 0 or self._units_count >= self._max_group_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._group_commit_sec)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception:  # noqa: PIE786
+            logger.exception("Failed to write grouped units of work, will retry")
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
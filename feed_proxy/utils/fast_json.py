@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import types
+from collections.abc import Callable
+from functools import lru_cache
+from typing import Any, Literal, Union, get_args, get_origin, get_type_hints
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+
+try:
+    import msgspec
+
+    HAS_MSGSPEC = True
+except ImportError:  # pragma: no cover
+    HAS_MSGSPEC = False
+
+Backend = Literal["orjson", "msgspec", "json"]
+
+
+def available_backends() -> list[Backend]:
+    backends: list[Backend] = []
+    if HAS_ORJSON:
+        backends.append("orjson")
+    if HAS_MSGSPEC:
+        backends.append("msgspec")
+    backends.append("json")
+    return backends
+
+
+BACKEND: Backend = available_backends()[0]
+
+
+def set_backend(backend: Backend) -> None:
+    global BACKEND
+    if backend not in available_backends():
+        raise ValueError(f"JSON backend {backend} is not installed")
+    BACKEND = backend
+
+
+def dumps(obj: Any, *, sort_keys: bool = False) -> str:
+    if BACKEND == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option).decode()
+    if BACKEND == "msgspec":
+        return msgspec.json.encode(obj, order="sorted" if sort_keys else None).decode()
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys)
+
+
+def loads(data: str | bytes) -> Any:
+    # Bytes are decoded as is, without making intermediate str
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def loads_as(data: str | bytes, type_: Any) -> Any:
+    # Decodes into dataclasses (and lists/unions of them) skipping the fields
+    # that are not declared. msgspec does it while decoding, without
+    # materializing unused values, other backends convert decoded dicts.
+    if HAS_MSGSPEC:
+        return _get_typed_decoder(type_).decode(data)
+    return _get_converter(type_)(loads(data))
+
+
+@lru_cache(maxsize=None)
+def _get_typed_decoder(type_: Any) -> msgspec.json.Decoder:
+    return msgspec.json.Decoder(type_)
+
+
+@lru_cache(maxsize=None)
+def _get_converter(type_: Any) -> Callable[[Any], Any]:
+    origin = get_origin(type_)
+    if origin in (Union, types.UnionType):
+        return _make_union_converter(type_)
+    if origin is list:
+        return _make_list_converter(type_)
+    if _is_dataclass(type_):
+        return _make_dataclass_converter(type_)
+    return _keep_as_is
+
+
+def _keep_as_is(value: Any) -> Any:
+    return value
+
+
+def _make_union_converter(type_: Any) -> Callable[[Any], Any]:
+    members = [
+        (
+            dict if _is_dataclass(member) else (get_origin(member) or member),
+            _get_converter(member),
+        )
+        for member in get_args(type_)
+    ]
+
+    def convert(value: Any) -> Any:
+        for member_class, member_converter in members:
+            if isinstance(value, member_class):
+                return member_converter(value)
+        raise ValueError(f"Expected {type_}, got {type(value).__name__}")
+
+    return convert
+
+
+def _make_list_converter(type_: Any) -> Callable[[Any], Any]:
+    (item_type,) = get_args(type_)
+    item_converter = _get_converter(item_type)
+
+    def convert(value: Any) -> Any:
+        if not isinstance(value, list):
+            raise ValueError(f"Expected list, got {type(value).__name__}")
+        return [item_converter(item) for item in value]
+
+    return convert
+
+
+def _make_dataclass_converter(type_: type) -> Callable[[Any], Any]:
+    hints = get_type_hints(type_)
+    fields = [
+        (
+            field.name,
+            _get_converter(hints[field.name]),
+            field.default is dataclasses.MISSING
+            and field.default_factory is dataclasses.MISSING,
+        )
+        for field in dataclasses.fields(type_)
+    ]
+
+    def convert(value: Any) -> Any:
+        if not isinstance(value, dict):
+            raise ValueError(f"Expected object, got {type(value).__name__}")
+        kwargs = {}
+        for name, field_converter, required in fields:
+            if name in value:
+                kwargs[name] = field_converter(value[name])
+            elif required:
+                raise ValueError(f"Object missing required field `{name}`")
+        return type_(**kwargs)
+
+    return convert
+
+
+def _is_dataclass(type_: Any) -> bool:
+    return isinstance(type_, type) and dataclasses.is_dataclass(type_)
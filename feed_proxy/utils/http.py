@@ -1,4 +1,7 @@
+import codecs
+import dataclasses
 import logging
+from email.message import Message
 from functools import lru_cache
 
 from tldextract import tldextract
@@ -8,9 +11,47 @@ logger = logging.getLogger(__name__)
 # https://www.whatismybrowser.com/guides/the-latest-user-agent/firefox
 DEFAULT_UA = "Mozilla/5.0 (X11; Linux i686; rv:147.0) Gecko/20100101 Firefox/147.0"
 ACCEPT_HEADER = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+# How much of the body of a failed response goes to logs
+ERROR_PREVIEW_BYTES = 1024
 
 
 @lru_cache(maxsize=None)
 def domain_from_url(url: str) -> str:
     result = tldextract.extract(url)
     return result.fqdn
+
+
+@dataclasses.dataclass(frozen=True)
+class FetchedBody:
+    content: bytes
+    content_type: str = ""
+    # Encoding forced by fetcher options, it takes precedence over everything
+    encoding: str = ""
+
+    @property
+    def charset(self) -> str:
+        if not self.content_type:
+            return ""
+        message = Message()
+        message["content-type"] = self.content_type
+        return message.get_content_charset() or ""
+
+    @property
+    def is_utf8(self) -> bool:
+        # Without a charset in the headers the body is utf-8
+        # or declares its own encoding
+        if not self.charset:
+            return True
+        try:
+            return codecs.lookup(self.charset).name == "utf-8"
+        except LookupError:
+            return False
+
+    def decode(self) -> str:
+        try:
+            return self.content.decode(
+                self.encoding or self.charset or "utf-8", errors="replace"
+            )
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
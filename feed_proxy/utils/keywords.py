@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+from functools import lru_cache
+
+
+class KeywordMatcher:
+    # Aho-Corasick automaton: text is scanned once, whatever the number
+    # of keywords
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        *,
+        ignore_case: bool = True,
+        whole_words: bool = False,
+    ) -> None:
+        self._ignore_case = ignore_case
+        self._whole_words = whole_words
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # Lengths of keywords that end in the state, longest first
+        self._out: list[tuple[int, ...]] = [()]
+        self._keywords: dict[tuple[int, int], str] = {}
+        for keyword in keywords:
+            self._add(keyword)
+        self._build()
+
+    def _add(self, keyword: str) -> None:
+        folded = self._fold(keyword)
+        if not folded:
+            return
+        state = 0
+        for char in folded:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        if not self._out[state]:
+            self._out[state] = (len(folded),)
+            self._keywords[(state, len(folded))] = keyword
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._out[next_state] += self._out[fail]
+                for length in self._out[fail]:
+                    self._keywords.setdefault(
+                        (next_state, length), self._keywords[(fail, length)]
+                    )
+
+    def _fold(self, text: str) -> str:
+        return text.casefold() if self._ignore_case else text
+
+    def search(self, text: str) -> str | None:
+        text = self._fold(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in out[state]:
+                if not self._whole_words or _is_whole_word(text, end - length + 1, end):
+                    return self._keywords[(state, length)]
+        return None
+
+    def matches(self, text: str) -> bool:
+        return self.search(text) is not None
+
+
+@lru_cache(maxsize=64)
+def get_keyword_matcher(
+    keywords: tuple[str, ...], *, ignore_case: bool = True, whole_words: bool = False
+) -> KeywordMatcher:
+    # Sources that share a keywords list (e.g. with yaml anchors) share
+    # one automaton
+    return KeywordMatcher(keywords, ignore_case=ignore_case, whole_words=whole_words)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+        return False
+    if (
+        end + 1 < len(text)
+        and _is_word_char(text[end + 1])
+        and _is_word_char(text[end])
+    ):
+        return False
+    return True
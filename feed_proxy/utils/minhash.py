@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import hashlib
+import re
+
+Signature = tuple[int, ...]
+
+NUM_HASHES = 64
+# Signatures are indexed by bands of ROWS hashes, texts with similarity
+# above ~0.6 share at least one band with high probability
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+IDENTITY_PREFIX = "minhash:"
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_HASH_MASK = (1 << 32) - 1
+_words = re.compile(r"\w+")
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+# Hash functions must be the same between restarts, signatures are stored
+_PERMUTATIONS = [
+    (_hash64(f"a{i}".encode()) % _MERSENNE_PRIME | 1, _hash64(f"b{i}".encode()))
+    for i in range(NUM_HASHES)
+]
+
+
+def minhash(text: str) -> Signature | None:
+    words = set(_words.findall(text.casefold()))
+    if not words:
+        return None
+    hashes = [_hash64(word.encode()) for word in words]
+    return tuple(
+        min(((a * value + b) % _MERSENNE_PRIME) & _HASH_MASK for value in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    # Estimate of Jaccard similarity of word sets
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def band_keys(signature: Signature) -> list[int]:
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS : (band + 1) * ROWS]
+        data = band.to_bytes(1, "big") + b"".join(
+            row.to_bytes(4, "big") for row in rows
+        )
+        # Signed, to fit into SQLite integer
+        keys.append(_hash64(data) - (1 << 63))
+    return keys
+
+
+def to_identity(signature: Signature) -> str:
+    return IDENTITY_PREFIX + "".join(f"{value:08x}" for value in signature)
+
+
+def from_identity(identity: str) -> Signature | None:
+    if not identity.startswith(IDENTITY_PREFIX):
+        return None
+    data = identity[len(IDENTITY_PREFIX) :]
+    return tuple(int(data[i : i + 8], 16) for i in range(0, len(data), 8))
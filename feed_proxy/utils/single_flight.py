@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine, Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    def __init__(self, ttl_sec: float = 0.0) -> None:
+        self._ttl_sec = ttl_sec
+        self._calls: dict[K, asyncio.Task[V]] = {}
+
+    async def do(self, key: K, func: Callable[[], Coroutine[Any, Any, V]]) -> V:
+        # Callers with the same key share one call while it's in flight
+        # and its result for ttl_sec after it's done
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+        # Cancelling one of the callers must not cancel the call for others
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: K, task: asyncio.Task[V]) -> None:
+        if self._calls.get(key) is not task:
+            return
+        # Failures are not shared with callers that come later
+        if task.cancelled() or task.exception() is not None or self._ttl_sec <= 0:
+            del self._calls[key]
+        else:
+            asyncio.get_running_loop().call_later(
+                self._ttl_sec, self._forget, key, task
+            )
+
+    def _forget(self, key: K, task: asyncio.Task[V]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
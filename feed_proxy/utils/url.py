@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DEFAULT_TRACKING_PARAMS = (
+    "utm_*",
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_hsenc",
+    "_hsmi",
+    "ref_src",
+)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(
+    url: str,
+    *,
+    strip_params: Iterable[str] = DEFAULT_TRACKING_PARAMS,
+    sort_query: bool = True,
+    strip_www: bool = True,
+) -> str:
+    # Scheme and fragment are dropped, so the result is not a working URL,
+    # only a key to compare URLs with
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").rstrip(".")
+    if strip_www:
+        host = host.removeprefix("www.")
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/")
+    is_tracking = _params_matcher(tuple(strip_params))
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking(key.lower())
+    ]
+    if sort_query:
+        query.sort()
+    canonical = f"{host}{path}"
+    if query:
+        canonical = f"{canonical}?{urlencode(query)}"
+    return canonical
+
+
+@lru_cache(maxsize=32)
+def _params_matcher(patterns: tuple[str, ...]) -> Callable[[str], object]:
+    if not patterns:
+        return lambda _: None
+    regex = "|".join(fnmatch.translate(pattern.lower()) for pattern in patterns)
+    return re.compile(regex).match
@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from feed_proxy.handlers.fetchers import fetch_pages
+from feed_proxy.handlers.fetchers.fetch_pages import FetchPagesOptions, PagesFetcher
+from feed_proxy.handlers.fetchers.fetch_text import TextFetcherInitOptions
+from feed_proxy.utils.http import FetchedBody
+
+URL = "https://site.example/search?q=flat&page={page}"
+
+
+@pytest.fixture()
+def requested(monkeypatch) -> list[str]:
+    urls: list[str] = []
+
+    async def fake_fetch_body_from_url(url: str, **kwargs) -> FetchedBody:  # noqa: U100
+        urls.append(url)
+        await asyncio.sleep(0)
+        return FetchedBody(f"body of {url[-1]}".encode())
+
+    monkeypatch.setattr(fetch_pages, "fetch_body_from_url", fake_fetch_body_from_url)
+    return urls
+
+
+@pytest.fixture()
+def sut() -> PagesFetcher:
+    return PagesFetcher(
+        options=TextFetcherInitOptions(pause_between_domain_calls_sec=0)
+    )
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+async def test_pages_are_yielded_in_order(sut, requested, concurrent):
+    options = FetchPagesOptions(url=URL, max_pages=3, concurrent=concurrent)
+
+    pages = [page.content async for page in sut(options=options)]
+
+    assert pages == [b"body of 1", b"body of 2", b"body of 3"]
+    assert sorted(requested) == [URL.replace("{page}", str(i)) for i in (1, 2, 3)]
+
+
+async def test_sequential_fetcher_does_not_request_pages_after_stop(sut, requested):
+    options = FetchPagesOptions(url=URL, max_pages=3, first_page=0)
+
+    async with aclosing(sut(options=options)) as pages:
+        async for _ in pages:
+            break
+
+    assert requested == [URL.replace("{page}", "0")]
+
+
+async def test_concurrent_fetcher_requests_all_pages_at_once(sut, monkeypatch):
+    in_flight: list[str] = []
+    max_in_flight = 0
+
+    async def fake_fetch_body_from_url(url: str, **kwargs) -> FetchedBody:  # noqa: U100
+        nonlocal max_in_flight
+        in_flight.append(url)
+        max_in_flight = max(max_in_flight, len(in_flight))
+        await asyncio.sleep(0)
+        in_flight.remove(url)
+        return FetchedBody(url.encode())
+
+    monkeypatch.setattr(fetch_pages, "fetch_body_from_url", fake_fetch_body_from_url)
+    options = FetchPagesOptions(url=URL, max_pages=3, concurrent=True)
+
+    async with aclosing(sut(options=options)) as pages:
+        async for _ in pages:
+            break
+
+    assert max_in_flight == 3
@@ -0,0 +1,196 @@
+import json
+
+import pytest
+
+from feed_proxy import handlers
+from feed_proxy.handlers import HandlerType
+from feed_proxy.handlers.fetchers import fetch_text
+from feed_proxy.handlers.fetchers.fetch_text import (
+    FetchTextOptions,
+    TextFetcher,
+    TextFetcherInitOptions,
+)
+from feed_proxy.storage import (
+    MemoryFetchCursorStorage,
+    SqliteFetchCursorStorage,
+    create_sqlite_conn,
+)
+from feed_proxy.utils.http import FetchedBody
+
+REDDIT_URL = "https://www.reddit.com/r/python/new.json?limit=100"
+WORDPRESS_URL = "https://blog.example/wp-json/wp/v2/posts"
+
+
+def _reddit_listing(*names: str) -> str:
+    children = [
+        {"kind": "t3", "data": {"name": name, "id": name[3:]}} for name in names
+    ]
+    return json.dumps({"kind": "Listing", "data": {"children": children}})
+
+
+def _wordpress_posts(*dates: str) -> str:
+    return json.dumps([{"id": i, "date": date} for i, date in enumerate(dates)])
+
+
+@pytest.fixture()
+def responses(monkeypatch):
+    requested: list[str] = []
+    queue: list[str | None] = []
+
+    async def fake_fetch_body_from_url(
+        url: str, **kwargs  # noqa: U100
+    ) -> FetchedBody | None:
+        requested.append(url)
+        text = queue.pop(0)
+        return None if text is None else FetchedBody(text.encode())
+
+    monkeypatch.setattr(fetch_text, "fetch_body_from_url", fake_fetch_body_from_url)
+
+    class Responses:
+        def __init__(self) -> None:
+            self.requested = requested
+
+        def add(self, *texts: str | None) -> None:
+            queue.extend(texts)
+
+    return Responses()
+
+
+@pytest.fixture(autouse=True)
+def cursor_storage(monkeypatch):
+    storage = MemoryFetchCursorStorage()
+    monkeypatch.setattr(fetch_text, "_get_cursor_storage", lambda: storage)
+    return storage
+
+
+@pytest.fixture()
+def sut() -> TextFetcher:
+    return TextFetcher(options=TextFetcherInitOptions(pause_between_domain_calls_sec=0))
+
+
+async def test_without_cursor_url_is_requested_as_is(sut, responses):
+    responses.add(_reddit_listing("t3_b"), _reddit_listing("t3_b"))
+    options = FetchTextOptions(url=REDDIT_URL)
+
+    await sut(options=options, source_id="src")
+    await sut(options=options, source_id="src")
+
+    assert responses.requested == [REDDIT_URL, REDDIT_URL]
+
+
+async def test_reddit_requests_items_before_newest_seen(sut, responses):
+    responses.add(
+        _reddit_listing("t3_b", "t3_a"), _reddit_listing("t3_c"), _reddit_listing()
+    )
+    options = FetchTextOptions(url=REDDIT_URL, cursor="reddit")
+
+    for _ in range(3):
+        await sut(options=options, source_id="src")
+
+    assert responses.requested == [
+        REDDIT_URL,
+        f"{REDDIT_URL}&before=t3_b",
+        f"{REDDIT_URL}&before=t3_c",
+    ]
+
+
+async def test_wordpress_requests_items_after_newest_date(sut, responses):
+    responses.add(_wordpress_posts("2024-01-02T10:00:00", "2024-01-01T10:00:00"), "[]")
+    options = FetchTextOptions(url=WORDPRESS_URL, cursor="wordpress")
+
+    for _ in range(2):
+        await sut(options=options, source_id="src")
+
+    assert responses.requested == [
+        WORDPRESS_URL,
+        f"{WORDPRESS_URL}?after=2024-01-02T10%3A00%3A00",
+    ]
+
+
+async def test_full_request_is_made_periodically(sut, responses):
+    responses.add(*[_reddit_listing("t3_a")] * 4)
+    options = FetchTextOptions(url=REDDIT_URL, cursor="reddit", full_fetch_every=2)
+
+    for _ in range(4):
+        await sut(options=options, source_id="src")
+
+    assert responses.requested == [
+        REDDIT_URL,
+        f"{REDDIT_URL}&before=t3_a",
+        f"{REDDIT_URL}&before=t3_a",
+        REDDIT_URL,
+    ]
+
+
+async def test_cursor_is_kept_if_response_is_failed_or_unexpected(sut, responses):
+    responses.add(_reddit_listing("t3_a"), None, '{"error": 429}')
+    responses.add(_reddit_listing())
+    options = FetchTextOptions(url=REDDIT_URL, cursor="reddit", full_fetch_every=10)
+
+    for _ in range(4):
+        await sut(options=options, source_id="src")
+
+    assert responses.requested[1:] == [f"{REDDIT_URL}&before=t3_a"] * 3
+
+
+async def test_sources_with_same_url_have_own_cursors(sut, responses):
+    responses.add(
+        _reddit_listing("t3_b"),
+        _reddit_listing("t3_c"),
+        _reddit_listing("t3_a"),
+        _reddit_listing(),
+    )
+    options = FetchTextOptions(url=REDDIT_URL, cursor="reddit")
+
+    for source_id in ("first", "first", "second", "second"):
+        await sut(options=options, source_id=source_id)
+
+    assert responses.requested == [
+        REDDIT_URL,
+        f"{REDDIT_URL}&before=t3_b",
+        REDDIT_URL,
+        f"{REDDIT_URL}&before=t3_a",
+    ]
+
+
+async def test_cursor_survives_restart(responses, monkeypatch, tmp_path):
+    db_path = str(tmp_path / "db.sqlite")
+    responses.add(_reddit_listing("t3_b"), _reddit_listing())
+    options = FetchTextOptions(url=REDDIT_URL, cursor="reddit")
+
+    for _ in range(2):
+        storage = SqliteFetchCursorStorage(create_sqlite_conn(db_path))
+        monkeypatch.setattr(fetch_text, "_get_cursor_storage", lambda: storage)
+        sut = TextFetcher(
+            options=TextFetcherInitOptions(pause_between_domain_calls_sec=0)
+        )
+        await sut(options=options, source_id="src")
+
+    assert responses.requested == [REDDIT_URL, f"{REDDIT_URL}&before=t3_b"]
+
+
+@pytest.mark.parametrize(
+    "cursor, is_shared", [("", True), ("reddit", False), ("wordpress", False)]
+)
+def test_only_fetches_without_cursor_are_shared_between_sources(
+    sut, mother, monkeypatch, cursor, is_shared
+):
+    handler = handlers.Handler("fetch_text", sut, FetchTextOptions, None)
+    monkeypatch.setattr(
+        handlers,
+        "get_registered_handlers",
+        lambda: {HandlerType.fetchers: {"fetch_text": handler}},
+    )
+    first, second = (
+        handlers.SourcePlan(
+            mother.source(
+                id=source_id,
+                fetcher_type="fetch_text",
+                fetcher_options={"url": REDDIT_URL, "cursor": cursor},
+            )
+        )
+        for source_id in ("first", "second")
+    )
+
+    assert (first.fetch_key == second.fetch_key) is is_shared
+    assert first.fetcher.keywords.get("source_id") == (None if is_shared else "first")
@@ -0,0 +1,124 @@
+import pytest
+
+from feed_proxy.handlers.modifiers.filter_expr import (
+    FilterExpressionError,
+    FilterExprOptions,
+    filter_expr,
+    parse_number,
+)
+from feed_proxy.handlers.parsers.idealista import IdealistaItem
+from feed_proxy.handlers.parsers.rss import FeedPost
+
+
+async def _filter(posts, expression):
+    return await filter_expr(posts, options=FilterExprOptions(expression=expression))
+
+
+@pytest.mark.parametrize(
+    "expression,expected",
+    [
+        ("score > 100", ["hot"]),
+        ("score >= 10 and score <= 100", ["warm"]),
+        ("10 < score < 1000", ["hot", "warm"]),
+        ("not score", ["unknown"]),
+        ("score > 100 or title == 'Unknown'", ["hot", "unknown"]),
+        ("extras.lang in ['en', 'de']", ["hot", "unknown"]),
+        ("extras['lang'] not in ('en', 'de')", ["warm"]),
+        ("lang == 'uk'", ["warm"]),
+        ("matches(title, '(?i)^h')", ["hot"]),
+        ("lower(title) == 'warm'", ["warm"]),
+        ("number(extras.price) > 9.5", ["warm"]),
+    ],
+)
+async def test_keeps_posts_for_which_expression_is_true(
+    make_feed_post, expression, expected
+):
+    posts = [
+        make_feed_post(post_id="hot", title="Hot", extras={"score": 500, "lang": "en"}),
+        make_feed_post(
+            post_id="warm",
+            title="Warm",
+            extras={"score": "50", "lang": "uk", "price": "9,99"},
+        ),
+        make_feed_post(post_id="unknown", title="Unknown", extras={"lang": "de"}),
+    ]
+
+    result = await _filter(posts, expression)
+
+    assert [post.post_id for post in result] == expected
+
+
+async def test_missing_field_compared_with_number_is_false(make_feed_post):
+    posts = [make_feed_post(extras={"score": "n/a"}), make_feed_post(extras={})]
+
+    result = await _filter(posts, "score > 1 or score < 1")
+
+    assert result == []
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "score >",
+        "__import__('os').system('ls')",
+        "title.upper() == 'A'",
+        "score + 1 > 2",
+        "matches(title, '(')",
+        "matches(title, pattern)",
+        "[x for x in title]",
+    ],
+)
+def test_invalid_expression_raises_when_options_are_created(expression):
+    with pytest.raises(FilterExpressionError):
+        FilterExprOptions(expression=expression)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("1,200", 1200),
+        ("1.200€", 1200),
+        ("1.200.000 €", 1_200_000),
+        ("$1,200.50", 1200.5),
+        ("1.200,50 €", 1200.5),
+        ("1\xa0200 zł", 1200),
+        ("1'250.75", 1250.75),
+        ("950 €/mes", 950),
+        ("9,99", 9.99),
+        ("0,250", 0.25),
+        ("1.5", 1.5),
+        ("-5", -5),
+        (42, 42),
+        ("n/a", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+async def test_formatted_prices_are_compared_as_numbers(make_feed_post):
+    posts = [
+        make_feed_post(post_id=post_id, extras={"money": money})
+        for post_id, money in (("cheap", "950€"), ("dear", "1.200€"), ("mid", "1,100"))
+    ]
+
+    result = await _filter(posts, "extras.money < 1150")
+
+    assert [post.post_id for post in result] == ["cheap", "mid"]
+
+
+def test_unknown_names_are_rejected_for_post_model():
+    options = FilterExprOptions(expression="number(mony) < 1000 or extras.rooms > 2")
+
+    with pytest.raises(FilterExpressionError, match="Unknown names mony"):
+        options.check_post_model(IdealistaItem)
+
+
+def test_post_fields_and_extras_are_accepted_for_post_model():
+    options = FilterExprOptions(
+        expression="matches(title, 'x') and extras['lang'] == 'en' and url"
+    )
+
+    options.check_post_model(FeedPost)
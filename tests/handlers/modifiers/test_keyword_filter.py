@@ -0,0 +1,48 @@
+from feed_proxy.handlers.modifiers.keyword_filter import (
+    KeywordFilterOptions,
+    keyword_filter,
+)
+
+
+async def test_drops_posts_with_keywords(make_feed_post):
+    posts = [
+        make_feed_post(post_id="1", title="New Casino opens"),
+        make_feed_post(post_id="2", title="Weather", description="Sponsored post"),
+        make_feed_post(post_id="3", title="Weather", description="Sunny"),
+    ]
+    options = KeywordFilterOptions(keywords=["casino", "sponsored"])
+
+    result = await keyword_filter(posts, options=options)
+
+    assert [post.post_id for post in result] == ["3"]
+
+
+async def test_keeps_only_posts_with_keywords_in_include_mode(make_feed_post):
+    posts = [
+        make_feed_post(post_id="1", title="Python 3.13 released"),
+        make_feed_post(post_id="2", title="Rust 2.0"),
+    ]
+    options = KeywordFilterOptions(keywords=["python"], mode="include")
+
+    result = await keyword_filter(posts, options=options)
+
+    assert [post.post_id for post in result] == ["1"]
+
+
+async def test_looks_only_in_given_fields_and_extras(make_feed_post):
+    posts = [
+        make_feed_post(post_id="1", title="casino", extras={"author": "bob"}),
+        make_feed_post(post_id="2", title="news", extras={"author": "Spam Bot"}),
+    ]
+    options = KeywordFilterOptions(keywords=["spam bot"], fields=["author"])
+
+    result = await keyword_filter(posts, options=options)
+
+    assert [post.post_id for post in result] == ["1"]
+
+
+def test_options_with_same_keywords_share_matcher():
+    first = KeywordFilterOptions(keywords=["a", "b"])
+    second = KeywordFilterOptions(keywords=["a", "b"], mode="include")
+
+    assert first.matcher is second.matcher
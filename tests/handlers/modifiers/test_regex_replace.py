@@ -1,3 +1,5 @@
+import pytest
+
 from feed_proxy.handlers.modifiers.regex_replace import regex_replace
 
 
@@ -81,3 +83,8 @@ async def test_replaces_matches_in_every_post_of_the_batch(
     result = await regex_replace([first, second], options=options)
 
     assert [post.description for post in result] == ["a", "b"]
+
+
+def test_invalid_pattern_raises_when_options_are_created(make_regex_replace_options):
+    with pytest.raises(ValueError, match="Invalid pattern"):
+        make_regex_replace_options(pattern="(")
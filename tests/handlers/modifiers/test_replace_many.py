@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from feed_proxy.handlers.modifiers.replace_many import ReplaceManyOptions, replace_many
+
+
+async def test_applies_rules_in_order_to_every_field(make_feed_post):
+    post = make_feed_post(title="Read more...", description="<p>Read more</p>")
+    options = ReplaceManyOptions(
+        fields=["title", "description"],
+        rules=[
+            {"old": "Read more", "new": "More"},
+            {"old": "...", "new": "…"},
+            {"pattern": r"</?p>"},
+            {"pattern": r"^(\w+)$", "new": r"[\1]"},
+        ],
+    )
+
+    [result] = await replace_many([post], options=options)
+
+    assert (result.title, result.description) == ("More…", "[More]")
+
+
+@pytest.mark.parametrize(
+    "rules, value, expected",
+    [
+        ([("b", "x"), ("abc", "y")], "abc", "axc"),
+        ([("a", "b"), ("b", "c")], "a", "c"),
+        ([("&nbsp;", " "), ("  ", " ")], "a&nbsp; b", "a b"),
+        ([("b", ""), ("ac", "Z")], "abc", "Z"),
+        ([("ab", "1"), ("bc", "2")], "abc", "1c"),
+        ([("a", "b"), ("ab", "X"), ("b", "c")], "a ab b", "c cc c"),
+    ],
+)
+async def test_text_rules_give_same_result_as_applied_one_by_one(
+    make_feed_post, rules, value, expected
+):
+    post = make_feed_post(title=value)
+    options = ReplaceManyOptions(
+        fields=["title"], rules=[{"old": old, "new": new} for old, new in rules]
+    )
+
+    [result] = await replace_many([post], options=options)
+
+    assert result.title == expected
+
+
+def test_independent_text_rules_are_applied_in_one_pass():
+    options = ReplaceManyOptions(
+        fields=["title"],
+        rules=[
+            {"old": "&nbsp;", "new": " "},
+            {"old": "«", "new": '"'},
+            {"old": "&amp;", "new": "&"},
+        ],
+    )
+
+    assert len(options.steps) == 1
+
+
+def test_text_rules_match_sequential_replace_on_random_input():
+    rnd = random.Random(0)  # noqa: S311
+    for _ in range(2000):
+        rules = [
+            (
+                "".join(rnd.choices("ab ", k=rnd.randint(1, 3))),
+                "".join(rnd.choices("abc ", k=rnd.randint(0, 2))),
+            )
+            for _ in range(rnd.randint(2, 4))
+        ]
+        value = "".join(rnd.choices("abc ", k=rnd.randint(0, 12)))
+        options = ReplaceManyOptions(
+            fields=["title"], rules=[{"old": old, "new": new} for old, new in rules]
+        )
+        expected = value
+        for old, new in rules:
+            expected = expected.replace(old, new)
+
+        result = value
+        for step in options.steps:
+            result = step(result)
+
+        assert result == expected, (rules, value)
+
+
+async def test_single_char_rules(make_feed_post):
+    post = make_feed_post(title="«quoted»")
+    options = ReplaceManyOptions(
+        fields=["title"],
+        rules=[{"old": "«", "new": '"'}, {"old": "»", "new": '"'}],
+    )
+
+    [result] = await replace_many([post], options=options)
+
+    assert result.title == '"quoted"'
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [{}, {"old": "a", "pattern": "a"}, {"pattern": "("}, {"unknown": "a"}],
+)
+def test_invalid_rule_raises_when_options_are_created(rule):
+    with pytest.raises(ValueError):
+        ReplaceManyOptions(fields=["title"], rules=[rule])
@@ -1,3 +1,5 @@
+import pytest
+
 from feed_proxy.handlers.modifiers.strip_html import strip_html
 
 
@@ -60,3 +62,43 @@ async def test_strips_tags_in_every_post_of_the_batch(
     result = await strip_html([first, second], options=options)
 
     assert [post.description for post in result] == ["a", "b"]
+
+
+COMPATIBILITY_SAMPLES = [
+    "",
+    "Just plain text",
+    "  text with\r\nnewlines\t",
+    "a < b && c > d",
+    "<p>Hello</p>\n<p>World</p>",
+    "<p>Lorem <a href='https://x.y'>ipsum</a> &amp; dolor &#8230; &nbsp;sit</p>",
+    "<!-- comment -->t<script>var a = 1 < 2;</script>u<style>a {}</style>v",
+    "<template>hidden <b>text</b></template>shown",
+    "<ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby>",
+    "<pre> \n </pre><p> \n </p><textarea>\t</textarea>",
+    "<!DOCTYPE html><html><head><title>T</title></head><body>B</body></html>",
+    "<?php echo 1; ?>after<![CDATA[data]]>",
+    "text <unclosed",
+    "<b>bold<i>both</b>italic</i>",
+    "<table><tr><td>a</td><td>b</td></tr></table>",
+    "\ufeff<p>bom</p>",
+    "a\x00b\x01c",
+    "<figure><img src='a.jpg'/><figcaption>Caption</figcaption></figure>\n" * 3,
+]
+
+
+@pytest.mark.parametrize("value", COMPATIBILITY_SAMPLES)
+@pytest.mark.parametrize("separator", [" ", "\n", ""])
+async def test_lxml_engine_gives_same_text_as_bs4(
+    make_feed_post, make_strip_html_options, value, separator
+):
+    lxml_posts = [make_feed_post(description=value)]
+    bs4_posts = [make_feed_post(description=value)]
+
+    await strip_html(
+        lxml_posts, options=make_strip_html_options(separator=separator, engine="lxml")
+    )
+    await strip_html(
+        bs4_posts, options=make_strip_html_options(separator=separator, engine="bs4")
+    )
+
+    assert lxml_posts[0].description == bs4_posts[0].description
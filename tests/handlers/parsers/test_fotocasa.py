@@ -0,0 +1,145 @@
+import json
+from typing import Any
+
+from feed_proxy.handlers.parsers.fotocasa import (
+    FotocasaItem,
+    _decode_js_string,
+    fotocasa,
+)
+from feed_proxy.utils import fast_json
+
+
+def _make_estate(**kwargs: Any) -> dict[str, Any]:
+    defaults: dict[str, Any] = {
+        "id": 1,
+        "buildingType": "Flat",
+        "location": "Málaga Capital",
+        "price": "1.200 €/mes",
+        "detail": {"es-ES": "/es/alquiler/vivienda/malaga-capital/1"},
+        "features": [
+            {"key": "rooms", "value": 3},
+            {"key": "bathrooms", "value": 1},
+            {"key": "surface", "value": 85},
+            {"key": "elevator", "value": True},
+        ],
+    }
+    return {**defaults, **kwargs}
+
+
+def _make_props(*estates: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "initialSearch": {
+            "result": {"realEstates": list(estates), "count": len(estates)},
+        },
+        "footer": {"links": ["a"] * 100},
+    }
+
+
+def _make_page(js_literal: str) -> str:
+    return (
+        '<html><head><script>var other = JSON.parse("{}");</script>'
+        f"<script>window.__INITIAL_PROPS__ = JSON.parse({js_literal});</script>"
+        "</head><body><div id='app'></div></body></html>"
+    )
+
+
+def _to_js_literal(props: dict[str, Any], ensure_ascii: bool = True) -> str:
+    return json.dumps(json.dumps(props, ensure_ascii=ensure_ascii), ensure_ascii=False)
+
+
+async def test_real_estates_are_mapped_to_items():
+    page = _make_page(_to_js_literal(_make_props(_make_estate())))
+
+    items = await fotocasa(page)
+
+    assert items == [
+        FotocasaItem(
+            post_id="1_1.200 €/mes",
+            title="Piso de 85 m² en Málaga Capital",
+            url="https://www.fotocasa.es/es/alquiler/vivienda/malaga-capital/1",
+            money="1.200 €/mes",
+            details=["3 habs", "1 baño", "85 m²", "Ascensor"],
+            source_tags=[],
+        )
+    ]
+
+
+async def test_non_ascii_characters_are_decoded_in_escaped_and_raw_form():
+    props = _make_props(_make_estate(location="Málaga"))
+
+    escaped = await fotocasa(_make_page(_to_js_literal(props)))
+    raw = await fotocasa(_make_page(_to_js_literal(props, ensure_ascii=False)))
+
+    assert escaped[0].title == raw[0].title == "Piso de 85 m² en Málaga"
+
+
+async def test_js_only_escapes_are_decoded():
+    props = _make_props(_make_estate(location="L'Hospitalet á \\x"))
+    inner_json = json.dumps(props, ensure_ascii=False)
+    literal = json.dumps(inner_json).replace("'", "\\'").replace("\\u00e1", "\\xe1")
+
+    items = await fotocasa(_make_page(literal))
+
+    assert items[0].title == "Piso de 85 m² en L'Hospitalet á \\x"
+
+
+async def test_real_estates_are_taken_from_initial_search_result():
+    props = {
+        "recommendations": {"realEstates": [_make_estate(id=2)]},
+        **_make_props(_make_estate(id=1)),
+    }
+
+    items = await fotocasa(_make_page(_to_js_literal(props)))
+
+    assert [item.post_id for item in items] == ["1_1.200 €/mes"]
+
+
+async def test_real_estates_are_taken_from_top_level_initial_search_only():
+    props = {
+        "seo": {"initialSearch": {"result": {"realEstates": [_make_estate(id=3)]}}},
+        "initialSearch": {
+            "filters": {"result": {"realEstates": [_make_estate(id=2)]}},
+            "result": {"realEstates": [_make_estate(id=1)]},
+        },
+    }
+
+    items = await fotocasa(_make_page(_to_js_literal(props)))
+
+    assert [item.post_id for item in items] == ["1_1.200 €/mes"]
+
+
+def test_vertical_tab_and_null_escapes_are_decoded():
+    literal = r'"A\vB\0C"'
+
+    assert _decode_js_string(f"JSON.parse({literal})", 11) == "A\vB\0C"
+
+
+async def test_props_are_decoded_with_fast_json(monkeypatch):
+    decoded = []
+    loads = fast_json.loads
+
+    def counting_loads(data):
+        decoded.append(data)
+        return loads(data)
+
+    monkeypatch.setattr(fast_json, "loads", counting_loads)
+    props = _make_props(_make_estate())
+
+    items = await fotocasa(_make_page(_to_js_literal(props)))
+
+    assert len(items) == 1
+    assert decoded == [json.dumps(props)]
+
+
+async def test_page_without_real_estates_gives_no_items():
+    page = _make_page(_to_js_literal({"initialSearch": {}}))
+
+    items = await fotocasa(page)
+
+    assert items == []
+
+
+async def test_page_without_initial_props_gives_no_items():
+    items = await fotocasa("<html><body>Captcha</body></html>")
+
+    assert items == []
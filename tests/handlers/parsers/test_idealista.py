@@ -0,0 +1,81 @@
+from feed_proxy.handlers.parsers.idealista import IdealistaItem, idealista
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+  <title>Pisos en alquiler</title>
+  <script>var article = "<article class='item'></article>";</script>
+</head>
+<body>
+  <main class="items-container">
+    <article class="item extended-item item-multimedia-container" data-element-id="1">
+      <div class="item-info-container">
+        <a href="/inmueble/101/" role="heading" class="item-link"
+           title="Piso en calle Mayor">
+          Piso en  <em>calle Mayor</em>, Sol
+          <!-- promoted -->
+        </a>
+        <div class="price-row">
+          <span class="item-price h2-simulated">1.200<span class="txt">€/mes</span>
+          </span>
+        </div>
+        <div class="item-detail-char">
+          <span class="item-detail">3 hab.</span>
+          <span class="item-detail">85 m²</span>
+          <span class="item-detail">
+            Planta 2ª <small>exterior</small> con ascensor
+          </span>
+          <span class="item-detail"> </span>
+          <span class="item-detail-extra">Garaje incluido</span>
+        </div>
+      </div>
+    </article>
+    <article class="item" data-element-id="2">
+      <a class="item-link" href="https://www.idealista.com/inmueble/202/">Ático</a>
+      <script>window.track("202")</script>
+    </article>
+    <article class="adv item-multimedia">
+      <a class="item-link" href="/inmueble/303/">Advertisement</a>
+    </article>
+    <article class="item">
+      <span class="item-price">No link</span>
+    </article>
+  </main>
+</body>
+</html>
+"""
+
+
+async def test_articles_are_mapped_to_items():
+    items = await idealista(PAGE)
+
+    assert items == [
+        IdealistaItem(
+            post_id="101_1.200€/mes",
+            title="Piso encalle Mayor, Sol",
+            url="https://www.idealista.com/inmueble/101/",
+            money="1.200€/mes",
+            details=["3 hab.", "85 m²", "Planta 2ªexteriorcon ascensor"],
+            source_tags=[],
+        ),
+        IdealistaItem(
+            post_id="202_",
+            title="Ático",
+            url="https://www.idealista.com/inmueble/202/",
+            money="",
+            details=[],
+            source_tags=[],
+        ),
+    ]
+
+
+async def test_page_without_articles_gives_no_items():
+    items = await idealista("<html><body><p>Captcha</p></body></html>")
+
+    assert items == []
+
+
+async def test_blank_page_gives_no_items():
+    items = await idealista("  \n ")
+
+    assert items == []
@@ -0,0 +1,43 @@
+import json
+
+from feed_proxy.handlers.parsers.reddit_json import RedditPost, reddit_json
+
+
+def _make_listing_json() -> str:
+    return json.dumps(
+        {
+            "kind": "Listing",
+            "data": {
+                "after": "t3_2",
+                "children": [
+                    {
+                        "kind": "t3",
+                        "data": {
+                            "id": "abc",
+                            "title": "Python 3.14 released",
+                            "url": "https://python.org/downloads",
+                            "permalink": "/r/Python/comments/abc/python_314/",
+                            "score": 1024,
+                            "selftext_html": "<p>" + "Long text " * 1000 + "</p>",
+                            "preview": {"images": [{"source": {"url": "x"}}]},
+                        },
+                    }
+                ],
+            },
+        }
+    )
+
+
+async def test_listing_children_are_mapped_to_posts():
+    posts = await reddit_json(_make_listing_json())
+
+    assert posts == [
+        RedditPost(
+            post_id="abc",
+            title="Python 3.14 released",
+            url="https://python.org/downloads",
+            comments_url="https://reddit.com/r/Python/comments/abc/python_314/",
+            score=1024,
+            source_tags=[],
+        )
+    ]
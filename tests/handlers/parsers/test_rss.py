@@ -2,7 +2,16 @@ from typing import Any
 
 import pytest
 
-from feed_proxy.handlers.parsers.rss import FeedPost, _handler
+from feed_proxy.handlers.parsers import rss as rss_module
+from feed_proxy.handlers.parsers.rss import (
+    CHUNK_SIZE,
+    FeedPost,
+    RSSOptions,
+    _handler,
+    _parse_with_feedparser,
+    iter_feed_posts,
+    rss,
+)
 
 
 @pytest.fixture()
@@ -95,3 +104,410 @@ def test_description_defaults_to_empty_string():
     posts = _handler(text)
 
     assert posts[0].description == ""
+
+
+def _make_feed(count: int, description: str = "Summary") -> str:
+    items = "".join(
+        f"""
+    <item>
+      <guid>post-{i}</guid>
+      <title>Post {i}</title>
+      <link>https://post.url/{i}</link>
+      <category>tag{i}</category>
+      <description>{description}</description>
+    </item>"""
+        for i in range(count)
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Test feed</title>{items}
+  </channel>
+</rss>
+"""
+
+
+def _is_known_from(known_ids: set[str], checked: list[str] | None = None):
+    async def is_known(post_id: str) -> bool:
+        if checked is not None:
+            checked.append(post_id)
+        return post_id in known_ids
+
+    return is_known
+
+
+async def test_incremental_parse_stops_at_first_known_post():
+    checked: list[str] = []
+    text = _make_feed(500)
+
+    posts = await rss(
+        text,
+        options=RSSOptions(incremental=True),
+        is_known=_is_known_from({"post-2", "post-3"}, checked),
+    )
+
+    assert posts == _handler(text)[:3]
+    assert checked == ["post-0", "post-1", "post-2"]
+
+
+async def test_incremental_parse_stops_after_configured_known_streak():
+    text = _make_feed(10)
+
+    posts = await rss(
+        text,
+        options=RSSOptions(incremental=True, stop_after_known=2),
+        is_known=_is_known_from({"post-1", "post-3", "post-4", "post-5"}),
+    )
+
+    assert [post.post_id for post in posts] == [f"post-{i}" for i in range(5)]
+
+
+async def test_incremental_parse_without_known_posts_returns_whole_feed():
+    text = _make_feed(300, description="Long summary " * 50)
+
+    posts = await rss(
+        text, options=RSSOptions(incremental=True), is_known=_is_known_from(set())
+    )
+
+    assert len(text) > CHUNK_SIZE
+    assert posts == _handler(text)
+
+
+async def test_incremental_parse_falls_back_to_feedparser_on_malformed_feed():
+    text = _make_feed(3).replace("Post 1", "Post & 1")
+
+    posts = await rss(
+        text, options=RSSOptions(incremental=True), is_known=_is_known_from(set())
+    )
+
+    assert [post.title for post in posts] == ["Post 0", "Post & 1", "Post 2"]
+
+
+async def test_is_known_is_ignored_when_incremental_mode_is_off():
+    text = _make_feed(3)
+
+    posts = await rss(text, is_known=_is_known_from({"post-0"}))
+
+    assert len(posts) == 3
+
+
+async def test_streaming_reader_matches_feedparser_for_atom():
+    text = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Test feed</title>
+  <entry>
+    <title type="html">&lt;i&gt;Post&lt;/i&gt; title</title>
+    <id>tag:post-1</id>
+    <link rel="replies" href="https://post.url/1/replies"/>
+    <link rel="alternate" href="https://post.url/1"/>
+    <category term="python"/>
+    <content type="html">
+      &lt;p onclick="x()"&gt;Content&lt;script&gt;1&lt;/script&gt;&lt;/p&gt;
+    </content>
+  </entry>
+  <entry>
+    <title>Post 2</title>
+    <id>tag:post-2</id>
+    <link href="https://post.url/2"/>
+    <summary>Summary</summary>
+  </entry>
+</feed>
+"""
+
+    posts = [post async for post in iter_feed_posts(text)]
+
+    assert posts == _handler(text)
+
+
+RSS_TEMPLATE = (
+    '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/"><channel><title>F</title>'
+    "{}</channel></rss>"
+)
+ATOM_TEMPLATE = '<feed xmlns="http://www.w3.org/2005/Atom"><title>F</title>{}</feed>'
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        RSS_TEMPLATE.format(
+            "<item><guid>1</guid><title><![CDATA[Hi <script>x</script>]]></title>"
+            "<link>https://a/1</link></item>"
+        ),
+        RSS_TEMPLATE.format(
+            '<item><guid>1</guid><title>Hi &lt;b onclick="x"&gt;b&lt;/b&gt;</title>'
+            "</item>"
+        ),
+        RSS_TEMPLATE.format(
+            "<item><guid>1</guid><title>A &amp;lt; B &#8212; C</title>"
+            "<link> https://a/1 </link><description> x &lt;b&gt;y&lt;/b&gt; "
+            "</description></item>"
+        ),
+        RSS_TEMPLATE.format(
+            '<item><guid isPermaLink="true">https://a/1</guid><title>T</title>'
+            "<content:encoded><![CDATA[<p>Full</p>]]></content:encoded></item>"
+        ),
+        RSS_TEMPLATE.format(
+            "<item><title>T</title><link>https://a/1</link><description>Short"
+            "</description><content:encoded><![CDATA[<p>Full</p>]]>"
+            "</content:encoded></item>"
+        ),
+        RSS_TEMPLATE.format(
+            "<item><dc:title>DC</dc:title><title>T</title><link>http://a/1</link>"
+            "<dc:subject>subj</dc:subject><dc:creator>me</dc:creator></item>"
+        ),
+        RSS_TEMPLATE.format(
+            '<item><guid isPermaLink="false">1</guid><title>T</title></item>'
+        ),
+        RSS_TEMPLATE.format(
+            "<item><guid>1</guid><title>T</title><link>https://b</link>"
+            '<category domain="x">c1</category><comments>https://b/c</comments>'
+            "</item>"
+        ),
+        RSS_TEMPLATE.format(
+            "<item><guid></guid><title>T</title><link>https://a/1</link></item>"
+            "<item><guid>1</guid><link>https://a/1</link></item>"
+            "<item><title>No id and link</title></item>"
+        ),
+        RSS_TEMPLATE.format(
+            "<item><guid>1</guid><title>T &amp; U</title><description>"
+            '&lt;img src="/x.png" style="a"&gt; plain &amp; text</description>'
+            "</item>"
+        ),
+        RSS_TEMPLATE.format(
+            "<item><guid>1</guid><title>Привіт — “quotes”</title>"
+            "<description>Текст</description></item>"
+        ),
+        ATOM_TEMPLATE.format(
+            '<entry><title type="html">&lt;b onclick="x"&gt;Hi&lt;/b&gt; '
+            "&lt;script&gt;x&lt;/script&gt;</title><id>1</id></entry>"
+        ),
+        ATOM_TEMPLATE.format(
+            '<entry><title>T</title><id>1</id><link href="https://a"/>'
+            '<content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml">'
+            "<p>Hi</p></div></content></entry>"
+        ),
+        ATOM_TEMPLATE.format(
+            '<entry><title type="text">a &lt; b</title><id>1</id>'
+            '<link href="https://a"/><summary type="text">x &lt;b&gt; y</summary>'
+            "</entry>"
+        ),
+        ATOM_TEMPLATE.format(
+            "<entry><title>T</title><id>tag:1</id>"
+            '<link rel="replies" href="https://r"/>'
+            '<link rel="alternate" href="https://1"/><link href="https://2"/>'
+            '<category term="a"/><category term="b" label="B"/></entry>'
+        ),
+        ATOM_TEMPLATE.format(
+            '<entry><title>T</title><id>1</id><summary type="html">&lt;p&gt;S&lt;/p&gt;'
+            '</summary><content type="html">&lt;p&gt;C&lt;/p&gt;</content></entry>'
+        ),
+    ],
+)
+def test_lxml_parser_matches_feedparser(text):
+    result = _handler(text)
+
+    assert result == _parse_with_feedparser(text)
+
+
+XML_BASE_FEED = """<feed xmlns="http://www.w3.org/2005/Atom"
+  xml:base="https://ex.com/blog/">
+  <title>F</title>
+  <entry>
+    <title>T</title><id>tag:1</id><link href="post1"/>
+    <content type="html">
+      &lt;a href="/rel"&gt;a&lt;/a&gt;&lt;img src="i.png"&gt;
+    </content>
+  </entry>
+</feed>
+"""
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        XML_BASE_FEED,
+        ATOM_TEMPLATE.format(
+            '<entry xml:base="https://ex.com/a/"><title>T</title><id>1</id>'
+            '<link href="b"/></entry>'
+        ),
+        ATOM_TEMPLATE.format(
+            '<entry><title>T</title><id>1</id><link href="https://ex.com/"/>'
+            '<content type="xhtml" xml:base="https://ex.com/x/">'
+            '<div xmlns="http://www.w3.org/1999/xhtml"><a href="y">y</a></div>'
+            "</content></entry>"
+        ),
+    ],
+)
+def test_relative_links_are_resolved_against_xml_base(text):
+    result = _handler(text)
+
+    assert result == _parse_with_feedparser(text)
+    assert all("https://ex.com/" in post.url for post in result)
+
+
+def test_xml_base_feed_has_absolute_links():
+    [post] = _handler(XML_BASE_FEED)
+
+    assert post.url == "https://ex.com/blog/post1"
+    assert 'href="https://ex.com/rel"' in post.description
+    assert 'src="https://ex.com/blog/i.png"' in post.description
+
+
+async def test_incremental_parse_resolves_relative_links_against_xml_base():
+    result = await rss(
+        XML_BASE_FEED, options=RSSOptions(incremental=True), is_known=_is_known_from([])
+    )
+
+    assert [post.url for post in result] == ["https://ex.com/blog/post1"]
+
+
+YOUTUBE_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015"
+  xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">
+  <title>Channel</title>
+  <entry>
+    <id>yt:video:abc</id>
+    <yt:videoId>abc</yt:videoId>
+    <yt:channelId>UC1</yt:channelId>
+    <title>Video title</title>
+    <link rel="alternate" href="https://www.youtube.com/watch?v=abc"/>
+    <author><name>Channel</name></author>
+    <media:group>
+      <media:title>Video title</media:title>
+      <media:thumbnail url="https://i1.ytimg.com/vi/abc/hqdefault.jpg"/>
+      <media:description>Video text &amp; more</media:description>
+    </media:group>
+  </entry>
+</feed>
+"""
+PODCAST_TEMPLATE = (
+    '<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+    ' xmlns:media="http://search.yahoo.com/mrss/"'
+    ' xmlns:slash="http://purl.org/rss/1.0/modules/slash/">'
+    "<channel><title>F</title>{}</channel></rss>"
+)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        YOUTUBE_FEED,
+        PODCAST_TEMPLATE.format(
+            "<item><guid>1</guid><title>Ep 1</title><link>https://a/1</link>"
+            "<itunes:summary>Summary &lt;b&gt;bold&lt;/b&gt;</itunes:summary>"
+            "<itunes:keywords>python, async</itunes:keywords>"
+            "<itunes:duration>10:00</itunes:duration></item>"
+        ),
+        PODCAST_TEMPLATE.format(
+            "<item><guid>1</guid><title>Ep 1</title><category>c</category>"
+            "<description>Real</description><itunes:summary>It</itunes:summary>"
+            "<itunes:subtitle>Sub</itunes:subtitle></item>"
+        ),
+        PODCAST_TEMPLATE.format(
+            "<item><guid>1</guid><title>T</title><dc:description>DC</dc:description>"
+            "</item>"
+        ),
+        PODCAST_TEMPLATE.format(
+            "<item><guid>1</guid><title>T</title><media:keywords>a, b"
+            "</media:keywords><media:description>Media</media:description></item>"
+        ),
+        PODCAST_TEMPLATE.format(
+            '<item><guid>1</guid><title>T</title><media:content url="https://a/v">'
+            "<media:description>Nested</media:description></media:content></item>"
+        ),
+    ],
+)
+def test_entries_with_feedparser_only_elements_match_feedparser(text):
+    result = _handler(text)
+
+    assert result == _parse_with_feedparser(text)
+    assert all(post.description for post in result)
+
+
+def test_youtube_description_is_read_from_media_group():
+    [post] = _handler(YOUTUBE_FEED)
+
+    assert post.description == "Video text & more"
+
+
+async def test_incremental_parse_of_podcast_feed_reads_itunes_fields():
+    text = PODCAST_TEMPLATE.format(
+        "<item><guid>1</guid><title>T</title><itunes:summary>S</itunes:summary>"
+        "<itunes:keywords>a,b</itunes:keywords></item>"
+    )
+
+    [post] = await rss(
+        text, options=RSSOptions(incremental=True), is_known=_is_known_from([])
+    )
+
+    assert (post.description, post.post_tags) == ("S", ("a", "b"))
+
+
+def test_ignored_namespaces_keep_the_fast_path(monkeypatch):
+    monkeypatch.setattr(rss_module, "_parse_with_feedparser", None)
+    text = PODCAST_TEMPLATE.format(
+        "<item><guid>1</guid><title>T</title><description>D</description>"
+        "<dc:creator>me</dc:creator><slash:comments>3</slash:comments>"
+        '<itunes:duration>1:00</itunes:duration><media:thumbnail url="https://a"/>'
+        '<media:content url="https://a/v"/></item>'
+    )
+
+    [post] = _handler(text)
+
+    assert post.description == "D"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        _make_feed(2).replace("Post 1", "Post & 1"),
+        _make_feed(2).replace("Post 1", "Post&nbsp;1"),
+        _make_feed(2).replace("</channel>", ""),
+        """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+  xmlns="http://purl.org/rss/1.0/">
+  <channel rdf:about="https://post.url"><title>Feed</title></channel>
+  <item rdf:about="https://post.url/1">
+    <title>Post 1</title><link>https://post.url/1</link>
+  </item>
+</rdf:RDF>
+""",
+    ],
+)
+def test_unsupported_or_malformed_feeds_are_parsed_with_feedparser(text, monkeypatch):
+    calls = []
+
+    def parse_with_feedparser(text):
+        calls.append(text)
+        return _parse_with_feedparser(text)
+
+    monkeypatch.setattr(rss_module, "_parse_with_feedparser", parse_with_feedparser)
+
+    posts = _handler(text)
+
+    assert calls == [text]
+    assert posts
+
+
+@pytest.mark.parametrize("parse", [_handler, _parse_with_feedparser])
+def test_bytes_are_decoded_with_encoding_from_xml_declaration(parse):
+    text = RSS_TEMPLATE.format(
+        "<item><guid>1</guid><title>Привіт</title><link>https://a/1</link></item>"
+    )
+    content = text.replace("<rss", '<?xml version="1.0" encoding="windows-1251"?><rss')
+
+    [post] = parse(content.encode("windows-1251"))
+
+    assert post.title == "Привіт"
+
+
+async def test_incremental_parse_of_bytes():
+    text = _make_feed(3).encode()
+
+    result = await rss(
+        text, options=RSSOptions(incremental=True), is_known=_is_known_from({"post-1"})
+    )
+
+    assert [post.post_id for post in result] == ["post-0", "post-1"]
@@ -29,6 +29,8 @@ def _make_wp_posts_json() -> str:
                 "link": "https://blog.example/first-post",
                 "excerpt": {"rendered": "<p>First excerpt&#8230;</p>"},
                 "content": {"rendered": "<p>First content</p>"},
+                "yoast_head_json": {"title": "SEO title", "schema": {"@graph": []}},
+                "_links": {"self": [{"href": "https://blog.example/wp-json/1"}]},
             },
             {
                 "id": 2,
@@ -105,3 +107,9 @@ def test_template_kwargs_with_extras_overriding_base_field(make_wordpress_post):
     result = post.template_kwargs()
 
     assert result["title"] == "Overridden title"
+
+
+async def test_response_bytes_are_decoded_directly():
+    posts = await wordpress(_make_wp_posts_json().encode())
+
+    assert [post.post_id for post in posts] == ["1", "2"]
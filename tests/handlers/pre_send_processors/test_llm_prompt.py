@@ -2,6 +2,7 @@ import pytest
 
 from feed_proxy.handlers.pre_send_processors import llm_prompt as llm_prompt_module
 from feed_proxy.handlers.pre_send_processors.llm_prompt import llm_prompt
+from feed_proxy.llm_cache import LlmCache
 
 
 @pytest.fixture(autouse=True)
@@ -9,6 +10,13 @@ def _reset_client_cache(monkeypatch):
     monkeypatch.setattr(llm_prompt_module, "_client", None)
 
 
+@pytest.fixture(autouse=True)
+def result_cache(monkeypatch):
+    cache = LlmCache()
+    monkeypatch.setattr(llm_prompt_module, "_get_cache", lambda: cache)
+    return cache
+
+
 async def test_happy_path(make_feed_post, make_llm_prompt_options, stub_gemini):
     stub_gemini.set_response("Заголовок")
     post = make_feed_post(title="Title")
@@ -165,3 +173,58 @@ async def test_missing_api_key_uses_custom_on_error_value(
     result = await llm_prompt([post], options=options)
 
     assert result[0].extras["title_ua"] == "N/A"
+
+
+async def test_same_prompt_and_source_are_sent_to_model_once(
+    make_feed_post, make_llm_prompt_options, stub_gemini, result_cache
+):
+    stub_gemini.set_response("Заголовок")
+    options = make_llm_prompt_options(source_field="title", target_field="title_ua")
+
+    await llm_prompt([make_feed_post(post_id="1", title="Title")], options=options)
+    result = await llm_prompt(
+        [make_feed_post(post_id="2", title="Title")], options=options
+    )
+
+    assert result[0].extras["title_ua"] == "Заголовок"
+    stub_gemini.aio.models.generate_content.assert_awaited_once()
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+
+
+async def test_other_prompt_is_not_served_from_cache(
+    make_feed_post, make_llm_prompt_options, stub_gemini
+):
+    stub_gemini.set_response("ok")
+    post = make_feed_post(title="Title")
+
+    await llm_prompt([post], options=make_llm_prompt_options(prompt="A {source}"))
+    await llm_prompt([post], options=make_llm_prompt_options(prompt="B {source}"))
+
+    assert stub_gemini.aio.models.generate_content.await_count == 2
+
+
+async def test_errors_are_not_cached(
+    make_feed_post, make_llm_prompt_options, stub_gemini
+):
+    stub_gemini.set_exception(RuntimeError("boom"))
+    options = make_llm_prompt_options(source_field="title", target_field="title_ua")
+    await llm_prompt([make_feed_post(title="Title")], options=options)
+    stub_gemini.aio.models.generate_content.side_effect = None
+    stub_gemini.set_response("Заголовок")
+
+    result = await llm_prompt([make_feed_post(title="Title")], options=options)
+
+    assert result[0].extras["title_ua"] == "Заголовок"
+
+
+async def test_works_without_cache(
+    make_feed_post, make_llm_prompt_options, stub_gemini, monkeypatch
+):
+    monkeypatch.setattr(llm_prompt_module, "_get_cache", lambda: None)
+    stub_gemini.set_response("Заголовок")
+    options = make_llm_prompt_options(source_field="title", target_field="title_ua")
+
+    await llm_prompt([make_feed_post(title="Title")], options=options)
+    await llm_prompt([make_feed_post(title="Title")], options=options)
+
+    assert stub_gemini.aio.models.generate_content.await_count == 2
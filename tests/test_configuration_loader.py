@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any
 
@@ -15,8 +16,11 @@ from feed_proxy.handlers import (
     HandlerOptions,
     HandlerType,
     InitHandlersError,
+    get_source_plan,
+    get_stream_plan,
     register_handler,
 )
+from feed_proxy.storage import index_streams, receiver_stream_id
 
 if TYPE_CHECKING:
     from feed_proxy.entities import Message
@@ -325,3 +329,162 @@ def test_load_configuration_dedup_fields_default(run_sut, minimal_sources_block)
 
     assert result.sources[0].dedup_group is None
     assert result.sources[0].dedup_key == "post_id"
+
+
+def test_load_configuration_with_dedup_url_options(run_sut, minimal_sources_block):
+    minimal_sources_block["sources"]["some-source"]["dedup_key"] = "url"
+    minimal_sources_block["sources"]["some-source"]["dedup_url"] = {
+        "strip_params": ["ref"],
+        "sort_query": False,
+    }
+
+    result = run_sut(minimal_sources_block)
+
+    assert result.sources[0].dedup_url.strip_params == ["ref"]
+    assert result.sources[0].dedup_url.sort_query is False
+    assert result.sources[0].dedup_url.strip_www is True
+
+
+def test_handlers_are_bound_once_at_configuration_load(run_sut, minimal_sources_block):
+    result = run_sut(minimal_sources_block)
+    source = result.sources[0]
+    stream = source.streams[0]
+
+    assert get_source_plan(source) is get_source_plan(source)
+    assert get_stream_plan(stream) is get_stream_plan(stream)
+    assert get_source_plan(source).fetcher.keywords["options"].url == (
+        "https://yakimka.me/rss.xml"
+    )
+
+
+def test_reloaded_configuration_gets_own_plans(run_sut, minimal_sources_block):
+    first = run_sut(copy.deepcopy(minimal_sources_block)).sources[0]
+    first_plan = get_source_plan(first)
+    minimal_sources_block["sources"]["some-source"]["fetcher_options"][
+        "url"
+    ] = "https://other.example/rss.xml"
+
+    second = run_sut(minimal_sources_block).sources[0]
+
+    assert get_source_plan(second) is not first_plan
+    assert get_source_plan(second).fetcher.keywords["options"].url == (
+        "https://other.example/rss.xml"
+    )
+
+
+def test_plan_of_source_built_by_hand_is_bound_once(mother):
+    source = mother.source()
+    stream = source.streams[0]
+
+    assert get_source_plan(source) is get_source_plan(source)
+    assert get_stream_plan(stream) is get_stream_plan(stream)
+    assert get_source_plan(copy.copy(source)) is not get_source_plan(source)
+
+
+def test_unexpected_handler_options_raise_at_configuration_load(
+    run_sut, minimal_sources_block
+):
+    fetcher_options = minimal_sources_block["sources"]["some-source"]["fetcher_options"]
+    fetcher_options["unexpected"] = "value"
+
+    with pytest.raises(InitHandlersError, match="Error while binding handler options"):
+        run_sut(minimal_sources_block)
+
+
+def test_invalid_filter_expression_raises_at_configuration_load(
+    run_sut, minimal_sources_block
+):
+    stream = minimal_sources_block["sources"]["some-source"]["streams"][0]
+    stream["modifiers"] = [
+        {"type": "filter_expr", "options": {"expression": "score >"}}
+    ]
+
+    error_msg = (
+        "Error while parsing modifier options for some-source, stream index 0, "
+        "modifier index 0: Invalid filter expression"
+    )
+    with pytest.raises(InitHandlersError, match=error_msg):
+        run_sut(minimal_sources_block)
+
+
+def test_unknown_name_in_filter_expression_raises_at_configuration_load(
+    run_sut, minimal_sources_block
+):
+    stream = minimal_sources_block["sources"]["some-source"]["streams"][0]
+    stream["modifiers"] = [
+        {"type": "filter_expr", "options": {"expression": "tilte == 'x'"}}
+    ]
+
+    with pytest.raises(InitHandlersError, match="Unknown names tilte"):
+        run_sut(minimal_sources_block)
+
+
+@pytest.mark.parametrize("value", [-0.1, 1.5])
+def test_dedup_similarity_should_be_from_0_to_1(run_sut, minimal_sources_block, value):
+    minimal_sources_block["sources"]["some-source"]["dedup_similarity"] = value
+
+    with pytest.raises(LoadConfigurationError, match="dedup_similarity"):
+        run_sut(minimal_sources_block)
+
+
+def test_streams_with_same_receiver_and_other_filters_are_allowed(
+    run_sut, minimal_sources_block
+):
+    streams = minimal_sources_block["sources"]["some-source"]["streams"]
+    streams.append(
+        {
+            **streams[0],
+            "message_template": "${url}",
+            "modifiers": [
+                {
+                    "type": "filter_expr",
+                    "options": {"expression": "matches(title, 'x')"},
+                }
+            ],
+        }
+    )
+
+    result = run_sut(minimal_sources_block)
+
+    first, second = result.sources[0].streams
+    assert first.id == receiver_stream_id(first)
+    assert second.id != first.id
+    assert len(index_streams(result.sources)) == 2
+
+
+def test_identical_streams_get_different_ids(run_sut, minimal_sources_block):
+    streams = minimal_sources_block["sources"]["some-source"]["streams"]
+    streams.extend([dict(streams[0]), dict(streams[0])])
+
+    result = run_sut(minimal_sources_block)
+
+    assert len({stream.id for stream in result.sources[0].streams}) == 3
+
+
+def test_explicit_stream_id_is_used_as_is(run_sut, minimal_sources_block):
+    streams = minimal_sources_block["sources"]["some-source"]["streams"]
+    streams[0]["id"] = "main"
+
+    result = run_sut(minimal_sources_block)
+
+    assert list(index_streams(result.sources)) == ["some-source:main"]
+
+
+def test_explicit_stream_ids_should_be_unique(run_sut, minimal_sources_block):
+    streams = minimal_sources_block["sources"]["some-source"]["streams"]
+    streams[0]["id"] = "main"
+    streams.append({**streams[0], "message_template": "${url}"})
+
+    with pytest.raises(LoadConfigurationError, match="streams 0 and 1"):
+        run_sut(minimal_sources_block)
+
+
+def test_streams_with_same_receiver_type_and_other_options_are_allowed(
+    run_sut, minimal_sources_block
+):
+    streams = minimal_sources_block["sources"]["some-source"]["streams"]
+    streams.append({**streams[0], "receiver_options": {"chat_id": "other"}})
+
+    result = run_sut(minimal_sources_block)
+
+    assert len(result.sources[0].streams) == 2
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from picodi import registry, shutdown_dependencies
+
+from feed_proxy import llm_cache
+from feed_proxy.configuration import AppSettings
+from feed_proxy.deps import get_app_settings, get_llm_cache
+from feed_proxy.llm_cache import LlmCache, make_key
+from feed_proxy.storage import SqliteLlmCacheStorage, create_sqlite_conn
+
+
+class RecordingMetrics:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def increment_llm_cache(self, result: str) -> None:
+        self.calls.append(result)
+
+
+class CountingRun:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, result: str = "result"):
+        async def _run() -> str:
+            self.calls += 1
+            await asyncio.sleep(0)
+            return result
+
+        return _run
+
+
+@pytest.fixture()
+def run() -> CountingRun:
+    return CountingRun()
+
+
+async def test_same_key_is_run_once(run):
+    sut = LlmCache()
+
+    first = await sut.get_or_run("key", run())
+    second = await sut.get_or_run("key", run())
+
+    assert run.calls == 1
+    assert first == second == "result"
+    assert (sut.hits, sut.misses, sut.hit_rate) == (1, 1, 0.5)
+
+
+async def test_concurrent_lookups_share_one_run(run):
+    sut = LlmCache()
+
+    results = await asyncio.gather(*(sut.get_or_run("key", run()) for _ in range(3)))
+
+    assert run.calls == 1
+    assert results == ["result"] * 3
+
+
+async def test_failures_are_not_cached(run):
+    sut = LlmCache()
+
+    async def fail() -> str:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await sut.get_or_run("key", fail)
+    result = await sut.get_or_run("key", run())
+
+    assert (result, run.calls) == ("result", 1)
+
+
+async def test_expired_entry_is_run_again(run, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now)
+    sut = LlmCache(ttl_sec=60)
+
+    await sut.get_or_run("key", run())
+    now += 59
+    await sut.get_or_run("key", run())
+    now += 1
+    await sut.get_or_run("key", run())
+
+    assert run.calls == 2
+
+
+async def test_least_recently_used_entry_is_evicted(run):
+    sut = LlmCache(max_entries=2)
+
+    for key in ("a", "b", "a", "c", "a", "b"):
+        await sut.get_or_run(key, run())
+
+    assert run.calls == 4
+
+
+async def test_memory_stays_bounded_with_many_keys(run):
+    sut = LlmCache(max_entries=2)
+
+    for i in range(1000):
+        await sut.get_or_run(f"key-{i}", run())
+
+    assert run.calls == 1000
+    assert len(sut._entries) == 2
+    assert sut._single_flight._calls == {}
+
+
+async def test_lookups_are_counted_in_metrics(run):
+    metrics = RecordingMetrics()
+    sut = LlmCache(metrics=metrics)  # type: ignore[arg-type]
+
+    await sut.get_or_run("key", run())
+    await sut.get_or_run("key", run())
+
+    assert metrics.calls == ["miss", "hit"]
+
+
+async def test_persisted_entries_survive_new_cache(run):
+    conn = create_sqlite_conn(":memory:")
+    await LlmCache(storage=SqliteLlmCacheStorage(conn, 10)).get_or_run("key", run())
+    sut = LlmCache(storage=SqliteLlmCacheStorage(conn, 10))
+
+    result = await sut.get_or_run("key", run())
+
+    assert (result, run.calls) == ("result", 1)
+
+
+async def test_expired_persisted_entries_are_run_again(run):
+    conn = create_sqlite_conn(":memory:")
+    await LlmCache(storage=SqliteLlmCacheStorage(conn, 10)).get_or_run("key", run())
+    conn.execute("UPDATE llm_cache SET created_at = created_at - 120")
+    sut = LlmCache(ttl_sec=60, storage=SqliteLlmCacheStorage(conn, 10))
+
+    await sut.get_or_run("key", run())
+
+    assert run.calls == 2
+
+
+async def test_persisted_entries_are_trimmed_to_max_entries(run):
+    conn = create_sqlite_conn(":memory:")
+    sut = LlmCache(storage=SqliteLlmCacheStorage(conn, 2))
+
+    for key in ("a", "b", "c"):
+        await sut.get_or_run(key, run())
+
+    assert conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 2
+
+
+@pytest.mark.parametrize(
+    ("persist", "expected_rows"), [(None, 1), (True, 1), (False, 0)]
+)
+async def test_llm_cache_is_persisted_by_default_with_sqlite_db(
+    run, tmp_path, persist, expected_rows
+):
+    db = str(tmp_path / "feed_proxy.db")
+    settings = AppSettings(sqlite_db=db, llm_cache_persist=persist)
+
+    with registry.override(get_app_settings, lambda: settings):
+        cache = get_llm_cache()
+        assert cache is not None
+        await cache.get_or_run("key", run())
+        shutdown_dependencies()
+
+    conn = create_sqlite_conn(db)
+    assert conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == expected_rows
+
+
+async def test_llm_cache_is_in_memory_without_sqlite_db(run):
+    with registry.override(get_app_settings, lambda: AppSettings()):
+        cache = get_llm_cache()
+        assert cache is not None
+        await cache.get_or_run("key", run())
+        shutdown_dependencies()
+
+    assert run.calls == 1
+
+
+def test_make_key_depends_on_all_parts():
+    keys = {
+        make_key("model", "prompt", "source"),
+        make_key("other-model", "prompt", "source"),
+        make_key("model", "other prompt", "source"),
+        make_key("model", "prompt", "other source"),
+        make_key("model", "prompt\x00", "source"),
+    }
+
+    assert len(keys) == 5
+    assert make_key("model", "prompt", "source") == make_key(
+        "model", "prompt", "source"
+    )
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 from collections import defaultdict
 from functools import partial
 from typing import Any
 
+import httpx
 import pytest
 
-from feed_proxy import logic
-from feed_proxy.entities import Post, PreSendProcessor
-from feed_proxy.handlers import HandlerType
-from feed_proxy.handlers.parsers.rss import FeedPost
+from feed_proxy import handlers, logic
+from feed_proxy.entities import DedupUrlOptions, Post, copy_post
+from feed_proxy.handlers import HandlerType, get_stream_plan
+from feed_proxy.handlers.parsers.rss import FeedPost, rss
+from feed_proxy.parse_cache import ParseCache
 from feed_proxy.storage import MemoryPostStorage
 from feed_proxy.test import ObjectMother
+from feed_proxy.utils.http import FetchedBody
+from feed_proxy.utils.single_flight import SingleFlight
 
 
 @pytest.fixture()
@@ -19,6 +24,12 @@ def mother() -> ObjectMother:
     return ObjectMother()
 
 
+FEED_WITHOUT_DECLARATION = (
+    '<rss version="2.0"><channel><title>F</title><item><guid>1</guid>'
+    "<title>Привіт світ</title><link>https://a/1</link></item></channel></rss>"
+)
+
+
 @pytest.fixture()
 def make_post():
     def _make_post(post_id: str = "post_id", **kwargs: Any) -> Post:
@@ -44,7 +55,25 @@ def handler_registry(monkeypatch):
     ) -> Any:
         return partial(registry[type][name], options=options)
 
-    monkeypatch.setattr(logic, "get_handler_by_name", fake_get_handler_by_name)
+    def fake_get_registered_handlers() -> dict[HandlerType, dict[str, Any]]:
+        return {
+            type: {
+                name: handlers.Handler(
+                    name,
+                    obj,
+                    None,
+                    None,
+                    pure_filter=getattr(obj, "pure_filter", False),
+                )
+                for name, obj in handlers_by_name.items()
+            }
+            for type, handlers_by_name in registry.items()
+        }
+
+    monkeypatch.setattr(handlers, "get_handler_by_name", fake_get_handler_by_name)
+    monkeypatch.setattr(
+        handlers, "get_registered_handlers", fake_get_registered_handlers
+    )
     return registry
 
 
@@ -124,7 +153,7 @@ async def test_processor_writes_extras_visible_in_message(
 
 
 async def test_apply_pre_send_processors_runs_in_declared_order(
-    make_post, handler_registry
+    mother, make_post, handler_registry
 ):
     async def append_a(posts: list[Post], *, options=None) -> list[Post]:  # noqa: U100
         for post in posts:
@@ -138,10 +167,13 @@ async def test_apply_pre_send_processors_runs_in_declared_order(
 
     handler_registry[HandlerType.pre_send_processors]["append_a"] = append_a
     handler_registry[HandlerType.pre_send_processors]["append_b"] = append_b
-    processors = [
-        PreSendProcessor(type="append_a", options={}),
-        PreSendProcessor(type="append_b", options={}),
-    ]
+    stream = mother.stream(
+        pre_send_processors=[
+            mother.pre_send_processor("append_a", {}),
+            mother.pre_send_processor("append_b", {}),
+        ]
+    )
+    processors = get_stream_plan(stream).pre_send_processors
     post = make_post()
 
     result = await logic.apply_pre_send_processors(processors, [post])
@@ -212,6 +244,25 @@ def test_post_identities_title_dedup_key_whitespace_only_title(make_post):
     assert logic.post_identities(post, "title") == ["post-1"]
 
 
+def test_post_identities_url_dedup_key_adds_canonical_url(make_post):
+    post = make_post(
+        post_id="post-1", url="http://www.example.com/news/1/?utm_source=rss&b=2&a=1"
+    )
+
+    identities = logic.post_identities(post, "url")
+
+    assert identities == ["post-1", "url:example.com/news/1?a=1&b=2"]
+
+
+def test_post_identities_url_dedup_key_uses_options(make_post):
+    post = make_post(post_id="post-1", url="https://example.com/news?ref=rss&id=1")
+    options = DedupUrlOptions(strip_params=["ref"])
+
+    identities = logic.post_identities(post, "url", options)
+
+    assert identities == ["post-1", "url:example.com/news?id=1"]
+
+
 async def test_cross_stream_isolation(mother, make_post, handler_registry):
     async def add_marker(posts: list[Post], *, options=None) -> list[Post]:
         for post in posts:
@@ -397,3 +448,462 @@ async def test_ungrouped_source_first_run_then_dedups_by_guid(mother, make_post)
     assert len(second_batches) == 1
     assert len(second_batches[0]) == 1
     assert second_batches[0][0].post_id == "guid-2"
+
+
+async def test_streams_share_unmodified_fields_but_not_modifications(
+    mother, make_post, handler_registry
+):
+    async def shout(posts: list[Post], *, options=None) -> list[Post]:  # noqa: U100
+        for post in posts:
+            post.title = post.title.upper()
+            post.extras["shout"] = "yes"
+        return posts
+
+    description = "Some long description " * 100
+
+    async def stub_parser(text, *, options=None) -> list[Post]:  # noqa: U100
+        return [make_post(post_id="shared", title="Title", description=description)]
+
+    handler_registry[HandlerType.modifiers]["shout"] = shout
+    handler_registry[HandlerType.parsers]["stub_parser"] = stub_parser
+    stream_a = mother.stream(
+        receiver_type="stream_a", modifiers=[mother.modifier("shout", {})]
+    )
+    stream_b = mother.stream(receiver_type="stream_b")
+    source = mother.source(
+        parser_type="stub_parser", tags=["news"], streams=[stream_a, stream_b]
+    )
+
+    parsed = await logic.parse_posts(source, "irrelevant")
+
+    [post_a], [post_b] = (posts for _, posts in parsed)
+    assert (post_a.title, post_b.title) == ("TITLE", "Title")
+    assert post_a.extras == {"shout": "yes"}
+    assert post_b.extras == {}
+    assert post_a.description is post_b.description
+    assert post_a.source_tags == post_b.source_tags == ["news"]
+
+
+async def test_common_modifier_prefix_is_applied_once_for_all_streams(
+    mother, make_post, handler_registry
+):
+    calls: list[str] = []
+
+    def make_modifier(name: str):
+        async def modifier(posts: list[Post], *, options=None) -> list[Post]:
+            calls.append(f"{name}:{options}")
+            for post in posts:
+                post.title = f"{post.title}|{name}"
+            return posts
+
+        return modifier
+
+    async def stub_parser(text, *, options=None) -> list[Post]:  # noqa: U100
+        return [make_post(post_id="1", title="t")]
+
+    for name in ("strip", "replace", "tail"):
+        handler_registry[HandlerType.modifiers][name] = make_modifier(name)
+    handler_registry[HandlerType.parsers]["stub_parser"] = stub_parser
+    prefix = [mother.modifier("strip", {}), mother.modifier("replace", {"a": 1})]
+    streams = [
+        mother.stream(receiver_type="a", modifiers=[*prefix]),
+        mother.stream(
+            receiver_type="b", modifiers=[*prefix, mother.modifier("tail", {"n": 1})]
+        ),
+        mother.stream(
+            receiver_type="c", modifiers=[*prefix, mother.modifier("tail", {"n": 2})]
+        ),
+        mother.stream(receiver_type="d"),
+    ]
+    source = mother.source(parser_type="stub_parser", streams=streams)
+
+    parsed = await logic.parse_posts(source, "irrelevant")
+
+    assert calls == [
+        "strip:{}",
+        "replace:{'a': 1}",
+        "tail:{'n': 1}",
+        "tail:{'n': 2}",
+    ]
+    assert [(stream.receiver_type, posts[0].title) for stream, posts in parsed] == [
+        ("a", "t|strip|replace"),
+        ("b", "t|strip|replace|tail"),
+        ("c", "t|strip|replace|tail"),
+        ("d", "t"),
+    ]
+    assert len({id(posts[0]) for _, posts in parsed}) == 4
+
+
+async def test_post_is_known_only_when_processed_for_every_stream(mother):
+    storage = MemoryPostStorage()
+    source = mother.source(
+        streams=[mother.stream(receiver_type="a"), mother.stream(receiver_type="b")]
+    )
+    await storage.mark_posts_as_processed(source.id, source.id, "a", ["1", "2"])
+    await storage.mark_posts_as_processed(source.id, source.id, "b", ["1"])
+
+    is_known = logic.make_is_known(source, storage)
+
+    assert await is_known("1")
+    assert not await is_known("2")
+    assert not await is_known("3")
+
+
+async def test_posts_dropped_by_stream_filters_are_known(
+    mother, make_post, handler_registry
+):
+    async def stub_parser(text, *, options=None) -> list[Post]:  # noqa: U100
+        return [make_post(post_id=str(i)) for i in range(3)]
+
+    async def keep(posts: list[Post], *, options=None) -> list[Post]:
+        return [post for post in posts if post.post_id == options["post_id"]]
+
+    handler_registry[HandlerType.parsers]["stub_parser"] = stub_parser
+    handler_registry[HandlerType.modifiers]["keep"] = keep
+    source = mother.source(
+        parser_type="stub_parser",
+        streams=[
+            mother.stream(
+                receiver_type="a",
+                modifiers=[mother.modifier(type="keep", options={"post_id": "1"})],
+            ),
+            mother.stream(receiver_type="b"),
+        ],
+    )
+    storage = MemoryPostStorage()
+    is_known = logic.make_is_known(source, storage)
+
+    posts = await logic.parse_source_posts(source, "irrelevant")
+    for stream, stream_posts in await logic.split_posts_by_streams(source, posts):
+        await logic.parse_message_batches_from_posts(
+            stream_posts,
+            source,
+            stream,
+            storage,
+            dropped_ids=logic.dropped_post_ids(posts, stream_posts),
+        )
+
+    assert [await is_known(str(i)) for i in range(4)] == [True, True, True, False]
+    # Dropped marks don't count as processed for the stream's receiver
+    assert not await storage.any_processed(source.id, "a", ["0"])
+
+
+async def test_parse_cache_gives_each_parse_its_own_posts(
+    mother, make_post, handler_registry
+):
+    calls: list[str] = []
+
+    async def stub_parser(text, *, options=None) -> list[Post]:  # noqa: U100
+        calls.append(text)
+        return [make_post(post_id="1", title="t")]
+
+    async def shout(posts: list[Post], *, options=None) -> list[Post]:  # noqa: U100
+        for post in posts:
+            post.title = post.title.upper()
+        return posts
+
+    handler_registry[HandlerType.parsers]["stub_parser"] = stub_parser
+    handler_registry[HandlerType.modifiers]["shout"] = shout
+    source = mother.source(
+        parser_type="stub_parser",
+        streams=[mother.stream(modifiers=[mother.modifier(type="shout", options={})])],
+        tags=["news"],
+    )
+    cache = ParseCache()
+
+    [(_, first)] = await logic.parse_posts(source, "same", parse_cache=cache)
+    [(_, second)] = await logic.parse_posts(source, "same", parse_cache=cache)
+
+    assert calls == ["same"]
+    assert first[0] is not second[0]
+    assert first[0].title == second[0].title == "T"
+    assert second[0].source_tags == ["news"]
+
+
+async def test_sources_with_same_fetcher_options_share_one_fetch(
+    mother, handler_registry
+):
+    urls: list[str] = []
+
+    async def stub_fetcher(*, options=None) -> FetchedBody:
+        urls.append(options["url"])
+        await asyncio.sleep(0)
+        return FetchedBody(b"body")
+
+    handler_registry[HandlerType.fetchers]["stub_fetcher"] = stub_fetcher
+    same_a, same_b, other = (
+        mother.source(
+            id=source_id, fetcher_type="stub_fetcher", fetcher_options={"url": url}
+        )
+        for source_id, url in (
+            ("a", "https://a"),
+            ("b", "https://a"),
+            ("c", "https://c"),
+        )
+    )
+    single_flight: SingleFlight[tuple[str, str, str], FetchedBody | None] = (
+        SingleFlight()
+    )
+
+    bodies = await asyncio.gather(
+        *(
+            logic.fetch_body(source, single_flight=single_flight)
+            for source in (same_a, same_b, other)
+        )
+    )
+
+    assert bodies == [FetchedBody(b"body")] * 3
+    assert sorted(urls) == ["https://a", "https://c"]
+
+
+@pytest.fixture()
+def paged_source(mother, make_post, handler_registry):
+    pages = {
+        "1": [make_post("5"), make_post("4")],
+        "2": [make_post("4"), make_post("3"), make_post("2")],
+        "3": [make_post("1")],
+    }
+    fetched: list[str] = []
+
+    async def stub_pages(*, options=None):  # noqa: U100
+        for page in pages:
+            fetched.append(page)
+            yield FetchedBody(page.encode())
+
+    async def stub_parser(text, *, options=None) -> list[Post]:  # noqa: U100
+        return pages[text]
+
+    handler_registry[HandlerType.fetchers]["stub_pages"] = stub_pages
+    handler_registry[HandlerType.parsers]["stub_parser"] = stub_parser
+    source = mother.source(fetcher_type="stub_pages", parser_type="stub_parser")
+    return source, fetched
+
+
+async def test_pages_are_fetched_until_page_with_only_known_posts(paged_source):
+    source, fetched = paged_source
+    storage = MemoryPostStorage()
+    stream = source.streams[0]
+    await storage.mark_posts_as_processed(
+        source.id, source.id, stream.receiver_type, ["4", "3", "2"]
+    )
+
+    posts = await logic.fetch_and_parse_pages(source, storage)
+
+    assert fetched == ["1", "2"]
+    assert [post.post_id for post in posts] == ["5", "4", "3", "2"]
+
+
+async def test_all_pages_are_fetched_if_nothing_is_known(paged_source):
+    source, fetched = paged_source
+
+    posts = await logic.fetch_and_parse_pages(source, MemoryPostStorage())
+
+    assert fetched == ["1", "2", "3"]
+    assert [post.post_id for post in posts] == ["5", "4", "3", "2", "1"]
+
+
+@pytest.fixture()
+def http_responses(monkeypatch):
+    served: list[httpx.Response] = []
+    chunks_read: list[int] = []
+
+    def serve(body: bytes, status_code: int = 200, headers: dict | None = None) -> None:
+        async def stream():
+            for i in range(0, len(body), 1024):
+                chunks_read.append(i)
+                yield body[i : i + 1024]
+
+        served.append(httpx.Response(status_code, headers=headers, content=stream()))
+
+    async def handler(request: httpx.Request) -> httpx.Response:  # noqa: U100
+        return served.pop(0)
+
+    monkeypatch.setattr(
+        httpx,
+        "AsyncClient",
+        partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)),
+    )
+    serve.chunks_read = chunks_read  # type: ignore[attr-defined]
+    return serve
+
+
+async def test_fetched_body_is_decoded_with_charset_from_headers(http_responses):
+    http_responses(
+        "Привіт".encode("cp1251"), headers={"content-type": "text/html; charset=cp1251"}
+    )
+
+    result = await logic.fetch_text_from_url("https://site.example")
+
+    assert result == "Привіт"
+
+
+async def test_body_over_max_bytes_is_dropped_without_reading_rest(http_responses):
+    http_responses(b"x" * 100 * 1024)
+
+    result = await logic.fetch_text_from_url("https://site.example", max_bytes=4000)
+
+    assert result is None
+    assert len(http_responses.chunks_read) == 4
+
+
+async def test_body_over_declared_content_length_is_not_read(http_responses):
+    http_responses(b"x" * 10_000, headers={"content-length": "10000"})
+
+    result = await logic.fetch_text_from_url("https://site.example", max_bytes=4000)
+
+    assert result is None
+    assert http_responses.chunks_read == []
+
+
+async def test_only_preview_of_error_body_is_logged(http_responses, caplog):
+    http_responses(b"e" * 100 * 1024, status_code=500)
+
+    result = await logic.fetch_text_from_url("https://site.example")
+
+    assert result is None
+    assert "e" * 1024 in caplog.text
+    assert "e" * 1025 not in caplog.text
+
+
+async def test_posts_dropped_by_pure_filters_are_not_copied(
+    mother, make_post, handler_registry, monkeypatch
+):
+    copied: list[str] = []
+
+    def counting_copy_post(post):
+        copied.append(post.post_id)
+        return copy_post(post)
+
+    async def stub_parser(text, *, options=None) -> list[Post]:  # noqa: U100
+        return [make_post(post_id=str(i)) for i in range(10)]
+
+    async def keep(posts: list[Post], *, options=None) -> list[Post]:
+        return [post for post in posts if post.post_id == options["post_id"]]
+
+    keep.pure_filter = True  # type: ignore[attr-defined]
+    handler_registry[HandlerType.parsers]["stub_parser"] = stub_parser
+    handler_registry[HandlerType.modifiers]["keep"] = keep
+    monkeypatch.setattr(logic, "copy_post", counting_copy_post)
+    source = mother.source(
+        parser_type="stub_parser",
+        streams=[
+            mother.stream(
+                receiver_type=post_id,
+                modifiers=[mother.modifier(type="keep", options={"post_id": post_id})],
+            )
+            for post_id in ("1", "2")
+        ],
+    )
+
+    parsed = await logic.parse_posts(source, "irrelevant")
+
+    assert [[post.post_id for post in posts] for _, posts in parsed] == [["1"], ["2"]]
+    assert copied == ["1"]
+
+
+async def test_similar_posts_are_skipped_with_dedup_similarity(mother, make_post):
+    source_a = mother.source(id="site-a", dedup_group="news", dedup_similarity=0.7)
+    source_b = mother.source(id="site-b", dedup_group="news", dedup_similarity=0.7)
+    stream = mother.stream()
+    storage = MemoryPostStorage()
+    await storage.mark_posts_as_processed("site-a", "news", stream.receiver_type, [])
+    await storage.mark_posts_as_processed("site-b", "news", stream.receiver_type, [])
+    description = (
+        "The Python Software Foundation announced the release of Python 3.13"
+        " today. The new version ships an experimental free-threaded build."
+    )
+    post_a = make_post(
+        post_id="guid-a", title="Python 3.13 released", description=description
+    )
+    post_b = make_post(
+        post_id="guid-b",
+        title="Python 3.13 is released",
+        description=description,
+    )
+    post_c = make_post(
+        post_id="guid-c", title="Rust 1.80 released", description="LazyCell is stable"
+    )
+
+    batches_a = await logic.parse_message_batches_from_posts(
+        [post_a], source_a, stream, storage
+    )
+    batches_b = await logic.parse_message_batches_from_posts(
+        [post_b, post_c], source_b, stream, storage
+    )
+
+    assert [message.post_id for message in batches_a[0]] == ["guid-a"]
+    assert [message.post_id for message in batches_b[0]] == ["guid-c"]
+
+
+async def test_similar_posts_in_one_batch_are_sent_once(mother, make_post, monkeypatch):
+    signatures: list[str] = []
+    post_signature = logic.post_signature
+
+    def counting_post_signature(post):
+        signatures.append(post.post_id)
+        return post_signature(post)
+
+    monkeypatch.setattr(logic, "post_signature", counting_post_signature)
+    source = mother.source(dedup_similarity=0.7)
+    stream = mother.stream()
+    storage = MemoryPostStorage()
+    await storage.mark_posts_as_processed(
+        source.id, source.id, stream.receiver_type, []
+    )
+    description = (
+        "The Python Software Foundation announced the release of Python 3.13"
+        " today. The new version ships an experimental free-threaded build."
+    )
+    posts = [
+        make_post(
+            post_id="guid-b", title="Python 3.13 is released", description=description
+        ),
+        make_post(
+            post_id="guid-a", title="Python 3.13 released", description=description
+        ),
+        make_post(
+            post_id="guid-a", title="Python 3.13 released", description=description
+        ),
+    ]
+
+    batches = await logic.parse_message_batches_from_posts(
+        posts, source, stream, storage
+    )
+
+    assert [[message.post_id for message in batch] for batch in batches] == [["guid-a"]]
+    assert signatures == ["guid-a", "guid-a", "guid-b"]
+    assert await storage.any_processed(source.id, stream.receiver_type, ["guid-a"])
+
+
+@pytest.mark.parametrize(
+    "content, content_type",
+    [
+        (
+            FEED_WITHOUT_DECLARATION.encode("cp1251"),
+            "application/rss+xml; charset=windows-1251",
+        ),
+        (
+            (
+                '<?xml version="1.0" encoding="windows-1251"?>'
+                + FEED_WITHOUT_DECLARATION
+            ).encode("cp1251"),
+            "application/rss+xml; charset=windows-1251",
+        ),
+        (FEED_WITHOUT_DECLARATION.encode(), "application/rss+xml; charset=utf-8"),
+        (FEED_WITHOUT_DECLARATION.encode(), "application/rss+xml"),
+    ],
+)
+async def test_rss_body_is_decoded_with_charset_from_headers(
+    mother, monkeypatch, content, content_type
+):
+    rss_handler = handlers.Handler("rss", rss, None, FeedPost, wants_bytes=True)
+    monkeypatch.setattr(
+        handlers,
+        "get_registered_handlers",
+        lambda: {HandlerType.parsers: {"rss": rss_handler}},
+    )
+    source = mother.source(parser_type="rss")
+
+    [(_, [post])] = await logic.parse_posts(source, FetchedBody(content, content_type))
+
+    assert post.title == "Привіт світ"
@@ -1,4 +1,6 @@
 import asyncio
+import json
+from dataclasses import asdict
 
 import pytest
 
@@ -6,15 +8,16 @@ from feed_proxy.storage import (
     MemoryMessagesOutboxStorage,
     SqliteMessagesOutboxStorage,
     create_sqlite_conn,
+    index_streams,
 )
 
 
 @pytest.fixture(params=[MemoryMessagesOutboxStorage, SqliteMessagesOutboxStorage])
-def make_sut(request):
+def make_sut(request, mother):
     def _make_sut():
         if request.param == SqliteMessagesOutboxStorage:
             conn = create_sqlite_conn(":memory:")
-            return SqliteMessagesOutboxStorage(conn)
+            return SqliteMessagesOutboxStorage(conn, index_streams([mother.source()]))
         elif request.param == MemoryMessagesOutboxStorage:
             return MemoryMessagesOutboxStorage()
         else:
@@ -95,3 +98,133 @@ async def test_cant_get_item_from_dead_letter_if_delta_is_too_small(make_sut, mo
     result = await sut.get_dead_letter(110, 11)
 
     assert result is None
+
+
+@pytest.fixture()
+def sqlite_conn():
+    return create_sqlite_conn(":memory:")
+
+
+@pytest.fixture()
+def make_sqlite_sut(sqlite_conn, mother):
+    def _make_sqlite_sut(sources=None):
+        if sources is None:
+            sources = [mother.source()]
+        return SqliteMessagesOutboxStorage(sqlite_conn, index_streams(sources))
+
+    return _make_sqlite_sut
+
+
+def _read_raw_rows(conn) -> list[dict]:
+    return [json.loads(row[0]) for row in conn.execute("SELECT data FROM outbox")]
+
+
+async def test_sqlite_row_references_stream_instead_of_embedding_it(
+    make_sqlite_sut, sqlite_conn, mother
+):
+    sut = make_sqlite_sut()
+    stream = mother.stream(receiver_options={"chat_id": "secret-chat"})
+
+    await sut.put(mother.outbox_item(stream=stream))
+
+    [row] = _read_raw_rows(sqlite_conn)
+    assert row["v"] == 2
+    assert isinstance(row["stream"], str)
+    assert "secret-chat" not in json.dumps(row)
+
+
+async def test_sqlite_resolves_stream_from_configuration(make_sqlite_sut, mother):
+    configured_stream = mother.stream(message_template="${title}")
+    sut = make_sqlite_sut([mother.source(streams=[configured_stream])])
+
+    await sut.put(mother.outbox_item(stream=mother.stream(message_template="${url}")))
+    result = await sut.get(100)
+
+    assert result.stream is configured_stream
+
+
+async def test_sqlite_resolves_streams_that_share_a_receiver(make_sqlite_sut, mother):
+    first = mother.stream(message_template="${title}", id="first")
+    second = mother.stream(message_template="${url}", id="second")
+    sut = make_sqlite_sut([mother.source(streams=[first, second])])
+
+    await sut.put(mother.outbox_item(id="1", stream=second))
+    await sut.put(mother.outbox_item(id="2", stream=first))
+    results = [await sut.get(100), await sut.get(100)]
+
+    assert results[0].stream is second
+    assert results[1].stream is first
+
+
+async def test_sqlite_keeps_messages_with_different_templates(make_sqlite_sut, mother):
+    sut = make_sqlite_sut()
+    messages = [
+        mother.message(post_id="1", template="${title}"),
+        mother.message(post_id="2", template="${url}"),
+    ]
+    item = mother.outbox_item(messages=messages)
+
+    await sut.put(item)
+    result = await sut.get(100)
+
+    assert result.messages == messages
+
+
+async def test_sqlite_skips_item_with_unknown_stream(
+    make_sqlite_sut, sqlite_conn, mother
+):
+    sut = make_sqlite_sut()
+    orphan = mother.outbox_item(id="orphan", source_id="removed-source")
+    item = mother.outbox_item(id="known")
+
+    await sut.put(orphan)
+    await sut.put(item)
+    result = await sut.get(100)
+
+    assert result == item
+    assert await sut.get(100) is None
+    assert await sut.get_dead_letter(100, 10) is None
+    assert sqlite_conn.execute("SELECT id FROM outbox").fetchall() == [
+        ("orphan",),
+        ("known",),
+    ]
+
+
+async def test_sqlite_item_with_unknown_stream_is_sent_when_stream_is_back(
+    make_sqlite_sut, mother
+):
+    orphan = mother.outbox_item(id="orphan", source_id="removed-source")
+    await make_sqlite_sut().put(orphan)
+    assert await make_sqlite_sut().get(100) is None
+    sut = make_sqlite_sut([mother.source(id="removed-source")])
+
+    result = await sut.get_dead_letter(200, 10)
+
+    assert result == orphan
+
+
+async def test_sqlite_reads_legacy_rows_with_embedded_stream(
+    make_sqlite_sut, sqlite_conn, mother
+):
+    sut = make_sqlite_sut(sources=[])
+    item = mother.outbox_item()
+    sqlite_conn.execute(
+        "INSERT INTO outbox (id, data) VALUES (?, ?)",
+        (item.id, json.dumps(asdict(item))),
+    )
+
+    result = await sut.get(100)
+
+    assert result == item
+
+
+async def test_sqlite_put_is_durable_without_other_commits(tmp_path, mother):
+    db_path = str(tmp_path / "feed_proxy.db")
+    sut = SqliteMessagesOutboxStorage(
+        create_sqlite_conn(db_path), index_streams([mother.source()])
+    )
+
+    await sut.put(mother.outbox_item())
+
+    other_conn = create_sqlite_conn(db_path)
+    assert other_conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 1
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from feed_proxy import parse_cache
+from feed_proxy.handlers.parsers.rss import FeedPost
+from feed_proxy.parse_cache import ParseCache
+from feed_proxy.storage import SqliteParseCacheStorage, create_sqlite_conn
+
+
+class RecordingMetrics:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, str]] = []
+
+    def increment_parse_cache(self, parser_type: str, result: str) -> None:
+        self.calls.append((parser_type, result))
+
+
+class CountingParser:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def __call__(self, text: str) -> list[FeedPost]:
+        self.calls.append(text)
+        return [
+            FeedPost(
+                post_id=f"{text}-1",
+                title="Title",
+                url="https://post.url",
+                comments_url="",
+                post_tags=("python",),
+                source_tags=(),
+                extras={"key": "value"},
+            )
+        ]
+
+
+@pytest.fixture()
+def parser() -> CountingParser:
+    return CountingParser()
+
+
+@pytest.fixture(autouse=True)
+def _return_model(monkeypatch):
+    monkeypatch.setattr(
+        parse_cache, "get_handler_return_model_by_name", lambda *_: FeedPost
+    )
+
+
+@pytest.fixture()
+def source(mother):
+    def _source(**kwargs: Any):
+        return mother.source(**{"parser_type": "rss", **kwargs})
+
+    return _source
+
+
+async def test_same_text_is_parsed_once(parser, source):
+    sut = ParseCache()
+
+    first = await sut.get_or_parse(source(), "text", parser)
+    second = await sut.get_or_parse(source(), "text", parser)
+
+    assert parser.calls == ["text"]
+    assert first == second
+    assert (sut.hits, sut.misses, sut.hit_rate) == (1, 1, 0.5)
+
+
+async def test_cached_posts_are_not_affected_by_changes_of_returned_posts(
+    parser, source
+):
+    sut = ParseCache()
+
+    [first] = await sut.get_or_parse(source(), "text", parser)
+    first.title = "Changed"
+    first.extras["key"] = "changed"
+    [second] = await sut.get_or_parse(source(), "text", parser)
+    second.source_tags = ["tag"]
+    [third] = await sut.get_or_parse(source(), "text", parser)
+
+    assert (second.title, second.extras) == ("Title", {"key": "value"})
+    assert third.source_tags == ()
+
+
+async def test_parser_options_are_part_of_key(parser, source):
+    sut = ParseCache()
+
+    await sut.get_or_parse(source(parser_options={"a": 1, "b": 2}), "text", parser)
+    await sut.get_or_parse(source(parser_options={"b": 2, "a": 1}), "text", parser)
+    await sut.get_or_parse(source(parser_options={"a": 2}), "text", parser)
+
+    assert len(parser.calls) == 2
+
+
+async def test_least_recently_used_entry_is_evicted(parser, source):
+    sut = ParseCache(max_entries=2)
+
+    for text in ("a", "b", "a", "c", "a", "b"):
+        await sut.get_or_parse(source(), text, parser)
+
+    assert parser.calls == ["a", "b", "c", "b"]
+
+
+async def test_lookups_are_counted_in_metrics(parser, source):
+    metrics = RecordingMetrics()
+    sut = ParseCache(metrics=metrics)  # type: ignore[arg-type]
+
+    await sut.get_or_parse(source(), "text", parser)
+    await sut.get_or_parse(source(), "text", parser)
+
+    assert metrics.calls == [("rss", "miss"), ("rss", "hit")]
+
+
+async def test_persisted_entries_survive_new_cache(parser, source):
+    conn = create_sqlite_conn(":memory:")
+    before_restart = ParseCache(storage=SqliteParseCacheStorage(conn, 10))
+    expected = await before_restart.get_or_parse(source(), "text", parser)
+    sut = ParseCache(storage=SqliteParseCacheStorage(conn, 10))
+
+    result = await sut.get_or_parse(source(), "text", parser)
+
+    assert parser.calls == ["text"]
+    assert [post.post_id for post in result] == [post.post_id for post in expected]
+    assert isinstance(result[0], FeedPost)
+    assert result[0].extras == {"key": "value"}
+
+
+async def test_persisted_entries_are_trimmed_to_max_entries(parser, source):
+    conn = create_sqlite_conn(":memory:")
+    sut = ParseCache(storage=SqliteParseCacheStorage(conn, 2))
+
+    for text in ("a", "b", "c"):
+        await sut.get_or_parse(source(), text, parser)
+
+    assert conn.execute("SELECT COUNT(*) FROM parse_cache").fetchone()[0] == 2
+
+
+async def test_broken_persisted_entry_is_parsed_again(parser, source):
+    conn = create_sqlite_conn(":memory:")
+    storage = SqliteParseCacheStorage(conn, 10)
+    await ParseCache(storage=storage).get_or_parse(source(), "text", parser)
+    conn.execute("UPDATE parse_cache SET data = '[{\"unknown\": 1}]'")
+    sut = ParseCache(storage=storage)
+
+    await sut.get_or_parse(source(), "text", parser)
+
+    assert parser.calls == ["text", "text"]
@@ -1,6 +1,7 @@
 import pytest
 
 from feed_proxy.storage import MemoryPostStorage, SqlitePostStorage, create_sqlite_conn
+from feed_proxy.utils import minhash
 
 
 @pytest.fixture(params=[MemoryPostStorage, SqlitePostStorage])
@@ -83,3 +84,20 @@ async def test_mark_posts_as_processed_populates_both_indexes_atomically(make_su
 
     assert await sut.has_posts("source", "telegram")
     assert await sut.any_processed("group", "telegram", ["mypost"])
+
+
+async def test_any_similar_finds_signatures_marked_as_identities(make_sut):
+    sut = make_sut()
+    signature = minhash.minhash("one two three four five six seven eight nine ten")
+    similar = minhash.minhash("one two three four five six seven eight nine eleven")
+    other = minhash.minhash("completely unrelated text about something else")
+    assert signature and similar and other
+    await sut.mark_posts_as_processed(
+        "source", "group", "telegram", ["mypost", minhash.to_identity(signature)]
+    )
+
+    assert await sut.any_similar("group", "telegram", similar, 0.7)
+    assert not await sut.any_similar("group", "telegram", similar, 1.0)
+    assert not await sut.any_similar("group", "telegram", other, 0.7)
+    assert not await sut.any_similar("another_group", "telegram", similar, 0.7)
+    assert not await sut.any_similar("group", "rss", similar, 0.7)
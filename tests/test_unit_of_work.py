@@ -0,0 +1,237 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from feed_proxy.storage import (
+    MemoryMessagesOutboxStorage,
+    MemoryPostStorage,
+    SqliteMessagesOutboxStorage,
+    SqlitePostStorage,
+    SqliteUnitOfWorkWriter,
+    StorageUnitOfWorkWriter,
+    create_sqlite_conn,
+    index_streams,
+)
+from feed_proxy.unit_of_work import UnitOfWorkManager
+from feed_proxy.utils import minhash
+
+
+class RecordingWriter:
+    def __init__(self) -> None:
+        self.calls: list[tuple[list, list]] = []
+
+    async def write(self, marks, items) -> None:
+        self.calls.append((marks, items))
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    return str(tmp_path / "feed_proxy.db")
+
+
+@pytest.fixture()
+def make_sqlite_sut(db_path, mother):
+    def _make_sqlite_sut(group_commit_sec: float = 0.0):
+        conn = create_sqlite_conn(db_path)
+        post_storage = SqlitePostStorage(conn)
+        outbox_storage = SqliteMessagesOutboxStorage(
+            conn, index_streams([mother.source()])
+        )
+        writer = SqliteUnitOfWorkWriter(conn, post_storage, outbox_storage)
+        return UnitOfWorkManager(writer, post_storage, group_commit_sec)
+
+    return _make_sqlite_sut
+
+
+def _count_rows(db_path: str, table: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]  # noqa: S608
+    finally:
+        conn.close()
+
+
+async def test_marks_and_outbox_items_are_committed_together(
+    make_sqlite_sut, db_path, mother
+):
+    sut = make_sqlite_sut()
+
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("guido-blog", "group", "telegram", ["a"])
+        await uow.put(mother.outbox_item())
+
+    assert _count_rows(db_path, "posts") == 1
+    assert _count_rows(db_path, "outbox") == 1
+
+
+async def test_nothing_is_written_if_unit_fails(make_sqlite_sut, db_path, mother):
+    sut = make_sqlite_sut()
+
+    with pytest.raises(RuntimeError):
+        async with sut.begin() as uow:
+            await uow.mark_posts_as_processed("guido-blog", "group", "telegram", ["a"])
+            await uow.put(mother.outbox_item())
+            raise RuntimeError("boom")
+
+    assert _count_rows(db_path, "posts") == 0
+    assert _count_rows(db_path, "outbox") == 0
+    assert not await sut.any_processed("group", "telegram", ["a"])
+
+
+async def test_sqlite_writer_rolls_back_marks_if_outbox_write_fails(mother):
+    conn = create_sqlite_conn(":memory:")
+    post_storage = SqlitePostStorage(conn)
+
+    def broken_serializer(item):
+        raise ValueError("can't serialize")
+
+    outbox_storage = SqliteMessagesOutboxStorage(
+        conn, index_streams([mother.source()]), serializer=broken_serializer
+    )
+    sut = SqliteUnitOfWorkWriter(conn, post_storage, outbox_storage)
+
+    with pytest.raises(ValueError, match="can't serialize"):
+        await sut.write(
+            [("guido-blog", "group", "telegram", ["a"])], [mother.outbox_item()]
+        )
+
+    assert not await post_storage.any_processed("group", "telegram", ["a"])
+
+
+async def test_unit_sees_its_own_marks_before_commit():
+    sut = UnitOfWorkManager(RecordingWriter(), MemoryPostStorage())
+
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("source", "group", "telegram", ["a"])
+
+        assert await uow.has_posts("source", "telegram")
+        assert await uow.any_processed("group", "telegram", ["a"])
+
+
+async def test_units_are_grouped_into_one_write_within_window():
+    writer = RecordingWriter()
+    sut = UnitOfWorkManager(writer, MemoryPostStorage(), group_commit_sec=0.05)
+
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("a", "group", "telegram", ["1"])
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("b", "group", "telegram", ["2"])
+
+    assert writer.calls == []
+    await asyncio.sleep(0.1)
+
+    assert len(writer.calls) == 1
+    marks, _ = writer.calls[0]
+    assert [mark.post_ids for mark in marks] == [["1"], ["2"]]
+
+
+async def test_pending_marks_are_visible_to_next_units_before_group_commit():
+    writer = RecordingWriter()
+    sut = UnitOfWorkManager(writer, MemoryPostStorage(), group_commit_sec=10)
+
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("a", "group", "telegram", ["1"])
+
+    async with sut.begin() as uow:
+        assert await uow.has_posts("a", "telegram")
+        assert await uow.any_processed("group", "telegram", ["1"])
+    assert writer.calls == []
+    await sut.flush()
+
+
+async def test_max_group_size_forces_write():
+    writer = RecordingWriter()
+    sut = UnitOfWorkManager(
+        writer, MemoryPostStorage(), group_commit_sec=10, max_group_size=2
+    )
+
+    for source_id in ("a", "b"):
+        async with sut.begin() as uow:
+            await uow.mark_posts_as_processed(source_id, "group", "telegram", ["1"])
+
+    assert len(writer.calls) == 1
+
+
+async def test_flush_writes_pending_units(mother):
+    post_storage = MemoryPostStorage()
+    outbox_storage = MemoryMessagesOutboxStorage()
+    writer = StorageUnitOfWorkWriter(post_storage, outbox_storage)
+    sut = UnitOfWorkManager(writer, post_storage, group_commit_sec=10)
+    item = mother.outbox_item()
+
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("source", "group", "telegram", ["a"])
+        await uow.put(item)
+    await sut.flush()
+
+    assert await post_storage.any_processed("group", "telegram", ["a"])
+    assert await outbox_storage.get(100) == item
+
+
+async def test_failed_group_write_is_retried_with_same_units(mother):
+    class FlakyWriter(RecordingWriter):
+        async def write(self, marks, items) -> None:
+            await super().write(marks, items)
+            if len(self.calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+
+    writer = FlakyWriter()
+    sut = UnitOfWorkManager(writer, MemoryPostStorage(), group_commit_sec=0.01)
+    item = mother.outbox_item()
+
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("a", "group", "telegram", ["1"])
+        await uow.put(item)
+    await asyncio.sleep(0.05)
+
+    assert len(writer.calls) == 2
+    assert writer.calls[0] == writer.calls[1]
+    marks, items = writer.calls[1]
+    assert [mark.post_ids for mark in marks] == [["1"]]
+    assert items == [item]
+
+
+async def test_failed_flush_keeps_units_pending():
+    writer = RecordingWriter()
+    sut = UnitOfWorkManager(writer, MemoryPostStorage(), group_commit_sec=10)
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed("a", "group", "telegram", ["1"])
+
+    async def fail(marks, items) -> None:  # noqa: U100
+        raise sqlite3.OperationalError("database is locked")
+
+    writer.write = fail  # type: ignore[method-assign]
+    with pytest.raises(sqlite3.OperationalError):
+        await sut.flush()
+
+    assert await sut.any_processed("group", "telegram", ["1"])
+    del writer.write
+    await sut.flush()
+    assert [mark.post_ids for mark in writer.calls[0][0]] == [["1"]]
+
+
+async def test_empty_units_are_not_written():
+    writer = RecordingWriter()
+    sut = UnitOfWorkManager(writer, MemoryPostStorage())
+
+    async with sut.begin():
+        pass
+    await sut.flush()
+
+    assert writer.calls == []
+
+
+async def test_pending_signatures_are_visible_to_next_units_before_group_commit():
+    sut = UnitOfWorkManager(RecordingWriter(), MemoryPostStorage(), group_commit_sec=10)
+    signature = minhash.minhash("some text of a post")
+    assert signature is not None
+
+    async with sut.begin() as uow:
+        await uow.mark_posts_as_processed(
+            "a", "group", "telegram", [minhash.to_identity(signature)]
+        )
+
+    async with sut.begin() as uow:
+        assert await uow.any_similar("group", "telegram", signature, 0.9)
+    await sut.flush()
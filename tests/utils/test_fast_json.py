@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from typing import Any
+
+import pytest
+
+from feed_proxy.utils import fast_json
+
+
+@pytest.fixture(params=fast_json.available_backends())
+def backend(request, monkeypatch):
+    monkeypatch.setattr(fast_json, "BACKEND", request.param)
+
+
+@pytest.mark.usefixtures("backend")
+def test_dumps_keeps_non_ascii_characters():
+    result = fast_json.dumps({"title": "Привіт"})
+
+    assert "Привіт" in result
+    assert fast_json.loads(result) == {"title": "Привіт"}
+
+
+@pytest.mark.usefixtures("backend")
+def test_dumps_with_sorted_keys():
+    result = fast_json.dumps({"b": 1, "a": {"d": 2, "c": 3}}, sort_keys=True)
+
+    assert result.replace(" ", "") == '{"a":{"c":3,"d":2},"b":1}'
+
+
+@pytest.mark.usefixtures("backend")
+def test_dumps_converts_non_str_keys():
+    result = fast_json.dumps({1: "one"})
+
+    assert fast_json.loads(result) == {"1": "one"}
+
+
+@pytest.mark.usefixtures("backend")
+@pytest.mark.parametrize("data", ['{"a": [1, "б"]}', '{"a": [1, "б"]}'.encode()])
+def test_loads_from_str_and_bytes(data):
+    result = fast_json.loads(data)
+
+    assert result == {"a": [1, "б"]}
+
+
+def test_set_backend_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="not installed"):
+        fast_json.set_backend("simdjson")  # type: ignore[arg-type]
+
+
+@dataclass
+class Author:
+    name: str
+
+
+@dataclass
+class Entry:
+    id: int
+    author: Author
+
+
+@pytest.fixture(params=[True, False], ids=["msgspec", "fallback"])
+def typed_backend(request, monkeypatch):
+    if request.param and not fast_json.HAS_MSGSPEC:
+        pytest.skip("msgspec is not installed")
+    monkeypatch.setattr(fast_json, "HAS_MSGSPEC", request.param)
+
+
+@pytest.mark.usefixtures("typed_backend")
+def test_loads_as_skips_undeclared_fields():
+    data = b'[{"id": 1, "author": {"name": "Guido", "bio": "..."}, "content": "x"}]'
+
+    result = fast_json.loads_as(data, list[Entry])
+
+    assert result == [Entry(id=1, author=Author(name="Guido"))]
+
+
+@pytest.mark.usefixtures("typed_backend")
+def test_loads_as_picks_union_member_by_json_type():
+    result = fast_json.loads_as('{"code": "error"}', list[Entry] | dict[str, Any])
+
+    assert result == {"code": "error"}
+
+
+@pytest.mark.usefixtures("typed_backend")
+def test_loads_as_raises_value_error_on_missing_field():
+    with pytest.raises(ValueError, match="author"):
+        fast_json.loads_as('{"id": 1}', Entry)
@@ -0,0 +1,41 @@
+import pytest
+
+from feed_proxy.utils.http import FetchedBody
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (FetchedBody("Привіт".encode()), "Привіт"),
+        (
+            FetchedBody("Привіт".encode("cp1251"), "text/html; charset=windows-1251"),
+            "Привіт",
+        ),
+        (
+            FetchedBody(
+                "Привіт".encode("cp1251"), "text/html; charset=utf-8", "cp1251"
+            ),
+            "Привіт",
+        ),
+        (FetchedBody(b"text", "text/html; charset=unknown"), "text"),
+    ],
+)
+def test_body_is_decoded_with_forced_encoding_then_charset(body, expected):
+    result = body.decode()
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "content_type, expected",
+    [
+        ("", True),
+        ("application/rss+xml", True),
+        ("application/rss+xml; charset=utf-8", True),
+        ("application/rss+xml; charset=UTF8", True),
+        ("application/rss+xml; charset=windows-1251", False),
+        ("application/rss+xml; charset=unknown", False),
+    ],
+)
+def test_is_utf8(content_type, expected):
+    assert FetchedBody(b"", content_type).is_utf8 is expected
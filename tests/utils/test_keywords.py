@@ -0,0 +1,53 @@
+import pytest
+
+from feed_proxy.utils.keywords import KeywordMatcher
+
+
+@pytest.mark.parametrize(
+    "keywords, text, expected",
+    [
+        (["he", "she", "his", "hers"], "ushers", "she"),
+        (["abcd", "bc"], "xabcx", "bc"),
+        (["Crypto"], "CRYPTO news", "Crypto"),
+        (["straße"], "STRASSE", "straße"),
+        (["казино"], "Онлайн КАЗИНО", "казино"),
+        (["python", "java"], "Ruby", None),
+        (["", "a"], "b", None),
+    ],
+)
+def test_search(keywords, text, expected):
+    sut = KeywordMatcher(keywords)
+
+    assert sut.search(text) == expected
+
+
+def test_case_is_kept_when_asked():
+    sut = KeywordMatcher(["Crypto"], ignore_case=False)
+
+    assert not sut.matches("crypto")
+    assert sut.matches("Crypto")
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("an ad here", "ad"),
+        ("ad", "ad"),
+        ("(ad)", "ad"),
+        ("read this", None),
+        ("adverts", None),
+        ("bad adware, ad_block", None),
+        ("bad advert", "advert"),
+    ],
+)
+def test_whole_words(text, expected):
+    sut = KeywordMatcher(["ad", "advert"], whole_words=True)
+
+    assert sut.search(text) == expected
+
+
+def test_shorter_keyword_is_found_when_longer_is_not_a_whole_word():
+    sut = KeywordMatcher(["cat", "at"], whole_words=True)
+
+    assert sut.search("cat") == "cat"
+    assert sut.search("c-at") == "at"
@@ -0,0 +1,46 @@
+from feed_proxy.utils import minhash
+
+TEXT = (
+    "Python 3.13 released with experimental free-threaded mode. The Python"
+    " Software Foundation announced the release of Python 3.13 today. The new"
+    " version ships an experimental build without the global interpreter lock."
+)
+
+
+def test_similar_texts_have_similar_signatures_with_common_band():
+    edited = TEXT.replace("released", "is out")
+
+    a, b = minhash.minhash(TEXT), minhash.minhash(edited)
+
+    assert a is not None and b is not None
+    assert minhash.similarity(a, b) >= 0.7
+    assert set(minhash.band_keys(a)) & set(minhash.band_keys(b))
+
+
+def test_different_texts_have_different_signatures():
+    other = "Rust 1.80 brings LazyCell and LazyLock to the standard library"
+
+    a, b = minhash.minhash(TEXT), minhash.minhash(other)
+
+    assert a is not None and b is not None
+    assert minhash.similarity(a, b) < 0.3
+    assert not set(minhash.band_keys(a)) & set(minhash.band_keys(b))
+
+
+def test_case_and_punctuation_are_ignored():
+    assert minhash.minhash("Hello, World!") == minhash.minhash("hello world")
+
+
+def test_text_without_words_has_no_signature():
+    assert minhash.minhash(" ,.! ") is None
+
+
+def test_identity_roundtrip():
+    signature = minhash.minhash(TEXT)
+    assert signature is not None
+
+    identity = minhash.to_identity(signature)
+
+    assert identity.startswith(minhash.IDENTITY_PREFIX)
+    assert minhash.from_identity(identity) == signature
+    assert minhash.from_identity("post-1") is None
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from feed_proxy.utils.single_flight import SingleFlight
+
+
+class SlowCall:
+    def __init__(self, result: str = "body", fail: bool = False) -> None:
+        self.calls = 0
+        self.result = result
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("can't fetch")
+        return f"{self.result}-{self.calls}"
+
+
+async def test_concurrent_calls_with_same_key_share_one_call():
+    sut: SingleFlight[str, str] = SingleFlight()
+    call = SlowCall()
+
+    tasks = [asyncio.create_task(sut.do("url", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*tasks) == ["body-1"] * 3
+    assert call.calls == 1
+
+
+async def test_calls_with_different_keys_are_not_shared():
+    sut: SingleFlight[str, str] = SingleFlight()
+    call = SlowCall()
+    call.release.set()
+
+    results = await asyncio.gather(sut.do("a", call), sut.do("b", call))
+
+    assert results == ["body-1", "body-2"]
+
+
+async def test_result_is_reused_within_ttl():
+    sut: SingleFlight[str, str] = SingleFlight(ttl_sec=60)
+    call = SlowCall()
+    call.release.set()
+
+    await sut.do("url", call)
+
+    assert await sut.do("url", call) == "body-1"
+
+
+async def test_result_is_not_reused_without_ttl():
+    sut: SingleFlight[str, str] = SingleFlight()
+    call = SlowCall()
+    call.release.set()
+
+    await sut.do("url", call)
+
+    assert await sut.do("url", call) == "body-2"
+
+
+async def test_failure_is_shared_only_with_concurrent_callers():
+    sut: SingleFlight[str, str] = SingleFlight(ttl_sec=60)
+    call = SlowCall(fail=True)
+
+    tasks = [asyncio.create_task(sut.do("url", call)) for _ in range(2)]
+    await asyncio.sleep(0)
+    call.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    call.fail = False
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert await sut.do("url", call) == "body-2"
+
+
+async def test_cancelled_caller_does_not_cancel_call_for_others():
+    sut: SingleFlight[str, str] = SingleFlight()
+    call = SlowCall()
+
+    first = asyncio.create_task(sut.do("url", call))
+    second = asyncio.create_task(sut.do("url", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    call.release.set()
+
+    assert await second == "body-1"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.parametrize("ttl_sec", [0, 0.01])
+async def test_results_are_not_kept_after_ttl(ttl_sec):
+    sut: SingleFlight[str, str] = SingleFlight(ttl_sec=ttl_sec)
+    call = SlowCall()
+    call.release.set()
+
+    for key in ("a", "b", "c"):
+        await sut.do(key, call)
+    await asyncio.sleep(0.05)
+
+    assert sut._calls == {}
+    assert await sut.do("a", call) == "body-4"
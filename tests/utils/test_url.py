@@ -0,0 +1,38 @@
+import pytest
+
+from feed_proxy.utils.url import canonicalize_url
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        ("https://example.com/news/1", "example.com/news/1"),
+        ("http://example.com/news/1", "example.com/news/1"),
+        ("https://WWW.Example.COM/news/1/", "example.com/news/1"),
+        ("https://example.com:443/news/1", "example.com/news/1"),
+        ("http://example.com:80/news/1", "example.com/news/1"),
+        ("https://example.com:8080/news/1", "example.com:8080/news/1"),
+        ("https://example.com/news/1#comments", "example.com/news/1"),
+        ("  https://example.com/  ", "example.com"),
+        (
+            "https://example.com/news?utm_source=rss&id=1&UTM_Medium=x&fbclid=abc",
+            "example.com/news?id=1",
+        ),
+        ("https://example.com/news?b=2&a=1&a=0", "example.com/news?a=0&a=1&b=2"),
+        ("https://example.com/news?utm_source=rss", "example.com/news"),
+        ("https://example.com/News/1", "example.com/News/1"),
+        ("", ""),
+    ],
+)
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_canonicalize_url_custom_params():
+    url = "https://www.example.com/news?ref=rss&utm_source=x&b=2&a=1"
+
+    result = canonicalize_url(
+        url, strip_params=["ref"], sort_query=False, strip_www=False
+    )
+
+    assert result == "www.example.com/news?utm_source=x&b=2&a=1"